@@ -0,0 +1,57 @@
+"""Benchmark showing a NumPy structured array through a data source against converting it.
+
+Times creating a table model over a structured array plus showing a
+screen of rows, read through a `NumpySource`, against building a pandas
+DataFrame from the array first. A Polars DataFrame is timed too when
+polars is installed.
+
+Run with `python benchmarks/bench_data_source.py`.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from qspreadsheet import qt
+from qspreadsheet import table_model
+
+ROWS = 20_000_000
+SCREEN_ROWS = 40
+
+
+def show_screen(model: table_model.TableModel) -> None:
+    """Format a screen of rows, like a view showing them."""
+    for row in range(SCREEN_ROWS):
+        for col in range(model.columnCount(qt.QModelIndex())):
+            model.data(model.index(row, col))
+
+
+def bench(label: str, make_model) -> None:
+    """Time creating a model and showing its first rows."""
+    start = time.perf_counter()
+    show_screen(make_model())
+    print(f'{label:<22} {(time.perf_counter() - start) * 1000:8.1f} ms')
+
+
+def main():
+    """Entry point for this script."""
+    app = qt.QApplication.instance() or qt.QApplication([])
+    del app  # Unused, needed for the models
+    array = np.zeros(ROWS, dtype=[('price', float), ('size', np.int64), ('flag', bool)])
+    array['price'] = np.random.default_rng(0).random(ROWS)
+    array['size'] = np.arange(ROWS)
+    print(f'{ROWS:,} rows')
+    bench('structured array:', lambda: table_model.TableModel(array))
+    bench('via pandas DataFrame:', lambda: table_model.TableModel(pd.DataFrame(array)))
+    try:
+        import polars
+    except ImportError:
+        return
+    frame = polars.from_numpy(array)
+    bench('Polars DataFrame:', lambda: table_model.TableModel(frame))
+    bench('Polars via pandas:', lambda: table_model.TableModel(frame.to_pandas()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Benchmark opening a large CSV file with `TableWidget.from_file` against `pd.read_csv`.
+
+Writes a CSV file, then reports the time until the first screen of rows is
+formatted, the time until the whole file is indexed in the background,
+the time to read rows in the middle of the file, and the resident memory
+added. For comparison, also times reading the whole file with
+`pd.read_csv`.
+
+Run with `python benchmarks/bench_file_store.py`.
+"""
+
+import os
+import resource
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from qspreadsheet import qt
+from qspreadsheet import table_widget
+
+ROWS = 10_000_000
+WRITE_CHUNK_ROWS = 1_000_000
+SCREEN_ROWS = 40
+
+
+def rss_mb() -> float:
+    """Current resident memory, in MB."""
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * resource.getpagesize() / 2**20
+
+
+def write_csv(path: str) -> None:
+    """Write ticks: an id, a symbol, a price, a size and a flag."""
+    rng = np.random.default_rng(0)
+    for start in range(0, ROWS, WRITE_CHUNK_ROWS):
+        rows = min(WRITE_CHUNK_ROWS, ROWS - start)
+        chunk = pd.DataFrame({
+            'id': np.arange(start, start + rows),
+            'symbol': rng.choice(['AAA', 'BBB', 'CCC', 'DDD'], rows),
+            'price': rng.random(rows).round(4) * 100,
+            'size': rng.integers(1, 1_000, rows),
+            'flag': rng.random(rows) < 0.5,
+        })
+        chunk.to_csv(path, mode='a', header=start == 0, index=False)
+
+
+def show_rows(model, first: int) -> None:
+    """Format a screen of rows, like a view showing them."""
+    for row in range(first, first + SCREEN_ROWS):
+        for col in range(model.columnCount(qt.QModelIndex())):
+            model.data(model.index(row, col))
+
+
+def main():
+    """Entry point for this script."""
+    app = qt.QApplication.instance() or qt.QApplication([])
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'ticks.csv')
+        write_csv(path)
+        size_mb = os.path.getsize(path) / 2**20
+        print(f'{ROWS:,} rows, {size_mb:,.0f} MB')
+
+        before = rss_mb()
+        start = time.perf_counter()
+        widget = table_widget.TableWidget.from_file(path)
+        model = widget.table_view.model()
+        show_rows(model, 0)
+        print(f'from_file, first screen: {(time.perf_counter() - start) * 1000:8.1f} ms')
+        while not widget.table_view.model().row_store.source.indexed:
+            app.processEvents()
+        print(f'from_file, indexed:      {(time.perf_counter() - start) * 1000:8.1f} ms, '
+              f'{model.rowCount(qt.QModelIndex()):,} rows')
+        middle = time.perf_counter()
+        show_rows(model, ROWS // 2)
+        print(f'from_file, middle screen: {(time.perf_counter() - middle) * 1000:7.1f} ms, '
+              f'+{rss_mb() - before:.0f} MB resident')
+        widget.deleteLater()
+        del model, widget
+        app.processEvents()
+
+        before = rss_mb()
+        start = time.perf_counter()
+        frame = pd.read_csv(path)
+        print(f'pd.read_csv:             {(time.perf_counter() - start) * 1000:8.1f} ms, '
+              f'+{rss_mb() - before:.0f} MB resident')
+        del frame
+
+
+if __name__ == '__main__':
+    main()
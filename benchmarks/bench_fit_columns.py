@@ -0,0 +1,58 @@
+"""Benchmark `TableView.fit_columns` on a 5M-row, 50-column frame.
+
+Compares the sampled fit with Qt's `resizeColumnToContents` on the first
+rows only, since measuring every cell through the model takes minutes.
+
+Run with `python benchmarks/bench_fit_columns.py`.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from qspreadsheet import qt
+from qspreadsheet import table_model
+from qspreadsheet import table_view
+
+ROWS = 5_000_000
+COLUMNS = 50
+QT_ROWS = 20_000
+
+
+def make_frame(rows: int, cols: int) -> pd.DataFrame:
+    """Frame of 32-bit numbers, and text columns drawn from a pool of words."""
+    rng = np.random.default_rng(0)
+    words = np.array(['x' * length for length in range(1, 40)], dtype=object)
+    data = {}
+    for i in range(cols):
+        kind = i % 5
+        if kind == 0:
+            data[f'c{i}'] = words[rng.integers(0, words.size, rows)]
+        elif kind in (1, 2):
+            data[f'c{i}'] = rng.integers(0, 1_000_000, rows, dtype=np.int32)
+        else:
+            data[f'c{i}'] = rng.random(rows, dtype=np.float32)
+    return pd.DataFrame(data)
+
+
+def main():
+    """Entry point for this script."""
+    app = qt.QApplication.instance() or qt.QApplication([])
+    del app  # Unused
+    view = table_view.TableView()
+    view.setModel(table_model.TableModel(make_frame(ROWS, COLUMNS), view))
+    start = time.perf_counter()
+    view.fit_columns()
+    print(f'fit_columns {ROWS:,} x {COLUMNS}: {(time.perf_counter() - start) * 1000:.1f} ms')
+
+    small = table_view.TableView()
+    small.setModel(table_model.TableModel(make_frame(QT_ROWS, COLUMNS), small))
+    start = time.perf_counter()
+    small.resizeColumnsToContents()
+    print(f'resizeColumnsToContents {QT_ROWS:,} x {COLUMNS}: '
+          f'{(time.perf_counter() - start) * 1000:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""Benchmark opening memory-mapped columns against loading them into a DataFrame.
+
+Writes `.npy` files of growing sizes, then times opening them with
+`MappedStore.from_memmaps` plus showing the first and last rows of a table
+model, and reports the resident memory it adds. For comparison, also
+times building a DataFrame from the same files. Arrow IPC files are timed
+too when pyarrow is installed.
+
+Run with `python benchmarks/bench_mapped_store.py`.
+"""
+
+import os
+import resource
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from qspreadsheet import qt
+from qspreadsheet import table_model
+from qspreadsheet.mapped_store import MappedStore
+
+COLUMNS = 4
+SIZES = [1_000_000, 10_000_000, 40_000_000]
+
+
+def rss_mb() -> float:
+    """Current resident memory, in MB."""
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * resource.getpagesize() / 2**20
+
+
+def write_files(directory: str, rows: int) -> dict:
+    """Write one float column per `.npy` file."""
+    paths = {}
+    for col in range(COLUMNS):
+        path = os.path.join(directory, f'{rows}_{col}.npy')
+        values = np.lib.format.open_memmap(path, mode='w+', dtype=float, shape=(rows,))
+        values[:] = np.arange(rows) + col
+        values.flush()
+        del values
+        paths[f'col{col}'] = path
+    return paths
+
+
+def show_edges(model: table_model.TableModel) -> None:
+    """Read the first and last rows, like a view scrolled to both ends."""
+    rows = model.rowCount(qt.QModelIndex())
+    for row in (0, rows - 1):
+        for col in range(COLUMNS):
+            model.data(model.index(row, col))
+
+
+def bench_memmaps(paths: dict, rows: int) -> None:
+    """Time opening and showing the files as memmaps, and as a DataFrame."""
+    before = rss_mb()
+    start = time.perf_counter()
+    model = table_model.TableModel(MappedStore.from_memmaps(paths))
+    show_edges(model)
+    elapsed = time.perf_counter() - start
+    print(f'{rows:>11,} rows, memmaps:   {elapsed * 1000:8.1f} ms, '
+          f'+{rss_mb() - before:7.1f} MB resident')
+    del model
+
+    before = rss_mb()
+    start = time.perf_counter()
+    frame = pd.DataFrame({label: np.load(path) for label, path in paths.items()})
+    model = table_model.TableModel(frame)
+    show_edges(model)
+    elapsed = time.perf_counter() - start
+    print(f'{rows:>11,} rows, DataFrame: {elapsed * 1000:8.1f} ms, '
+          f'+{rss_mb() - before:7.1f} MB resident')
+
+
+def bench_arrow(directory: str, rows: int) -> None:
+    """Time opening and showing an uncompressed Arrow IPC file."""
+    import pyarrow as pa
+    path = os.path.join(directory, f'{rows}.arrow')
+    batch_rows = 1_000_000
+    schema = pa.schema([(f'col{col}', pa.float64()) for col in range(COLUMNS)])
+    with pa.ipc.new_file(path, schema) as writer:
+        for start in range(0, rows, batch_rows):
+            values = np.arange(start, min(start + batch_rows, rows), dtype=float)
+            writer.write_batch(pa.record_batch([values + col for col in range(COLUMNS)],
+                                               schema=schema))
+    before = rss_mb()
+    start = time.perf_counter()
+    model = table_model.TableModel(MappedStore.from_arrow(path))
+    show_edges(model)
+    elapsed = time.perf_counter() - start
+    print(f'{rows:>11,} rows, Arrow:     {elapsed * 1000:8.1f} ms, '
+          f'+{rss_mb() - before:7.1f} MB resident')
+
+
+def main():
+    """Entry point for this script."""
+    app = qt.QApplication.instance() or qt.QApplication([])
+    del app  # Unused, needed for the models
+    try:
+        import pyarrow
+    except ImportError:
+        pyarrow = None
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in SIZES:
+            bench_memmaps(write_files(directory, rows), rows)
+            if pyarrow is not None:
+                bench_arrow(directory, rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Benchmark sustained `TableModel.append_rows` throughput from a producer thread.
+
+A producer thread appends chunks of rows at a fixed rate, while the GUI
+thread commits them once per frame into a shown table that follows the
+tail. Reports the committed rows per second, the inserts per second and
+the largest backlog of buffered rows, which stays bounded while the
+table keeps up. For comparison, also times replacing the frame by `pd.concat` per chunk.
+
+Run with `python benchmarks/bench_streaming.py`.
+"""
+
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from qspreadsheet import qt
+from qspreadsheet import table_model
+from qspreadsheet import table_view
+
+COLUMNS = 10
+CHUNK_ROWS = 1_000
+DURATION = 3.0
+RATES = [50_000, 200_000, 1_000_000]
+CONCAT_CHUNKS = 200
+
+
+def make_chunk(rows: int, start: int = 0) -> pd.DataFrame:
+    """Chunk of ticks: a timestamp, prices and sizes."""
+    rng = np.random.default_rng(start)
+    data = {'time': pd.date_range('2021-01-01', periods=rows, freq='ms')}
+    for i in range(1, COLUMNS):
+        if i % 2:
+            data[f'price{i}'] = rng.random(rows) * 100
+        else:
+            data[f'size{i}'] = rng.integers(1, 1_000, rows)
+    return pd.DataFrame(data, index=np.arange(start, start + rows))
+
+
+def stream(app: qt.QApplication, chunks, rate: int) -> None:
+    """Feed a shown table at `rate` rows per second for `DURATION` seconds."""
+    model = table_model.TableModel(make_chunk(0))
+    view = table_view.TableView()
+    view.setModel(model)
+    view.resize(800, 600)
+    view.show()
+    committed = []
+    model.append_buffer.committed.connect(committed.append)
+    stop = threading.Event()
+    backlog = [0]
+
+    def produce():
+        start = time.perf_counter()
+        sent = 0
+        while not stop.is_set():
+            due = int((time.perf_counter() - start) * rate)
+            while sent + CHUNK_ROWS <= due:
+                model.append_rows(chunks[sent // CHUNK_ROWS % len(chunks)])
+                sent += CHUNK_ROWS
+            backlog[0] = max(backlog[0], model.append_buffer.pending_rows)
+            time.sleep(0.001)
+
+    producer = threading.Thread(target=produce)
+    start = time.perf_counter()
+    producer.start()
+    while time.perf_counter() - start < DURATION:
+        app.processEvents()
+        view.scrollToBottom()
+    stop.set()
+    producer.join()
+    elapsed = time.perf_counter() - start
+    rows = sum(committed)
+    print(f'append_rows at {rate:>9,} rows/s: {rows / elapsed:>11,.0f} rows/s committed, '
+          f'{len(committed) / elapsed:.0f} inserts/s, max backlog {backlog[0]:,} rows')
+    view.deleteLater()
+    model.deleteLater()
+
+
+def main():
+    """Entry point for this script."""
+    app = qt.QApplication.instance() or qt.QApplication([])
+    chunks = [make_chunk(CHUNK_ROWS, i) for i in range(16)]
+    for rate in RATES:
+        stream(app, chunks, rate)
+
+    model = table_model.TableModel(make_chunk(0))
+    frame = make_chunk(0)
+    start = time.perf_counter()
+    for i in range(CONCAT_CHUNKS):
+        frame = pd.concat([frame, chunks[i % len(chunks)]])
+        model.reset_data(frame)
+    elapsed = time.perf_counter() - start
+    print(f'pd.concat + reset_data per chunk: {CONCAT_CHUNKS * CHUNK_ROWS / elapsed:,.0f} rows/s '
+          f'over {CONCAT_CHUNKS * CHUNK_ROWS:,} rows')
+
+
+if __name__ == '__main__':
+    main()
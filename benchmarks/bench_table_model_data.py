@@ -0,0 +1,89 @@
+"""Benchmark `TableModel.data()` DisplayRole lookups.
+
+Compares the per-cell `DataFrame.iloc` lookup the model used to do with the
+model's own lookups, on a tall and on a wide frame. Cells are requested the
+way a view paints them: a 50 x 20 viewport scrolled down and back up.
+
+Run with `python benchmarks/bench_table_model_data.py`.
+"""
+
+import time
+from typing import Callable, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from qspreadsheet import qt
+from qspreadsheet import table_model
+
+VIEWPORT_ROWS = 50
+VIEWPORT_COLS = 20
+SCROLL_STEP = 10
+SCROLL_STEPS = 100
+
+
+def make_frame(rows: int, cols: int) -> pd.DataFrame:
+    """Mixed dtype frame with `rows` x `cols` cells."""
+    rng = np.random.default_rng(0)
+    data = {}
+    for i in range(cols):
+        kind = i % 3
+        if kind == 0:
+            data[f'c{i}'] = rng.integers(0, 1_000_000, rows)
+        elif kind == 1:
+            data[f'c{i}'] = rng.random(rows)
+        else:
+            data[f'c{i}'] = pd.date_range('2000-01-01', periods=rows, freq='s')
+    return pd.DataFrame(data)
+
+
+def viewport_cells(rows: int, cols: int) -> List[Tuple[int, int]]:
+    """Cells painted while scrolling a viewport from the middle, down and back up."""
+    top = rows // 2
+    first_col = cols // 2
+    tops = [top + i * SCROLL_STEP for i in range(SCROLL_STEPS)]
+    cells = []
+    for top in tops + tops[::-1]:
+        for row in range(top, min(top + VIEWPORT_ROWS, rows)):
+            for col in range(first_col, min(first_col + VIEWPORT_COLS, cols)):
+                cells.append((row, col))
+    return cells
+
+
+def calls_per_sec(func: Callable[[int, int], object], rows: int, cols: int) -> float:
+    """Call `func(row, col)` for every painted cell."""
+    cells = viewport_cells(rows, cols)
+    start = time.perf_counter()
+    for row, col in cells:
+        func(row, col)
+    return len(cells) / (time.perf_counter() - start)
+
+
+def run(name: str, rows: int, cols: int) -> None:
+    """Benchmark one frame shape."""
+    df = make_frame(rows, cols)
+    model = table_model.TableModel(df)
+
+    def model_data(row: int, col: int) -> object:
+        return model.data(model.index(row, col))
+
+    def iloc_data(row: int, col: int) -> object:
+        model.index(row, col)  # Same index construction cost as `model_data`
+        return str(df.iloc[row, col])
+
+    before = calls_per_sec(iloc_data, rows, cols)
+    after = calls_per_sec(model_data, rows, cols)
+    print(f'{name:<6} {rows:>9} x {cols:<4} iloc: {before:>12,.0f} calls/s   '
+          f'model: {after:>12,.0f} calls/s   x{after / before:.1f}')
+
+
+def main():
+    """Entry point for this script."""
+    app = qt.QApplication.instance() or qt.QApplication([])
+    del app  # Unused
+    run('tall', 2_000_000, 6)
+    run('wide', 1_000, 2_000)
+
+
+if __name__ == '__main__':
+    main()
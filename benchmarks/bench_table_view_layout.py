@@ -0,0 +1,69 @@
+"""Benchmark `TableView` layout time versus row count.
+
+Times a layout pass, a resize of a window holding the view, and compares
+`sizeHint()` with the loop over every row and column it used to do.
+
+Run with `python benchmarks/bench_table_view_layout.py`.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from qspreadsheet import qt
+from qspreadsheet import table_model
+from qspreadsheet import table_view
+
+ROW_COUNTS = [10_000, 100_000, 1_000_000, 3_000_000]
+COLUMNS = 10
+RESIZES = 20
+
+
+def loop_size_hint(view: qt.QTableView) -> qt.QSize:
+    """Size hint summing the size of every row and column."""
+    model = view.model()
+    width = 2 * view.frameWidth()
+    for i in range(model.columnCount(qt.QModelIndex())):
+        width += view.columnWidth(i)
+    height = 2 * view.frameWidth()
+    for i in range(model.rowCount(qt.QModelIndex())):
+        height += view.rowHeight(i)
+    return qt.QSize(width, height)
+
+
+def run(app: qt.QApplication, rows: int) -> None:
+    """Benchmark one row count."""
+    df = pd.DataFrame(np.zeros((rows, COLUMNS), dtype=np.int64))
+    window = qt.QWidget()
+    layout = qt.QVBoxLayout(window)
+    view = table_view.TableView(window)
+    layout.addWidget(view)
+    view.setModel(table_model.TableModel(df, view))
+    window.show()
+    app.processEvents()
+
+    start = time.perf_counter()
+    for i in range(RESIZES):
+        window.resize(400 + 10 * i, 300 + 10 * i)
+        view.invalidate_size_hint()
+        app.processEvents()
+    layout_ms = (time.perf_counter() - start) / RESIZES * 1000
+
+    start = time.perf_counter()
+    loop_size_hint(view)
+    loop_ms = (time.perf_counter() - start) * 1000
+    window.close()
+    print(f'{rows:>10,} rows   layout pass: {layout_ms:8.2f} ms   '
+          f'loop sizeHint: {loop_ms:10.2f} ms')
+
+
+def main():
+    """Entry point for this script."""
+    app = qt.QApplication.instance() or qt.QApplication([])
+    for rows in ROW_COUNTS:
+        run(app, rows)
+
+
+if __name__ == '__main__':
+    main()
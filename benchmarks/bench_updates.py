@@ -0,0 +1,78 @@
+"""Benchmark `TableModel.update_data` against a model reset, for ticking data.
+
+A fixed-shape frame has a small fraction of its cells changed per tick,
+shown in a table view repainted after each tick. Reports the time per
+tick and the number of `dataChanged` signals of the diff-driven update,
+with and without flashing, and the time per tick of replacing the data
+with `reset_data`.
+
+Run with `python benchmarks/bench_updates.py`.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from qspreadsheet import qt
+from qspreadsheet import table_model
+from qspreadsheet import table_view
+
+ROWS = 100_000
+COLUMNS = 10
+TICKS = 50
+CHANGED_FRACTION = 0.01
+
+
+def make_ticks() -> list:
+    """Frames differing from the previous one in a fraction of the cells."""
+    rng = np.random.default_rng(0)
+    values = rng.random((ROWS, COLUMNS))
+    frames = []
+    for _ in range(TICKS + 1):
+        changed = rng.random((ROWS, COLUMNS)) < CHANGED_FRACTION
+        values = np.where(changed, rng.random((ROWS, COLUMNS)), values)
+        frames.append(pd.DataFrame(values.copy()))
+    return frames
+
+
+def shown_view(app: qt.QApplication, model: table_model.TableModel) -> table_view.TableView:
+    """Show a view of the model, with its first paint done."""
+    view = table_view.TableView()
+    view.setModel(model)
+    view.resize(800, 600)
+    view.show()
+    app.processEvents()
+    return view
+
+
+def bench_ticks(app: qt.QApplication, frames: list, name: str, tick) -> None:
+    """Time `tick(model, view, frame)` plus the repaint, per tick."""
+    model = table_model.TableModel(frames[0])
+    view = shown_view(app, model)
+    signals = []
+    model.dataChanged.connect(lambda *args: signals.append(args))
+    start = time.perf_counter()
+    for frame in frames[1:]:
+        tick(model, view, frame)
+        app.processEvents()
+    elapsed = (time.perf_counter() - start) / TICKS
+    print(f'{name}: {elapsed * 1000:.1f} ms per tick, '
+          f'{len(signals) / TICKS:.1f} dataChanged per tick')
+    view.deleteLater()
+    model.deleteLater()
+
+
+def main():
+    """Entry point for this script."""
+    app = qt.QApplication.instance() or qt.QApplication([])
+    frames = make_ticks()
+    for flash in (False, True):
+        bench_ticks(app, frames, f'update_data (flash={flash})',
+                    lambda model, view, frame, flash=flash:
+                    model.update_data(frame, view.visible_rows(), flash))
+    bench_ticks(app, frames, 'reset_data', lambda model, view, frame: model.reset_data(frame))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Coercion of edited values to the dtype of the column they are written to."""
+
+from typing import Any, Sequence
+
+import numpy as np
+import pandas as pd
+
+from qspreadsheet import logging
+
+logger = logging.getLogger(__name__)
+
+TRUE_STRINGS = frozenset(['true', 't', 'yes', 'y', '1'])
+FALSE_STRINGS = frozenset(['false', 'f', 'no', 'n', '0'])
+
+
+def _as_series(values: Sequence[Any]) -> pd.Series:
+    """Series of the values, empty strings being missing."""
+    if isinstance(values, (np.ndarray, pd.api.extensions.ExtensionArray)) \
+            and values.dtype.kind not in 'OUS':
+        return pd.Series(values, copy=False)
+    series = pd.Series(np.asarray(values, dtype=object), dtype=object)
+    return series.mask(series.map(lambda v: isinstance(v, str) and not v.strip()))
+
+
+def _to_bool(series: pd.Series) -> pd.Series:
+    def convert(value: Any) -> Any:
+        if isinstance(value, str):
+            text = value.strip().lower()
+            if text in TRUE_STRINGS:
+                return True
+            if text in FALSE_STRINGS:
+                return False
+            raise ValueError(f'Cannot convert {value!r} to bool')
+        if pd.isna(value):
+            return None
+        if value in (0, 1):
+            return bool(value)
+        raise ValueError(f'Cannot convert {value!r} to bool')
+    return series.map(convert)
+
+
+def coerce_values(values: Sequence[Any], dtype: Any) -> Any:
+    """Convert values to `dtype`, for writing them into a column of that dtype.
+
+    Strings are parsed, empty strings are missing values. Values which the
+    dtype cannot hold exactly, like a float or a missing value for `int64`,
+    or a value outside the categories of a `category`, raise an error.
+
+    Args:
+        values (Sequence[Any]): Values to convert.
+        dtype (Any): NumPy or pandas dtype of the column.
+
+    Raises:
+        ValueError: If a value cannot be converted.
+        TypeError: If a value cannot be converted.
+
+    Returns:
+        Any: ndarray or pandas array of `dtype`.
+    """
+    dtype = pd.api.types.pandas_dtype(dtype)
+    if dtype == object:
+        result = np.empty(len(values), dtype=object)
+        result[:] = list(values)
+        return result
+    series = _as_series(values)
+    if isinstance(dtype, pd.CategoricalDtype):
+        result = pd.Categorical(series, dtype=dtype)
+        unknown = series.notna().to_numpy() & (result.codes < 0)
+        if unknown.any():
+            value = series[unknown].iloc[0]
+            raise ValueError(f'{value!r} is not one of the categories')
+        return result
+    if pd.api.types.is_bool_dtype(dtype):
+        series = _to_bool(series)
+    elif pd.api.types.is_datetime64_any_dtype(dtype):
+        series = pd.to_datetime(series)
+        tz = getattr(dtype, 'tz', None)
+        if tz is not None:
+            series = (series.dt.tz_localize(tz) if series.dt.tz is None
+                      else series.dt.tz_convert(tz))
+        elif series.dt.tz is not None:
+            series = series.dt.tz_convert(None)
+    elif pd.api.types.is_timedelta64_dtype(dtype):
+        series = pd.to_timedelta(series)
+    elif pd.api.types.is_numeric_dtype(dtype):
+        series = pd.to_numeric(series)
+    elif pd.api.types.is_string_dtype(dtype):
+        series = series.map(lambda v: v if pd.isna(v) else str(v))
+    if isinstance(dtype, np.dtype):
+        if dtype.kind in 'biu' and series.isna().any():
+            raise ValueError(f'Missing values are not allowed in a {dtype} column')
+        with np.errstate(invalid='ignore'):
+            result = series.to_numpy().astype(dtype)
+        if dtype.kind in 'iu' and not np.array_equal(result, series.to_numpy(dtype=float)):
+            raise ValueError(f'Values cannot be held exactly by a {dtype} column')
+        return result
+    return pd.array(series.astype(dtype), dtype=dtype)
+
+
+def coerce_value(value: Any, dtype: Any) -> Any:
+    """Convert a single value to `dtype`. See `coerce_values`.
+
+    Args:
+        value (Any): Value to convert.
+        dtype (Any): NumPy or pandas dtype of the column.
+
+    Returns:
+        Any: Array of `dtype`, holding the one value.
+    """
+    return coerce_values([value], dtype)
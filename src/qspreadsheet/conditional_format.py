@@ -0,0 +1,477 @@
+"""Vectorized conditional formats, producing colour codes per row."""
+
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from qspreadsheet import logging
+from qspreadsheet import qt
+from qspreadsheet.filters import as_series, to_mask
+
+logger = logging.getLogger(__name__)
+
+ColorLike = Union[str, qt.QColor]
+Predicate = Callable[[pd.Series], Any]
+# Code of the rows a rule leaves unformatted
+NO_COLOR = -1
+DEFAULT_SCALE_STEPS = 16
+
+
+def codes_from_mask(mask: np.ndarray) -> np.ndarray:
+    """Return colour codes setting colour 0 where a mask is True.
+
+    Args:
+        mask (ndarray): Boolean mask.
+
+    Returns:
+        ndarray: Colour codes, `NO_COLOR` where the mask is False.
+    """
+    return np.where(mask, 0, NO_COLOR).astype(np.int16)
+
+
+def interpolate_colors(low: qt.QColor, high: qt.QColor, steps: int) -> List[qt.QColor]:
+    """Return colours evenly spaced from `low` to `high`.
+
+    Args:
+        low (QColor): First colour.
+        high (QColor): Last colour.
+        steps (int): Number of colours.
+
+    Returns:
+        List[QColor]: Colours.
+    """
+    fractions = np.linspace(0, 1, steps)
+    low_rgba, high_rgba = np.array(low.getRgb()), np.array(high.getRgb())
+    rgba = np.rint(low_rgba + np.outer(fractions, high_rgba - low_rgba)).astype(int)
+    return [qt.QColor(*channels) for channels in rgba.tolist()]
+
+
+def is_numeric(dtype: Any) -> bool:
+    """Return whether a column dtype holds numbers, booleans excluded.
+
+    Args:
+        dtype (Any): NumPy or pandas dtype.
+
+    Returns:
+        bool: True for integer, float and complex dtypes.
+    """
+    return pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+
+
+class FormatRule:
+    """Conditional format of a column, evaluated as colour codes over the column values.
+
+    Codes index `colors`, `NO_COLOR` for values left unformatted. Rules
+    are either evaluated per value, so an edit evaluates only the edited
+    values, or are `column_wide`, depending on ranks or statistics of the
+    whole column. `numeric` rules only apply to columns of numbers.
+
+    Args:
+        role (Qt.ItemDataRole): Role the colours are shown with,
+            `BackgroundRole` or `ForegroundRole`.
+    """
+
+    column_wide = False
+    numeric = False
+
+    def __init__(self, role: qt.Qt.ItemDataRole = qt.Qt.BackgroundRole) -> None:
+        """Create FormatRule object.
+
+        Args:
+            role (Qt.ItemDataRole): Role the colours are shown with.
+        """
+        self.role = int(role)
+
+    def colors(self) -> List[qt.QColor]:
+        """Return the colours indexed by the codes.
+
+        Returns:
+            List[QColor]: Colours.
+        """
+        raise NotImplementedError
+
+    def codes(self, values: Sequence[Any]) -> np.ndarray:
+        """Return the colour code of each value.
+
+        Args:
+            values (Sequence[Any]): Column values, ndarray or pandas array.
+
+        Returns:
+            ndarray: Colour codes.
+        """
+        raise NotImplementedError
+
+    def __repr__(self) -> str:
+        args = ', '.join(f'{name}={value!r}' for name, value in vars(self).items())
+        return f'{self.__class__.__name__}({args})'
+
+
+class Condition(FormatRule):
+    """Colour the values for which a vectorized predicate is True.
+
+    After an edit the predicate is evaluated over the edited values only,
+    so it must not depend on other rows. Use a `column_wide` rule for that.
+
+    Args:
+        predicate (Predicate): Callable taking the values as a Series and
+            returning a boolean Series or mask, e.g. `lambda s: s > 100`.
+        color (ColorLike): Colour of the matching values.
+        role (Qt.ItemDataRole): Role the colour is shown with.
+    """
+
+    def __init__(self, predicate: Predicate, color: ColorLike,
+                 role: qt.Qt.ItemDataRole = qt.Qt.BackgroundRole) -> None:
+        """Create Condition rule.
+
+        Args:
+            predicate (Predicate): Vectorized predicate.
+            color (ColorLike): Colour of the matching values.
+            role (Qt.ItemDataRole): Role the colour is shown with.
+        """
+        super().__init__(role)
+        self.predicate = predicate
+        self.color = qt.QColor(color)
+
+    def colors(self) -> List[qt.QColor]:
+        return [self.color]
+
+    def codes(self, values: Sequence[Any]) -> np.ndarray:
+        result = self.predicate(as_series(values))
+        if isinstance(result, pd.Series):
+            return codes_from_mask(to_mask(result))
+        return codes_from_mask(np.asarray(result, dtype=bool))
+
+
+class Negative(Condition):
+    """Colour negative numbers, red text by default.
+
+    Args:
+        color (ColorLike): Colour of the negative values.
+        role (Qt.ItemDataRole): Role the colour is shown with.
+    """
+
+    def __init__(self, color: ColorLike = 'red',
+                 role: qt.Qt.ItemDataRole = qt.Qt.ForegroundRole) -> None:
+        """Create Negative rule.
+
+        Args:
+            color (ColorLike): Colour of the negative values.
+            role (Qt.ItemDataRole): Role the colour is shown with.
+        """
+        super().__init__(lambda series: series.lt(0), color, role)
+
+
+class ColorScale(FormatRule):
+    """Heatmap of numbers, from `low` at the column minimum to `high` at its maximum.
+
+    Args:
+        low (ColorLike): Colour of the minimum.
+        high (ColorLike): Colour of the maximum.
+        steps (int): Number of colours of the scale.
+        role (Qt.ItemDataRole): Role the colours are shown with.
+    """
+
+    column_wide = True
+    numeric = True
+
+    def __init__(self, low: ColorLike = 'white', high: ColorLike = 'red',
+                 steps: int = DEFAULT_SCALE_STEPS,
+                 role: qt.Qt.ItemDataRole = qt.Qt.BackgroundRole) -> None:
+        """Create ColorScale rule.
+
+        Args:
+            low (ColorLike): Colour of the minimum.
+            high (ColorLike): Colour of the maximum.
+            steps (int): Number of colours of the scale.
+            role (Qt.ItemDataRole): Role the colours are shown with.
+        """
+        if steps < 2:
+            raise ValueError(f'steps must be at least 2, got {steps}')
+        super().__init__(role)
+        self.low = qt.QColor(low)
+        self.high = qt.QColor(high)
+        self.steps = steps
+
+    def colors(self) -> List[qt.QColor]:
+        return interpolate_colors(self.low, self.high, self.steps)
+
+    def codes(self, values: Sequence[Any]) -> np.ndarray:
+        numbers = pd.to_numeric(as_series(values), errors='coerce').to_numpy(
+            dtype=float, na_value=np.nan)
+        codes = np.full(numbers.size, NO_COLOR, dtype=np.int16)
+        valid = np.isfinite(numbers)
+        if not valid.any():
+            return codes
+        low, high = numbers[valid].min(), numbers[valid].max()
+        scaled = (numbers[valid] - low) / (high - low) if high > low else np.zeros(valid.sum())
+        codes[valid] = np.rint(scaled * (self.steps - 1))
+        return codes
+
+
+class TopN(FormatRule):
+    """Colour the `n` largest, or smallest, values of the column.
+
+    Args:
+        n (int): Number of values.
+        color (ColorLike): Colour of the values.
+        largest (bool): Whether to colour the largest values.
+        role (Qt.ItemDataRole): Role the colour is shown with.
+    """
+
+    column_wide = True
+    numeric = True
+
+    def __init__(self, n: int, color: ColorLike = 'yellow', largest: bool = True,
+                 role: qt.Qt.ItemDataRole = qt.Qt.BackgroundRole) -> None:
+        """Create TopN rule.
+
+        Args:
+            n (int): Number of values.
+            color (ColorLike): Colour of the values.
+            largest (bool): Whether to colour the largest values.
+            role (Qt.ItemDataRole): Role the colour is shown with.
+        """
+        super().__init__(role)
+        self.n = n
+        self.color = qt.QColor(color)
+        self.largest = largest
+
+    def colors(self) -> List[qt.QColor]:
+        return [self.color]
+
+    def codes(self, values: Sequence[Any]) -> np.ndarray:
+        series = as_series(values)
+        top = series.nlargest(self.n) if self.largest else series.nsmallest(self.n)
+        mask = np.zeros(series.size, dtype=bool)
+        mask[top.index.to_numpy()] = True
+        return codes_from_mask(mask)
+
+
+class Duplicates(FormatRule):
+    """Colour the values occurring more than once in the column.
+
+    Args:
+        color (ColorLike): Colour of the duplicated values.
+        role (Qt.ItemDataRole): Role the colour is shown with.
+    """
+
+    column_wide = True
+
+    def __init__(self, color: ColorLike = 'orange',
+                 role: qt.Qt.ItemDataRole = qt.Qt.BackgroundRole) -> None:
+        """Create Duplicates rule.
+
+        Args:
+            color (ColorLike): Colour of the duplicated values.
+            role (Qt.ItemDataRole): Role the colour is shown with.
+        """
+        super().__init__(role)
+        self.color = qt.QColor(color)
+
+    def colors(self) -> List[qt.QColor]:
+        return [self.color]
+
+    def codes(self, values: Sequence[Any]) -> np.ndarray:
+        series = as_series(values)
+        duplicated = series.duplicated(keep=False).to_numpy() & series.notna().to_numpy()
+        return codes_from_mask(duplicated)
+
+
+ColorKey = Tuple[int, int]
+
+
+class FormatEngine:
+    """Per-column conditional formats, cached as colour codes per data row.
+
+    The rules of a column are evaluated per role into one array of colour
+    codes, the first matching rule winning, and a palette. Colours are then
+    looked up by data row, so sorting and filtering evaluate nothing. Edited
+    values are evaluated again only over the edited rows, unless the column
+    has a `column_wide` rule, in which case the column is evaluated again.
+
+    Args:
+        column_values (Callable[[int], Sequence[Any]]): Callable returning the
+            values of a column, by column number.
+        take_values (Callable[[int, ndarray], Sequence[Any]]): Callable
+            returning the values of some data rows of a column.
+        column_dtype (Callable[[int], Any], optional): Callable returning the
+            dtype of a column, to check `numeric` rules against. If None,
+            rules are not checked.
+    """
+
+    def __init__(self, column_values: Callable[[int], Sequence[Any]],
+                 take_values: Callable[[int, np.ndarray], Sequence[Any]],
+                 column_dtype: Optional[Callable[[int], Any]] = None) -> None:
+        """Create FormatEngine object.
+
+        Args:
+            column_values (Callable[[int], Sequence[Any]]): Column values getter.
+            take_values (Callable[[int, ndarray], Sequence[Any]]): Rows values getter.
+            column_dtype (Callable[[int], Any], optional): Column dtype getter.
+        """
+        self._column_values = column_values
+        self._take_values = take_values
+        self._column_dtype = column_dtype
+        self._rules: Dict[int, List[FormatRule]] = {}
+        # Codes and palette per (column, role), None if no rule of the role
+        self._codes: Dict[ColorKey, Optional[Tuple[np.ndarray, List[qt.QColor]]]] = {}
+
+    @property
+    def rules(self) -> Dict[int, List[FormatRule]]:
+        """Rules by column number."""
+        return {col: list(rules) for col, rules in self._rules.items()}
+
+    def set_rules(self, col: int, rules: Sequence[FormatRule]) -> None:
+        """Set the rules of a column, the first matching rule winning.
+
+        Args:
+            col (int): Column number.
+            rules (Sequence[FormatRule]): Rules, empty to remove them.
+
+        Raises:
+            TypeError: If a `numeric` rule is set on a column of other values.
+        """
+        if rules and self._column_dtype is not None:
+            dtype = self._column_dtype(col)
+            for rule in rules:
+                if rule.numeric and not is_numeric(dtype):
+                    raise TypeError(f'{type(rule).__name__} needs a numeric column, '
+                                    f'column {col} is {dtype}')
+        if rules:
+            self._rules[col] = list(rules)
+        else:
+            self._rules.pop(col, None)
+        self._drop(col)
+
+    def clear(self) -> None:
+        """Remove all rules."""
+        self._rules.clear()
+        self._codes.clear()
+
+    def refresh(self, col: int) -> None:
+        """Evaluate the rules of a column again, after its values or dtype changed.
+
+        `numeric` rules are dropped, with a warning, from a column no longer
+        holding numbers.
+
+        Args:
+            col (int): Column number.
+        """
+        rules = self._rules.get(col)
+        if rules and self._column_dtype is not None:
+            dtype = self._column_dtype(col)
+            if not is_numeric(dtype):
+                kept = [rule for rule in rules if not rule.numeric]
+                if len(kept) < len(rules):
+                    logger.warning('Numeric format rules of column {} dropped, now {}'.format(
+                        col, dtype))
+                    self._rules[col] = kept
+                    if not kept:
+                        del self._rules[col]
+        self._drop(col)
+
+    def color(self, row: int, col: int, role: int) -> Optional[qt.QColor]:
+        """Return the colour of a cell for a role.
+
+        Args:
+            row (int): Data row.
+            col (int): Column number.
+            role (int): `BackgroundRole` or `ForegroundRole`.
+
+        Returns:
+            QColor, optional: Colour, None if no rule matches.
+        """
+        if col not in self._rules:
+            return None
+        key = (col, int(role))
+        if key not in self._codes:
+            self._codes[key] = self._evaluate(col, key[1])
+        cached = self._codes[key]
+        if cached is None:
+            return None
+        codes, palette = cached
+        code = codes[row]
+        return None if code < 0 else palette[code]
+
+    def update_rows(self, col: int, rows: np.ndarray) -> bool:
+        """Evaluate the rules of a column again, after values of some rows changed.
+
+        Args:
+            col (int): Column number.
+            rows (ndarray): Changed data rows.
+
+        Returns:
+            bool: True if colours of other rows may have changed, when the
+                column has a `column_wide` rule.
+        """
+        rules = self._rules.get(col)
+        if rules is None:
+            return False
+        if any(rule.column_wide for rule in rules):
+            self._drop(col)
+            return True
+        values = None
+        for key, cached in self._codes.items():
+            if key[0] != col or cached is None:
+                continue
+            if values is None:
+                values = self._take_values(col, rows)
+            cached[0][rows] = self._combine(col, key[1], values)[0]
+        return False
+
+    def insert_rows(self, row: int, count: int) -> None:
+        """Insert rows into the colour codes, evaluating the inserted rows.
+
+        Args:
+            row (int): Data row where rows were inserted.
+            count (int): Number of inserted rows.
+        """
+        rows = np.arange(row, row + count)
+        for col in list(self._rules):
+            if any(rule.column_wide for rule in self._rules[col]):
+                self._drop(col)
+                continue
+            for key in [key for key in self._codes if key[0] == col]:
+                cached = self._codes[key]
+                if cached is not None:
+                    codes = np.insert(cached[0], row, NO_COLOR)
+                    codes[rows] = self._combine(col, key[1], self._take_values(col, rows))[0]
+                    self._codes[key] = (codes, cached[1])
+
+    def remove_rows(self, rows: np.ndarray) -> None:
+        """Remove rows from the colour codes.
+
+        Args:
+            rows (ndarray): Removed data rows.
+        """
+        for col in list(self._rules):
+            if any(rule.column_wide for rule in self._rules[col]):
+                self._drop(col)
+                continue
+            for key in [key for key in self._codes if key[0] == col]:
+                cached = self._codes[key]
+                if cached is not None:
+                    self._codes[key] = (np.delete(cached[0], rows), cached[1])
+
+    def _drop(self, col: int) -> None:
+        for key in [key for key in self._codes if key[0] == col]:
+            del self._codes[key]
+
+    def _evaluate(self, col: int, role: int) -> Optional[Tuple[np.ndarray, List[qt.QColor]]]:
+        if not any(rule.role == role for rule in self._rules[col]):
+            return None
+        return self._combine(col, role, self._column_values(col))
+
+    def _combine(self, col: int, role: int,
+                 values: Sequence[Any]) -> Tuple[np.ndarray, List[qt.QColor]]:
+        combined = np.full(len(values), NO_COLOR, dtype=np.int16)
+        palette: List[qt.QColor] = []
+        for rule in self._rules[col]:
+            if rule.role != role:
+                continue
+            codes = rule.codes(values)
+            matching = (combined < 0) & (codes >= 0)
+            combined[matching] = codes[matching] + len(palette)
+            palette.extend(rule.colors())
+        return combined, palette
@@ -0,0 +1,588 @@
+"""Tabular data sources read in column blocks: pandas, NumPy structured arrays and Polars."""
+
+from typing import Any, List, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from qspreadsheet import logging
+from qspreadsheet import sorting
+from qspreadsheet.filters import Contains, Equals, Filter, IsIn, IsNull, NotNull, Range
+from qspreadsheet.row_store import MIN_CAPACITY, RowStore, column_values, concat_values, grow
+from qspreadsheet.types import DF
+
+logger = logging.getLogger(__name__)
+
+
+def import_polars() -> Any:
+    """Return the `polars` module, an optional dependency.
+
+    Raises:
+        ImportError: If polars is not installed.
+    """
+    try:
+        import polars
+    except ImportError as exc:
+        raise ImportError('Reading Polars data requires polars') from exc
+    return polars
+
+
+class DataSource:
+    """Tabular data, read in blocks of rows per column in its native way.
+
+    Subclasses set the column labels and dtypes, and return the values of
+    rows of a column with `block` and `take`, as an ndarray or pandas array
+    of the column dtype. A source may also sort and filter its rows itself,
+    see `argsort` and `filter_mask`. Returning None leaves it to the model.
+
+    Use `as_source` to wrap a pandas or Polars DataFrame or a NumPy
+    structured array.
+    """
+
+    def __init__(self) -> None:
+        """Create DataSource object."""
+        self.columns = pd.Index([])
+        self.dtypes: List[Any] = []
+
+    @property
+    def row_count(self) -> int:
+        """Number of rows."""
+        raise NotImplementedError
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        """Number of rows and columns."""
+        return self.row_count, self.columns.size
+
+    def index(self) -> pd.Index:
+        """Return the row labels, positional unless overridden."""
+        return pd.RangeIndex(self.row_count)
+
+    def block(self, col: int, start: int, stop: int) -> Any:
+        """Return rows `[start, stop)` of a column.
+
+        Args:
+            col (int): Column number.
+            start (int): First row.
+            stop (int): One past the last row.
+
+        Returns:
+            Any: ndarray or pandas array of the column dtype.
+        """
+        raise NotImplementedError
+
+    def take(self, col: int, rows: np.ndarray) -> Any:
+        """Return the values of some rows of a column.
+
+        Args:
+            col (int): Column number.
+            rows (ndarray): Row numbers.
+
+        Returns:
+            Any: ndarray or pandas array of the column dtype.
+        """
+        return self.block(col, 0, self.row_count).take(rows)
+
+    def argsort(self, columns: Sequence[int], ascending: Sequence[bool]) -> Optional[np.ndarray]:
+        """Return the permutation sorting the rows, like `sorting.argsort`.
+
+        Args:
+            columns (Sequence[int]): Column numbers, most significant first.
+            ascending (Sequence[bool]): Sort direction of each column.
+
+        Returns:
+            ndarray, optional: Rows in sorted order, None to let the model sort.
+        """
+        del columns, ascending  # Unused
+        return None
+
+    def filter_mask(self, col: int, column_filter: Filter) -> Optional[np.ndarray]:
+        """Return the mask of the rows of a column passing a filter.
+
+        Args:
+            col (int): Column number.
+            column_filter (Filter): Filter of the column.
+
+        Returns:
+            ndarray, optional: Boolean mask, None to let the model filter.
+        """
+        del col, column_filter  # Unused
+        return None
+
+
+class PandasSource(DataSource):
+    """Source over the columns of a pandas DataFrame, without copying them.
+
+    Args:
+        frame (DataFrame): Data.
+    """
+
+    def __init__(self, frame: DF) -> None:
+        """Create PandasSource object.
+
+        Args:
+            frame (DataFrame): Data.
+        """
+        super().__init__()
+        self._frame = frame
+        self.columns = frame.columns
+        self.dtypes = list(frame.dtypes)
+        self._values = [column_values(frame.iloc[:, i]) for i in range(frame.columns.size)]
+
+    @property
+    def row_count(self) -> int:
+        return self._frame.index.size
+
+    def index(self) -> pd.Index:
+        return self._frame.index
+
+    def block(self, col: int, start: int, stop: int) -> Any:
+        return self._values[col][start:stop]
+
+    def take(self, col: int, rows: np.ndarray) -> Any:
+        return self._values[col].take(rows)
+
+
+class NumpySource(DataSource):
+    """Source over the fields of a NumPy structured array, without copying them.
+
+    Blocks are views of the fields, so a structured `numpy.memmap` is read
+    as rows are shown. Datetime-like fields are returned as pandas arrays.
+
+    Args:
+        array (ndarray): One-dimensional structured array, one column per field.
+    """
+
+    def __init__(self, array: np.ndarray) -> None:
+        """Create NumpySource object.
+
+        Args:
+            array (ndarray): One-dimensional structured array.
+
+        Raises:
+            ValueError: If the array is not one-dimensional and structured,
+                with a scalar per field.
+        """
+        super().__init__()
+        if array.dtype.names is None or array.ndim != 1:
+            raise ValueError('Expected a one-dimensional structured array')
+        shaped = [name for name in array.dtype.names if array.dtype[name].shape]
+        if shaped:
+            raise ValueError(f'Fields {shaped} are not scalars')
+        self._array = array
+        self.columns = pd.Index(array.dtype.names)
+        self.dtypes = [self.block(col, 0, 0).dtype for col in range(self.columns.size)]
+
+    @property
+    def row_count(self) -> int:
+        return self._array.size
+
+    def block(self, col: int, start: int, stop: int) -> Any:
+        return self._convert(self._array[self.columns[col]][start:stop])
+
+    def take(self, col: int, rows: np.ndarray) -> Any:
+        return self._convert(self._array[self.columns[col]].take(rows))
+
+    @staticmethod
+    def _convert(values: np.ndarray) -> Any:
+        if values.dtype.kind in 'mM':
+            return column_values(pd.Series(values))
+        return values
+
+
+class PolarsSource(DataSource):
+    """Source over a Polars DataFrame, converting only the rows read.
+
+    Values have the dtype pandas would give the whole column: integer
+    columns with missing values are float, bool columns with missing values
+    are object, and strings are objects. A block of a numeric column within
+    one chunk and without missing values is a zero-copy view.
+
+    Sorting is pushed down to Polars' multithreaded `arg_sort_by`, and
+    equality, range, membership, missing-value and text filters to Polars
+    expressions. Other filters are evaluated by the model.
+
+    Args:
+        frame (polars.DataFrame): Data.
+    """
+
+    def __init__(self, frame: Any) -> None:
+        """Create PolarsSource object.
+
+        Args:
+            frame (polars.DataFrame): Data.
+
+        Raises:
+            ImportError: If polars is not installed.
+        """
+        super().__init__()
+        import_polars()
+        self._frame = frame
+        self._series = frame.get_columns()
+        self.columns = pd.Index(frame.columns)
+        self.dtypes = []
+        for series in self._series:
+            dtype = self._to_numpy(series.slice(0, 0)).dtype
+            if series.null_count() and isinstance(dtype, np.dtype):
+                if dtype.kind in 'iu':
+                    dtype = np.dtype(float)
+                elif dtype.kind == 'b':
+                    dtype = np.dtype(object)
+            self.dtypes.append(dtype)
+
+    @property
+    def row_count(self) -> int:
+        return self._frame.height
+
+    def block(self, col: int, start: int, stop: int) -> Any:
+        start = min(start, self.row_count)
+        return self._convert(col, self._series[col].slice(start, max(stop - start, 0)))
+
+    def take(self, col: int, rows: np.ndarray) -> Any:
+        return self._convert(col, self._series[col].gather(np.asarray(rows)))
+
+    def argsort(self, columns: Sequence[int], ascending: Sequence[bool]) -> Optional[np.ndarray]:
+        pl = import_polars()
+        keys = []
+        for col in columns:
+            key = pl.col(self._frame.columns[col])
+            if self._series[col].dtype.is_float():
+                # NaN sorts above all numbers in Polars, missing values go last here
+                key = key.fill_nan(None)
+            keys.append(key)
+        order = self._frame.select(pl.arg_sort_by(
+            keys, descending=[not direction for direction in ascending],
+            nulls_last=True, maintain_order=True)).to_series()
+        return order.to_numpy().astype(np.intp)
+
+    def filter_mask(self, col: int, column_filter: Filter) -> Optional[np.ndarray]:
+        expression = self._filter_expression(col, column_filter)
+        if expression is None:
+            return None
+        try:
+            result = self._frame.select(expression.fill_null(False)).to_series()
+        except Exception:
+            # Polars raises its own errors for values it cannot compare
+            logger.debug('Filter {!r} evaluated by the model'.format(column_filter))
+            return None
+        return result.to_numpy().astype(bool)
+
+    def _filter_expression(self, col: int, column_filter: Filter) -> Any:
+        """Return a Polars expression for a filter, None if it has none."""
+        pl = import_polars()
+        values = pl.col(self._frame.columns[col])
+        dtype = self._series[col].dtype
+        missing = values.is_null()
+        if dtype.is_float():
+            missing = missing | values.is_nan()
+        # Exact types only, subclasses may mask differently
+        kind = type(column_filter)
+        if kind is Equals:
+            return values == column_filter.value
+        if kind is Range:
+            expression = ~missing
+            if column_filter.lower is not None:
+                expression &= (values >= column_filter.lower if column_filter.inclusive
+                               else values > column_filter.lower)
+            if column_filter.upper is not None:
+                expression &= (values <= column_filter.upper if column_filter.inclusive
+                               else values < column_filter.upper)
+            return expression
+        if kind is IsIn:
+            return values.is_in(list(column_filter.values))
+        if kind is IsNull:
+            return missing
+        if kind is NotNull:
+            return ~missing
+        if kind is Contains and dtype == pl.String:
+            text = column_filter.text
+            if not column_filter.case:
+                if not column_filter.regex:
+                    return values.str.to_lowercase().str.contains(text.lower(), literal=True)
+                text = '(?i)' + text
+            return values.str.contains(text, literal=not column_filter.regex)
+        return None
+
+    @staticmethod
+    def _to_numpy(series: Any) -> Any:
+        values = series.to_numpy()
+        if values.dtype.kind in 'mM':
+            return column_values(pd.Series(values))
+        return values
+
+    def _convert(self, col: int, series: Any) -> Any:
+        values = self._to_numpy(series)
+        dtype = self.dtypes[col]
+        if values.dtype != dtype:
+            values = values.astype(dtype)
+        return values
+
+
+def as_source(data: Any) -> DataSource:
+    """Return a source over tabular data.
+
+    Args:
+        data (Any): A `DataSource`, a pandas or Polars DataFrame, or a NumPy
+            structured array.
+
+    Raises:
+        TypeError: If the data is of none of these types.
+
+    Returns:
+        DataSource: Source over the data.
+    """
+    if isinstance(data, DataSource):
+        return data
+    if isinstance(data, pd.DataFrame):
+        return PandasSource(data)
+    if isinstance(data, np.ndarray):
+        return NumpySource(data)
+    # Checked by module, so polars is only imported for its own frames
+    if type(data).__module__.split('.')[0] == 'polars' and type(data).__name__ == 'DataFrame':
+        return PolarsSource(data)
+    raise TypeError(f'Cannot show data of type {type(data).__name__}')
+
+
+class SourceColumn:
+    """Column of a `DataSource`, holding its edits and added rows in memory.
+
+    Rows `[0, row_count)` are the source rows, read as they are accessed.
+    Written source rows are kept in a sparse overlay, their sorted row
+    numbers and values, patched into the values read. Rows after the source
+    rows are added rows, in an array of their own. The source is never
+    written.
+
+    Args:
+        source (DataSource): Source of the rows.
+        col (int): Column number.
+    """
+
+    def __init__(self, source: DataSource, col: int) -> None:
+        """Create SourceColumn object.
+
+        Args:
+            source (DataSource): Source of the rows.
+            col (int): Column number.
+        """
+        self._source = source
+        self._col = col
+        # Written source rows, sorted, and their values
+        self._edited_rows = np.empty(0, dtype=np.intp)
+        self._edited_values = self._filled(None, 0)
+        self._added = self._filled(None, 0)
+
+    @property
+    def dtype(self) -> Any:
+        """Column dtype, as the source has it now."""
+        return self._source.dtypes[self._col]
+
+    @property
+    def edited_rows(self) -> np.ndarray:
+        """Sorted source rows written, held in memory."""
+        return self._edited_rows
+
+    def __len__(self) -> int:
+        return self._source.row_count + len(self._added)
+
+    def __getitem__(self, key: Any) -> Any:
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                return self.take(np.arange(start, stop, step))
+            return self._range(start, max(start, stop))
+        if isinstance(key, (int, np.integer)):
+            row = int(key) + len(self) if key < 0 else int(key)
+            if not 0 <= row < len(self):
+                raise IndexError(f'Row {key} is out of bounds for {len(self)} rows')
+            return self._range(row, row + 1)[0]
+        return self.take(key)
+
+    def __setitem__(self, key: Any, values: Any) -> None:
+        rows = np.asarray(key, dtype=np.intp).reshape(-1)
+        scalar = np.ndim(values) == 0
+        count = self._source.row_count
+        added = rows >= count
+        if added.any():
+            self._added[rows[added] - count] = values if scalar else values[added]
+            if added.all():
+                return
+            rows = rows[~added]
+            if not scalar:
+                values = values[~added]
+        new = self._filled(values, rows.size) if scalar else self._filled(values)
+        order = np.argsort(rows, kind='stable')
+        rows, new = rows[order], new.take(order)
+        positions = np.searchsorted(self._edited_rows, rows)
+        edited = positions < self._edited_rows.size
+        edited[edited] = self._edited_rows[positions[edited]] == rows[edited]
+        if edited.any():
+            self._edited_values[positions[edited]] = new[edited]
+        if not edited.all():
+            merged = np.concatenate((self._edited_rows, rows[~edited]))
+            # Two sorted runs, merged in linear time
+            order = np.argsort(merged, kind='stable')
+            self._edited_rows = merged[order]
+            self._edited_values = concat_values(
+                [self._edited_values, new[~edited]]).take(order)
+
+    def take(self, indices: Sequence[int], allow_fill: bool = False) -> Any:
+        """Return the values of some rows.
+
+        Args:
+            indices (Sequence[int]): Row numbers.
+            allow_fill (bool): Unused, rows are never blank.
+
+        Returns:
+            Any: ndarray or pandas array of `dtype`.
+        """
+        del allow_fill  # Unused
+        rows = np.asarray(indices, dtype=np.intp)
+        count = self._source.row_count
+        added = rows >= count
+        if not added.any():
+            return self._take_source(rows)
+        if added.all():
+            return self._added.take(rows - count)
+        values = concat_values([self._take_source(rows[~added]),
+                                self._added.take(rows[added] - count)])
+        order = np.argsort(added, kind='stable')
+        inverse = np.empty_like(order)
+        inverse[order] = np.arange(order.size)
+        return values.take(inverse)
+
+    def reserve(self, count: int) -> None:
+        """Make room for `count` added rows, blank until written.
+
+        Args:
+            count (int): Number of added rows.
+        """
+        if count > len(self._added):
+            self._added = grow(self._added, len(self._added), count)
+
+    def _filled(self, values: Any, count: Optional[int] = None) -> Any:
+        """Return values, or `count` times a value, as an array of `dtype`."""
+        index = None if count is None else pd.RangeIndex(count)
+        # Values of the dtype are wrapped, not copied
+        return column_values(pd.Series(values, index=index, dtype=self.dtype))
+
+    def _range(self, start: int, stop: int) -> Any:
+        count = self._source.row_count
+        if start >= count:
+            return self._added[start - count:stop - count]
+        values = self._source.block(self._col, start, min(stop, count))
+        first, last = np.searchsorted(self._edited_rows, [start, min(stop, count)])
+        if first < last:
+            values = _writable(values)
+            values[self._edited_rows[first:last] - start] = self._edited_values[first:last]
+        if stop > count:
+            values = concat_values([values, self._added[:stop - count]])
+        return values
+
+    def _take_source(self, rows: np.ndarray) -> Any:
+        values = self._source.take(self._col, rows)
+        if self._edited_rows.size and rows.size:
+            positions = np.searchsorted(self._edited_rows, rows)
+            edited = positions < self._edited_rows.size
+            edited[edited] = self._edited_rows[positions[edited]] == rows[edited]
+            if edited.any():
+                values = _writable(values)
+                values[edited] = self._edited_values.take(positions[edited])
+        return values
+
+
+def _writable(values: Any) -> Any:
+    """Return a copy of values read from a source, a plain ndarray for memmaps."""
+    return np.array(values) if isinstance(values, np.ndarray) else values.copy()
+
+
+class SourceStore(RowStore):
+    """Row store over a `DataSource`, reading blocks of rows as they are shown.
+
+    The data is not converted when the store is created. While the rows and
+    the sorted or filtered columns are as in the source, sorting and
+    filtering are pushed down to the source when it supports them.
+
+    The source is never written and its columns are never copied. Written
+    cells are held in memory, per column in a sparse overlay of the written
+    rows, see `SourceColumn`. Inserted rows are held in arrays of their own,
+    grown by doubling, and removed rows are only dropped from the row order.
+    Memory thus grows with the cells written and the rows inserted, not
+    with the size of the source. Sorting, filtering, searching or formatting
+    a column still reads it whole.
+
+    Stores over files build on it, with sources of their own: `MappedStore`
+    over memory-mapped Arrow files and NumPy memmaps, and the read-only
+    `FileStore` over pages of Parquet and CSV files.
+
+    Args:
+        source (DataSource): Source of the rows.
+    """
+
+    def __init__(self, source: DataSource) -> None:
+        """Create SourceStore object.
+
+        Args:
+            source (DataSource): Source of the rows.
+        """
+        self._source = source
+        self._version = 0
+        self._written: Set[int] = set()
+        self._reset(source.columns,
+                    [SourceColumn(source, col) for col in range(source.columns.size)],
+                    source.index())
+        self._source_version = self._version
+
+    @property
+    def source(self) -> DataSource:
+        """Source of the rows."""
+        return self._source
+
+    def argsort(self, columns: Sequence[int],
+                ascending: Union[bool, Sequence[bool]] = True) -> np.ndarray:
+        ascending = sorting.sort_directions(ascending, len(columns))
+        if columns and self._in_source(columns):
+            order = self._source.argsort(columns, ascending)
+            if order is not None:
+                return order
+        return super().argsort(columns, ascending)
+
+    def filter_mask(self, col: int, column_filter: Filter) -> np.ndarray:
+        if self._in_source([col]):
+            mask = self._source.filter_mask(col, column_filter)
+            if mask is not None:
+                return mask
+        return super().filter_mask(col, column_filter)
+
+    def write(self, col: int, rows: np.ndarray, values: Any) -> None:
+        self._written.add(col)
+        super().write(col, rows, values)
+
+    def _over_source(self) -> bool:
+        """Whether the columns are those of the source, not of a DataFrame set by `reset`."""
+        return bool(self._columns) and isinstance(self._columns[0], SourceColumn)
+
+    def _reserve(self, count: int) -> None:
+        needed = self._size + count
+        if needed <= self._capacity or not self._over_source():
+            super()._reserve(count)
+            return
+        # Only the added rows grow, by doubling
+        source_rows = self._source.row_count
+        added = max(needed - source_rows, 2 * (self._capacity - source_rows), MIN_CAPACITY)
+        for column in self._columns:
+            column.reserve(added)
+        capacity = source_rows + added
+        if self._index is not None:
+            self._index = grow(self._index, self._size, capacity)
+        self._capacity = capacity
+
+    def _compact(self) -> None:
+        if not self._over_source():
+            super()._compact()
+            return
+        # Removed rows stay in the source, they are only dropped from the row map
+        self._garbage = 0
+
+    def _in_source(self, columns: Sequence[int]) -> bool:
+        """Whether the rows and the values of columns are those of the source."""
+        return self._version == self._source_version and self._written.isdisjoint(columns)
@@ -0,0 +1,259 @@
+"""Cell delegates painting display strings by column dtype."""
+
+from typing import Any, Dict, Iterable, Optional, Tuple, Type
+
+import pandas as pd
+
+from qspreadsheet import qt
+
+# Cached widths and elided strings per font, cleared when full
+TEXT_CACHE_SIZE = 4096
+# Padding on both sides of the text
+TEXT_MARGIN = 4
+CHECKED_GLYPH = '\u2611'
+UNCHECKED_GLYPH = '\u2610'
+
+
+class TextMetrics:
+    """Widths and elided strings of texts in one font, cached.
+
+    Args:
+        font (QFont): Font of the texts.
+        cache_size (int): Number of widths and elided strings kept.
+    """
+
+    def __init__(self, font: qt.QFont, cache_size: int = TEXT_CACHE_SIZE) -> None:
+        """Create TextMetrics object.
+
+        Args:
+            font (QFont): Font of the texts.
+            cache_size (int): Number of widths and elided strings kept.
+        """
+        self.font = qt.QFont(font)
+        self._metrics = qt.QFontMetrics(font)
+        self._cache_size = cache_size
+        self._advances: Dict[str, int] = {}
+        self._elided: Dict[Tuple[str, int], str] = {}
+        self.ascent = self._metrics.ascent()
+        self.height = self._metrics.height()
+
+    def advance(self, text: str) -> int:
+        """Return the width of a text.
+
+        Args:
+            text (str): Text to measure.
+
+        Returns:
+            int: Width in pixels.
+        """
+        width = self._advances.get(text)
+        if width is None:
+            if len(self._advances) >= self._cache_size:
+                self._advances.clear()
+            width = self._advances[text] = self._metrics.horizontalAdvance(text)
+        return width
+
+    def elide(self, text: str, width: int) -> str:
+        """Return a text elided on the right to fit a width.
+
+        Args:
+            text (str): Text to fit.
+            width (int): Available width in pixels.
+
+        Returns:
+            str: The text itself if it fits, else its elided form.
+        """
+        if self.advance(text) <= width:
+            return text
+        key = (text, width)
+        elided = self._elided.get(key)
+        if elided is None:
+            if len(self._elided) >= self._cache_size:
+                self._elided.clear()
+            elided = self._elided[key] = self._metrics.elidedText(text, qt.Qt.ElideRight, width)
+        return elided
+
+
+class CellDelegate(qt.QStyledItemDelegate):
+    """Delegate painting the display string of a cell, left aligned.
+
+    Models providing `display_data(row, column)` are painted from that one
+    call per cell, instead of one `data()` call per role. Alignment comes
+    from the delegate and font and colours from the view, and texts are
+    measured and elided through a cached `TextMetrics`. Other models are
+    painted by `QStyledItemDelegate`. Editing is left to `QStyledItemDelegate`.
+
+    Args:
+        parent (QObject): Optional parent for this delegate.
+    """
+
+    alignment = qt.Qt.AlignLeft
+
+    def __init__(self, parent: Optional[qt.QObject] = None) -> None:
+        """Create CellDelegate object.
+
+        Args:
+            parent (QObject): Optional parent for this delegate.
+        """
+        super().__init__(parent)
+        self._text_metrics: Optional[TextMetrics] = None
+
+    @classmethod
+    def for_dtype(cls, dtype: Any, parent: Optional[qt.QObject] = None) -> 'CellDelegate':
+        """Create a delegate for the columns of a dtype.
+
+        Args:
+            dtype (Any): Column dtype.
+            parent (QObject): Optional parent for the delegate.
+
+        Returns:
+            CellDelegate: New delegate.
+        """
+        del dtype  # Unused
+        return cls(parent)
+
+    def text_metrics(self, font: qt.QFont) -> TextMetrics:
+        """Return the cached metrics of a font, created again when the font changes.
+
+        Args:
+            font (QFont): Font of the cells.
+
+        Returns:
+            TextMetrics: Cached metrics.
+        """
+        if self._text_metrics is None or self._text_metrics.font != font:
+            self._text_metrics = TextMetrics(font)
+        return self._text_metrics
+
+    def display_text(self, text: str) -> str:
+        """Return the text painted for a display string.
+
+        Args:
+            text (str): Display string from the model.
+
+        Returns:
+            str: Painted text.
+        """
+        return text
+
+    def paint(self, painter: qt.QPainter, option: qt.QStyleOptionViewItem,
+              index: qt.QModelIndex) -> None:
+        display_data = getattr(index.model(), 'display_data', None)
+        if display_data is None:
+            super().paint(painter, option, index)
+            return
+        text, foreground, background = display_data(index.row(), index.column())
+        widget = option.widget
+        style = qt.QApplication.style() if widget is None else widget.style()
+        if background is not None:
+            painter.fillRect(option.rect, background)
+        style.drawPrimitive(qt.QStyle.PE_PanelItemViewItem, option, painter, widget)
+        text = self.display_text(text)
+        if not text:
+            return
+        if option.state & qt.QStyle.State_Selected:
+            pen = option.palette.color(qt.QPalette.HighlightedText)
+        elif foreground is not None:
+            pen = foreground
+        else:
+            pen = option.palette.color(qt.QPalette.Text)
+        metrics = self.text_metrics(option.font)
+        rect = option.rect
+        text = metrics.elide(text, rect.width() - 2 * TEXT_MARGIN)
+        width = metrics.advance(text)
+        if self.alignment == qt.Qt.AlignRight:
+            x = rect.left() + rect.width() - TEXT_MARGIN - width
+        elif self.alignment == qt.Qt.AlignHCenter:
+            x = rect.left() + (rect.width() - width) // 2
+        else:
+            x = rect.left() + TEXT_MARGIN
+        y = rect.top() + (rect.height() - metrics.height) // 2 + metrics.ascent
+        painter.setFont(option.font)
+        painter.setPen(pen)
+        painter.drawText(x, y, text)
+
+    def sizeHint(self, option: qt.QStyleOptionViewItem, index: qt.QModelIndex) -> qt.QSize:
+        display_data = getattr(index.model(), 'display_data', None)
+        if display_data is None:
+            return super().sizeHint(option, index)
+        text = self.display_text(display_data(index.row(), index.column())[0])
+        metrics = self.text_metrics(option.font)
+        return qt.QSize(metrics.advance(text) + 2 * TEXT_MARGIN, metrics.height + TEXT_MARGIN)
+
+
+class NumericDelegate(CellDelegate):
+    """Delegate painting numbers right aligned."""
+
+    alignment = qt.Qt.AlignRight
+
+
+class DatetimeDelegate(CellDelegate):
+    """Delegate painting dates, times and periods right aligned."""
+
+    alignment = qt.Qt.AlignRight
+
+
+class BoolDelegate(CellDelegate):
+    """Delegate painting booleans as a centered checkbox glyph, missing values blank."""
+
+    alignment = qt.Qt.AlignHCenter
+
+    def display_text(self, text: str) -> str:
+        if text == 'True':
+            return CHECKED_GLYPH
+        if text == 'False':
+            return UNCHECKED_GLYPH
+        return ''
+
+
+class CategoryDelegate(CellDelegate):
+    """Delegate painting categories, measuring the category labels up front.
+
+    Args:
+        categories (Iterable[Any]): Categories of the column.
+        parent (QObject): Optional parent for this delegate.
+    """
+
+    def __init__(self, categories: Iterable[Any] = (),
+                 parent: Optional[qt.QObject] = None) -> None:
+        """Create CategoryDelegate object.
+
+        Args:
+            categories (Iterable[Any]): Categories of the column.
+            parent (QObject): Optional parent for this delegate.
+        """
+        super().__init__(parent)
+        self._labels = [str(category) for _, category in zip(range(TEXT_CACHE_SIZE), categories)]
+
+    @classmethod
+    def for_dtype(cls, dtype: Any, parent: Optional[qt.QObject] = None) -> 'CellDelegate':
+        return cls(dtype.categories, parent)
+
+    def text_metrics(self, font: qt.QFont) -> TextMetrics:
+        created = self._text_metrics is None or self._text_metrics.font != font
+        metrics = super().text_metrics(font)
+        if created:
+            for label in self._labels:
+                metrics.advance(label)
+        return metrics
+
+
+def delegate_class(dtype: Any) -> Type[CellDelegate]:
+    """Return the delegate class painting columns of a dtype.
+
+    Args:
+        dtype (Any): Column dtype.
+
+    Returns:
+        Type[CellDelegate]: Delegate class.
+    """
+    if isinstance(dtype, pd.CategoricalDtype):
+        return CategoryDelegate
+    if pd.api.types.is_bool_dtype(dtype):
+        return BoolDelegate
+    if (pd.api.types.is_datetime64_any_dtype(dtype) or pd.api.types.is_timedelta64_dtype(dtype)
+            or isinstance(dtype, pd.PeriodDtype)):
+        return DatetimeDelegate
+    if pd.api.types.is_numeric_dtype(dtype):
+        return NumericDelegate
+    return CellDelegate
@@ -0,0 +1,403 @@
+"""Block-wise cache of cell display strings."""
+
+import itertools
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from qspreadsheet import logging
+from qspreadsheet import qt
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BLOCK_SIZE = 256
+DEFAULT_MEMORY_BUDGET = 64 * 1024 * 1024
+# Approximate size of an empty `str` object plus its list slot, in bytes.
+STR_OVERHEAD = 57
+# Text shown for cells while their block is formatted in the background.
+PLACEHOLDER = '\u2026'
+
+BlockLoader = Callable[[int, int, int], Sequence[Any]]
+BlockKey = Tuple[int, int]
+
+
+def format_block(values: Sequence[Any]) -> List[str]:
+    """Format a slice of column values to display strings.
+
+    NumPy numeric, bool, unicode and object arrays are formatted in one
+    vectorized `astype(str)` call. Other arrays fall back to `str` per value,
+    so the text always matches `str` of the scalar. None, the value of blank
+    object cells, shows as an empty string.
+
+    Args:
+        values (Sequence[Any]): Column values.
+
+    Returns:
+        List[str]: Display strings.
+    """
+    if isinstance(values, np.ndarray) and values.dtype.kind in 'biufcUO':
+        strings = values.astype(str)
+        if values.dtype.kind == 'O':
+            strings[np.equal(values, None)] = ''
+        return strings.tolist()
+    return ['' if value is None else str(value) for value in values]
+
+
+def block_nbytes(block: List[str]) -> int:
+    """Approximate memory used by a formatted block.
+
+    Args:
+        block (List[str]): Display strings.
+
+    Returns:
+        int: Size in bytes.
+    """
+    return STR_OVERHEAD * len(block) + sum(map(len, block))
+
+
+class DisplayCache:
+    """LRU cache of display strings, formatted in blocks of rows per column.
+
+    Args:
+        loader (BlockLoader): Callable `(column, start, stop)` returning the
+            column values for rows `[start, stop)`.
+        row_count (Callable[[], int]): Callable returning the number of rows.
+        block_size (int): Number of rows formatted at once.
+        memory_budget (int): Upper bound, in bytes, for the cached blocks.
+        formatter (Callable[[Sequence[Any]], List[str]]): Callable formatting
+            the values of a block. Defaults to `format_block`.
+    """
+
+    def __init__(self, loader: BlockLoader, row_count: Callable[[], int],
+                 block_size: int = DEFAULT_BLOCK_SIZE,
+                 memory_budget: int = DEFAULT_MEMORY_BUDGET,
+                 formatter: Callable[[Sequence[Any]], List[str]] = format_block) -> None:
+        """Create DisplayCache object.
+
+        Args:
+            loader (BlockLoader): Block values loader.
+            row_count (Callable[[], int]): Number of rows getter.
+            block_size (int): Number of rows formatted at once.
+            memory_budget (int): Upper bound, in bytes, for the cached blocks.
+            formatter (Callable[[Sequence[Any]], List[str]]): Block formatter.
+        """
+        if block_size < 1:
+            raise ValueError(f'block_size must be positive, got {block_size}')
+        self._loader = loader
+        self._formatter = formatter
+        self._row_count = row_count
+        self._block_size = block_size
+        self._memory_budget = memory_budget
+        self._blocks: 'OrderedDict[BlockKey, List[str]]' = OrderedDict()
+        self._sizes: Dict[BlockKey, int] = {}
+        self._nbytes = 0
+
+    @property
+    def block_size(self) -> int:
+        """Number of rows formatted at once."""
+        return self._block_size
+
+    @property
+    def memory_budget(self) -> int:
+        """Upper bound, in bytes, for the cached blocks."""
+        return self._memory_budget
+
+    @memory_budget.setter
+    def memory_budget(self, value: int) -> None:
+        self._memory_budget = value
+        self._evict()
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory used by the cached blocks."""
+        return self._nbytes
+
+    def __len__(self) -> int:
+        return len(self._blocks)
+
+    def value(self, row: int, col: int) -> str:
+        """Return the display string for a cell.
+
+        Args:
+            row (int): Row number.
+            col (int): Column number.
+
+        Returns:
+            str: Display string.
+        """
+        key = (col, row // self._block_size)
+        block = self._blocks.get(key)
+        if block is None:
+            block = self._load(key)
+        else:
+            self._blocks.move_to_end(key)
+        return block[row % self._block_size]
+
+    def get(self, row: int, col: int) -> Optional[str]:
+        """Return the display string for a cell, if its block is cached.
+
+        Args:
+            row (int): Row number.
+            col (int): Column number.
+
+        Returns:
+            str, optional: Display string, None on cache miss.
+        """
+        key = (col, row // self._block_size)
+        block = self._blocks.get(key)
+        if block is None:
+            return None
+        self._blocks.move_to_end(key)
+        return block[row % self._block_size]
+
+    def block_values(self, row: int, col: int) -> Sequence[Any]:
+        """Return the unformatted values of the block holding a cell.
+
+        Args:
+            row (int): Row number.
+            col (int): Column number.
+
+        Returns:
+            Sequence[Any]: Column values of the block.
+        """
+        start, stop = self.block_range(row)
+        return self._loader(col, start, stop)
+
+    def store(self, row: int, col: int, block: List[str]) -> None:
+        """Store a formatted block, for blocks formatted elsewhere.
+
+        Args:
+            row (int): Any row of the block.
+            col (int): Column number.
+            block (List[str]): Display strings of the whole block.
+        """
+        self._insert((col, row // self._block_size), block)
+
+    def block_range(self, row: int) -> Tuple[int, int]:
+        """Return the `[start, stop)` rows of the block holding `row`.
+
+        Args:
+            row (int): Row number.
+
+        Returns:
+            Tuple[int, int]: First row and one past the last row of the block.
+        """
+        start = row - row % self._block_size
+        return start, min(start + self._block_size, self._row_count())
+
+    def invalidate(self, row: int, col: int) -> None:
+        """Drop the block holding a cell.
+
+        Args:
+            row (int): Row number.
+            col (int): Column number.
+        """
+        self._drop((col, row // self._block_size))
+
+    def invalidate_rows(self, rows: np.ndarray, col: int) -> None:
+        """Drop the cached blocks holding some rows of a column.
+
+        Only the cached blocks of the column are looked at, however many
+        rows are given.
+
+        Args:
+            rows (ndarray): Row numbers.
+            col (int): Column number.
+        """
+        cached = [key for key in self._blocks if key[0] == col]
+        if not cached:
+            return
+        blocks = np.unique(np.asarray(rows) // self._block_size)
+        hit = np.isin([key[1] for key in cached], blocks)
+        for key in itertools.compress(cached, hit):
+            self._drop(key)
+
+    def invalidate_column(self, col: int) -> None:
+        """Drop all blocks of a column.
+
+        Args:
+            col (int): Column number.
+        """
+        for key in [key for key in self._blocks if key[0] == col]:
+            self._drop(key)
+
+    def invalidate_from(self, row: int) -> None:
+        """Drop the blocks holding `row` and all following rows, after rows moved.
+
+        Args:
+            row (int): First row that moved.
+        """
+        first_block = row // self._block_size
+        for key in [key for key in self._blocks if key[1] >= first_block]:
+            self._drop(key)
+
+    def clear(self) -> None:
+        """Drop all cached blocks."""
+        self._blocks.clear()
+        self._sizes.clear()
+        self._nbytes = 0
+
+    def _load(self, key: BlockKey) -> List[str]:
+        col, block_ndx = key
+        start, stop = self.block_range(block_ndx * self._block_size)
+        block = self._formatter(self._loader(col, start, stop))
+        self._insert(key, block)
+        return block
+
+    def _insert(self, key: BlockKey, block: List[str]) -> None:
+        self._drop(key)
+        self._blocks[key] = block
+        self._sizes[key] = block_nbytes(block)
+        self._nbytes += self._sizes[key]
+        self._evict()
+
+    def _drop(self, key: BlockKey) -> None:
+        if self._blocks.pop(key, None) is not None:
+            self._nbytes -= self._sizes.pop(key)
+
+    def _evict(self) -> None:
+        # Always keep the most recently used block, even if it alone is over budget
+        while self._nbytes > self._memory_budget and len(self._blocks) > 1:
+            key, _ = self._blocks.popitem(last=False)
+            self._nbytes -= self._sizes.pop(key)
+
+
+class FormatBlockTask(qt.QRunnable):
+    """Format a block of column values in a worker thread.
+
+    The values are copied when the task is created, on the calling thread,
+    so the worker never reads arrays, or caches of stores like the page
+    cache of a `FileStore`, which the GUI thread reads and writes.
+
+    Args:
+        values (Sequence[Any]): Column values to format.
+        done (Callable[[List[str]], None]): Called from the worker thread
+            with the formatted block.
+    """
+
+    def __init__(self, values: Sequence[Any], done: Callable[[List[str]], None]) -> None:
+        """Create FormatBlockTask object.
+
+        Args:
+            values (Sequence[Any]): Column values to format.
+            done (Callable[[List[str]], None]): Formatted block callback.
+        """
+        super().__init__()
+        self._values = np.array(values) if isinstance(values, np.ndarray) else values.copy()
+        self._done = done
+
+    def run(self) -> None:
+        try:
+            block = format_block(self._values)
+        except Exception:
+            logger.exception('Formatting block failed')
+            return
+        self._done(block)
+
+
+class BackgroundFormatter(qt.QObject):
+    """Fill a DisplayCache from worker threads.
+
+    Cache misses are formatted by `FormatBlockTask`s on a thread pool and
+    stored in the cache from the GUI thread. `block_ready` is emitted once
+    per stored block.
+
+    Args:
+        cache (DisplayCache): Cache to fill.
+        thread_pool (QThreadPool, optional): Pool to run tasks on. Defaults
+            to the global thread pool.
+        parent (QObject): Optional parent for this object.
+    """
+
+    block_ready = qt.Signal(int, int, int)
+    _block_formatted = qt.Signal(object, int, object)
+
+    def __init__(self, cache: DisplayCache, thread_pool: Optional[qt.QThreadPool] = None,
+                 parent: Optional[qt.QObject] = None) -> None:
+        """Create BackgroundFormatter object.
+
+        Args:
+            cache (DisplayCache): Cache to fill.
+            thread_pool (QThreadPool, optional): Pool to run tasks on.
+            parent (QObject): Optional parent for this object.
+        """
+        super().__init__(parent)
+        self._cache = cache
+        self._thread_pool = thread_pool or qt.QThreadPool.globalInstance()
+        self._pending: Dict[BlockKey, int] = {}
+        self._token = 0
+        # Queued, since tasks emit from worker threads
+        self._block_formatted.connect(self._on_block_formatted, qt.Qt.QueuedConnection)
+
+    def value(self, row: int, col: int) -> Optional[str]:
+        """Return the display string for a cell, or schedule its block.
+
+        Args:
+            row (int): Row number.
+            col (int): Column number.
+
+        Returns:
+            str, optional: Display string, None while its block is formatted.
+        """
+        text = self._cache.get(row, col)
+        if text is None:
+            self._request(row, col)
+        return text
+
+    def discard(self, row: int, col: int) -> None:
+        """Drop the pending result for the block holding a cell.
+
+        Args:
+            row (int): Row number.
+            col (int): Column number.
+        """
+        self._pending.pop((col, row // self._cache.block_size), None)
+
+    def discard_from(self, row: int) -> None:
+        """Drop the pending results for the blocks holding `row` and all following rows.
+
+        Args:
+            row (int): First row that moved.
+        """
+        first_block = row // self._cache.block_size
+        for key in [key for key in self._pending if key[1] >= first_block]:
+            del self._pending[key]
+
+    def discard_all(self) -> None:
+        """Drop all pending results."""
+        self._pending.clear()
+
+    def wait_for_done(self, msecs: int = -1) -> bool:
+        """Wait for the scheduled tasks to finish.
+
+        Args:
+            msecs (int): Timeout in milliseconds, -1 to wait indefinitely.
+
+        Returns:
+            bool: True if all tasks finished.
+        """
+        return self._thread_pool.waitForDone(msecs)
+
+    def _request(self, row: int, col: int) -> None:
+        key = (col, row // self._cache.block_size)
+        if key in self._pending:
+            return
+        self._token += 1
+        token = self._token
+        self._pending[key] = token
+        values = self._cache.block_values(row, col)
+        task = FormatBlockTask(
+            values, lambda block: self._block_formatted.emit(key, token, block))
+        self._thread_pool.start(task)
+
+    def _on_block_formatted(self, key: BlockKey, token: int, block: List[str]) -> None:
+        if self._pending.get(key) != token:
+            return  # Discarded while formatting
+        del self._pending[key]
+        col, block_ndx = key
+        start, stop = self._cache.block_range(block_ndx * self._cache.block_size)
+        if len(block) != stop - start:
+            return  # Rows changed while formatting
+        self._cache.store(start, col, block)
+        self.block_ready.emit(col, start, stop)
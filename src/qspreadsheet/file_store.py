@@ -0,0 +1,566 @@
+"""Read-only row store over Parquet and CSV files, decoded in pages of rows."""
+
+import io
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from qspreadsheet import logging
+from qspreadsheet import qt
+from qspreadsheet.data_source import DataSource, SourceStore
+from qspreadsheet.mapped_store import PathLike, import_pyarrow
+from qspreadsheet.row_store import column_values, concat_values
+from qspreadsheet.types import DF
+
+logger = logging.getLogger(__name__)
+
+# Rows per page of a CSV file
+CSV_PAGE_ROWS = 50_000
+# Bytes read per step while indexing a CSV file
+SCAN_BYTES = 16 * 1024 * 1024
+DEFAULT_MAX_PAGES = 16
+
+
+def infer_dtype(dtype: Any) -> Any:
+    """Return the column dtype of a CSV column, from its dtype in the first page.
+
+    Integer and bool columns get nullable dtypes, since later pages may have
+    missing values. Columns of other than numeric dtypes hold objects.
+
+    Args:
+        dtype (Any): Dtype pandas inferred for the first page.
+
+    Returns:
+        Any: Dtype of the column in every page.
+    """
+    dtype = pd.api.types.pandas_dtype(dtype)
+    if pd.api.types.is_bool_dtype(dtype):
+        return pd.BooleanDtype()
+    if pd.api.types.is_integer_dtype(dtype):
+        return pd.Int64Dtype()
+    if pd.api.types.is_float_dtype(dtype):
+        return np.dtype(float)
+    return np.dtype(object)
+
+
+def conform_column(values: pd.Series, dtype: Any) -> Optional[pd.Series]:
+    """Convert the values of a page to the column dtype, if it holds them all.
+
+    Args:
+        values (Series): Values of a column in a page, as parsed.
+        dtype (Any): Column dtype.
+
+    Returns:
+        Series, optional: Values of `dtype`, None if a value would be lost,
+            like text in a numeric column or decimals in an integer column.
+    """
+    if values.dtype == dtype:
+        return values
+    if dtype == np.dtype(object):
+        return values.astype(object)
+    kind = values.dtype.kind
+    if not values.isna().all():
+        # Numbers are not bools, and bools and text are not numbers
+        if pd.api.types.is_bool_dtype(dtype):
+            fits = kind == 'b'
+        else:
+            fits = not pd.api.types.is_numeric_dtype(dtype) or kind in 'iuf'
+        if not fits:
+            return None
+    try:
+        return values.astype(dtype)
+    except (ValueError, TypeError, OverflowError):
+        return None
+
+
+def fit_column(values: pd.Series, dtype: Any) -> Tuple[pd.Series, Any]:
+    """Convert the values of a page to the column dtype, widening it until they fit.
+
+    Integer columns widen to float for decimals, and any column to object
+    for values of other types, so no value is lost.
+
+    Args:
+        values (Series): Values of a column in a page, as parsed.
+        dtype (Any): Column dtype.
+
+    Returns:
+        Tuple[Series, Any]: Values and the dtype holding them, `dtype` or wider.
+    """
+    while True:
+        conformed = conform_column(values, dtype)
+        if conformed is not None:
+            return conformed, dtype
+        if pd.api.types.is_integer_dtype(dtype) and values.dtype.kind == 'f':
+            dtype = np.dtype(float)
+        else:
+            dtype = np.dtype(object)
+
+
+class PagedSource(DataSource):
+    """Rows of a file in pages, decoded on demand into a bounded LRU cache.
+
+    Subclasses set the column labels, dtypes and the first row of each page,
+    and decode pages with `read_page`. Blocks and rows of a column are read
+    from the pages holding them.
+
+    A page with values its column dtype cannot hold widens the dtype, see
+    `fit_column`, and the cached pages of the column are converted to it.
+    `dtype_widened` is called after.
+
+    Args:
+        max_pages (int): Number of decoded pages kept.
+    """
+
+    def __init__(self, max_pages: int = DEFAULT_MAX_PAGES) -> None:
+        """Create PagedSource object.
+
+        Args:
+            max_pages (int): Number of decoded pages kept.
+        """
+        DataSource.__init__(self)
+        # First row of each page, then the number of rows
+        self.page_starts = np.zeros(1, dtype=np.int64)
+        self._max_pages = max_pages
+        self._pages: 'OrderedDict[int, List[Any]]' = OrderedDict()
+        # Guards the page cache, pages may be read from worker threads
+        self._lock = threading.RLock()
+
+    @property
+    def row_count(self) -> int:
+        """Number of rows in the indexed pages."""
+        return int(self.page_starts[-1])
+
+    @property
+    def max_pages(self) -> int:
+        """Number of decoded pages kept."""
+        return self._max_pages
+
+    @max_pages.setter
+    def max_pages(self, value: int) -> None:
+        with self._lock:
+            self._max_pages = max(value, 1)
+            self._evict()
+
+    @property
+    def cached_pages(self) -> List[int]:
+        """Pages held decoded, least recently used first."""
+        with self._lock:
+            return list(self._pages)
+
+    def read_page(self, page: int) -> DF:
+        """Decode the rows of a page.
+
+        Args:
+            page (int): Page number.
+
+        Returns:
+            DataFrame: Rows of the page, one column per column.
+        """
+        raise NotImplementedError
+
+    def page(self, page: int) -> List[Any]:
+        """Return the column values of a page, decoding it on a cache miss.
+
+        Args:
+            page (int): Page number.
+
+        Returns:
+            List[Any]: One ndarray or pandas array of the column dtype per column.
+        """
+        with self._lock:
+            values = self._pages.get(page)
+            if values is not None:
+                self._pages.move_to_end(page)
+                return values
+            frame = self.read_page(page)
+            values = []
+            for col, dtype in enumerate(self.dtypes):
+                column, fitted = fit_column(frame.iloc[:, col], dtype)
+                if fitted != dtype:
+                    self._widen(col, fitted)
+                values.append(column_values(column))
+            self._store_page(page, values)
+            return values
+
+    def _widen(self, col: int, dtype: Any) -> None:
+        logger.info('Column {!r} widened from {} to {}'.format(
+            self.columns[col], self.dtypes[col], dtype))
+        with self._lock:
+            self.dtypes[col] = dtype
+            for values in self._pages.values():
+                values[col] = column_values(pd.Series(values[col]).astype(dtype))
+        self.dtype_widened(col)
+
+    def dtype_widened(self, col: int) -> None:
+        """Called after the dtype of a column was widened for the values of a page.
+
+        Args:
+            col (int): Column number.
+        """
+
+    def _store_page(self, page: int, values: List[Any]) -> None:
+        with self._lock:
+            self._pages[page] = values
+            self._evict()
+
+    def _evict(self) -> None:
+        while len(self._pages) > self._max_pages:
+            self._pages.popitem(last=False)
+
+    def take(self, col: int, rows: np.ndarray) -> Any:
+        """Return the values of some rows of a column, decoding their pages.
+
+        Args:
+            col (int): Column number.
+            rows (ndarray): Row numbers.
+
+        Returns:
+            Any: ndarray or pandas array of the column dtype.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        if rows.size == 0:
+            return self.page_slice(col, 0, 0, 0)
+        pages = np.searchsorted(self.page_starts, rows, side='right') - 1
+        order = np.argsort(pages, kind='stable')
+        sorted_pages = pages[order]
+        bounds = np.flatnonzero(np.diff(sorted_pages)) + 1
+        pieces = []
+        for start, stop in zip(np.r_[0, bounds], np.r_[bounds, rows.size]):
+            page = int(sorted_pages[start])
+            local = rows[order[start:stop]] - self.page_starts[page]
+            pieces.append(self.page(page)[col].take(local))
+        # A page read last may have widened the column of the pieces before it
+        dtype = self.dtypes[col]
+        pieces = [piece if piece.dtype == dtype else column_values(pd.Series(piece).astype(dtype))
+                  for piece in pieces]
+        values = pieces[0] if len(pieces) == 1 else concat_values(pieces)
+        inverse = np.empty_like(order)
+        inverse[order] = np.arange(order.size)
+        return values.take(inverse)
+
+    def block(self, col: int, start: int, stop: int) -> Any:
+        starts = self.page_starts
+        page = int(np.searchsorted(starts, start, side='right') - 1)
+        if stop <= start or page + 1 >= starts.size or stop <= starts[page + 1]:
+            return self.page_slice(col, page, start, max(start, stop))
+        return self.take(col, np.arange(start, stop))
+
+    def page_slice(self, col: int, page: int, start: int, stop: int) -> Any:
+        """Return rows `[start, stop)` of a column within one page.
+
+        Args:
+            col (int): Column number.
+            page (int): Page number.
+            start (int): First row.
+            stop (int): One past the last row.
+        """
+        if page >= self.page_starts.size - 1 or start >= stop:
+            return column_values(pd.Series([], dtype=self.dtypes[col]))
+        first = self.page_starts[page]
+        return self.page(page)[col][start - first:stop - first]
+
+
+class ParquetSource(PagedSource):
+    """Rows of a Parquet file, paged by row group.
+
+    The row groups are read from the file footer, so the whole file is
+    indexed when opened. Each page is one row group, decoded by pyarrow.
+
+    Args:
+        path (PathLike): Parquet file.
+        columns (Sequence[str], optional): Names of the columns to read.
+        max_pages (int): Number of decoded row groups kept.
+    """
+
+    def __init__(self, path: PathLike, columns: Optional[Sequence[str]] = None,
+                 max_pages: int = DEFAULT_MAX_PAGES) -> None:
+        """Create ParquetSource object.
+
+        Args:
+            path (PathLike): Parquet file.
+            columns (Sequence[str], optional): Names of the columns to read.
+            max_pages (int): Number of decoded row groups kept.
+        """
+        super().__init__(max_pages)
+        import_pyarrow()
+        import pyarrow.parquet as pq
+        self._file = pq.ParquetFile(os.fspath(path))
+        self._columns = None if columns is None else list(columns)
+        schema = self._file.schema_arrow
+        if self._columns is not None:
+            schema = import_pyarrow().schema([schema.field(name) for name in self._columns])
+        empty = self._to_pandas(schema.empty_table())
+        self.columns = empty.columns
+        # Row groups with missing values give other dtypes, nullable ones hold both
+        self.dtypes = [infer_dtype(dtype) if pd.api.types.is_bool_dtype(dtype)
+                       or pd.api.types.is_integer_dtype(dtype) else dtype
+                       for dtype in empty.dtypes]
+        metadata = self._file.metadata
+        sizes = [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)]
+        self.page_starts = np.r_[0, np.cumsum(sizes, dtype=np.int64)]
+
+    @staticmethod
+    def _to_pandas(table: Any) -> DF:
+        frame = table.to_pandas()
+        # Categories differ per row group, their values are shown instead
+        categorical = {label: object for label, dtype in frame.dtypes.items()
+                       if isinstance(dtype, pd.CategoricalDtype)}
+        return frame.astype(categorical) if categorical else frame
+
+    def read_page(self, page: int) -> DF:
+        return self._to_pandas(self._file.read_row_group(page, columns=self._columns))
+
+
+class IndexFileTask(qt.QRunnable):
+    """Index the row offsets of a CSV file in a worker thread.
+
+    Args:
+        path (PathLike): CSV file.
+        page_rows (int): Rows per page.
+        found (Callable[[ndarray, int, bool], None]): Called from the worker
+            thread after each step, with the byte offsets of the pages
+            found after the first page, the number of rows indexed, and
+            whether the file is done.
+        stop (Event): Set to stop indexing.
+    """
+
+    def __init__(self, path: PathLike, page_rows: int,
+                 found: Callable[[np.ndarray, int, bool], None], stop: threading.Event) -> None:
+        """Create IndexFileTask object.
+
+        Args:
+            path (PathLike): CSV file.
+            page_rows (int): Rows per page.
+            found (Callable[[ndarray, int, bool], None]): Offsets callback.
+            stop (Event): Set to stop indexing.
+        """
+        super().__init__()
+        self._path = path
+        self._page_rows = page_rows
+        self._found = found
+        self._stop = stop
+
+    def run(self) -> None:
+        try:
+            self._scan()
+        except OSError:
+            logger.exception('Indexing {} failed'.format(self._path))
+
+    def _scan(self) -> None:
+        # Line n ends at the n-th newline, the header being line 0
+        lines = 0
+        base = 0
+        last_byte = b'\n'
+        with open(self._path, 'rb') as file:
+            while not self._stop.is_set():
+                chunk = file.read(SCAN_BYTES)
+                if not chunk:
+                    break
+                newlines = np.flatnonzero(np.frombuffer(chunk, dtype=np.uint8) == 10)
+                # Data row r starts after newline r, pages every `page_rows` rows
+                first = max(-(-lines // self._page_rows), 1) * self._page_rows
+                wanted = np.arange(first, lines + newlines.size, self._page_rows) - lines
+                offsets = base + newlines[wanted] + 1
+                lines += newlines.size
+                base += len(chunk)
+                last_byte = chunk[-1:]
+                self._found(offsets, max(lines - 1, 0), False)
+        if not self._stop.is_set():
+            # A last line without a newline is a row too
+            rows = max(lines - 1, 0) + (last_byte != b'\n' and lines > 0)
+            self._found(np.empty(0, dtype=np.int64), rows, True)
+
+
+class CsvSource(qt.QObject, PagedSource):
+    """Rows of a CSV file, paged by line offsets indexed in the background.
+
+    The first page is read when the file is opened, so it shows at once.
+    The byte offset of every `page_rows`-th line is then found by an
+    `IndexFileTask` on the global thread pool, scanning the file with
+    NumPy. `rows_indexed` is emitted as whole pages are indexed, and once
+    more with all rows at the end. Each page is decoded from its byte range
+    by `pandas.read_csv`.
+
+    Column dtypes are inferred from the first page, and widened for the
+    values of later pages, emitting `dtype_changed`. Every row must be one
+    line: quoted values spanning lines are not supported. Blank lines are
+    rows of missing values.
+
+    Args:
+        path (PathLike): CSV file, with a header line.
+        sep (str): Field delimiter.
+        encoding (str): Text encoding.
+        page_rows (int): Rows per page.
+        max_pages (int): Number of decoded pages kept.
+        parent (QObject): Optional parent for this object.
+    """
+
+    rows_indexed = qt.Signal(int)
+    dtype_changed = qt.Signal(int)
+    _offsets_found = qt.Signal(object, int, bool)
+
+    def __init__(self, path: PathLike, sep: str = ',', encoding: str = 'utf-8',
+                 page_rows: int = CSV_PAGE_ROWS, max_pages: int = DEFAULT_MAX_PAGES,
+                 parent: Optional[qt.QObject] = None) -> None:
+        """Create CsvSource object.
+
+        Args:
+            path (PathLike): CSV file, with a header line.
+            sep (str): Field delimiter.
+            encoding (str): Text encoding.
+            page_rows (int): Rows per page.
+            max_pages (int): Number of decoded pages kept.
+            parent (QObject): Optional parent for this object.
+        """
+        qt.QObject.__init__(self, parent)
+        PagedSource.__init__(self, max_pages)
+        self._path = os.fspath(path)
+        self._sep = sep
+        self._encoding = encoding
+        self._page_rows = page_rows
+        first = pd.read_csv(self._path, sep=sep, encoding=encoding, nrows=page_rows,
+                            skip_blank_lines=False)
+        self.columns = first.columns
+        self.dtypes = [infer_dtype(dtype) for dtype in first.dtypes]
+        # Numeric columns are parsed as inferred, then conformed: parsing into
+        # nullable dtypes is several times slower
+        self._read_dtypes = {i: dtype for i, dtype in enumerate(self.dtypes)
+                             if dtype == np.dtype(object)}
+        with open(self._path, 'rb') as file:
+            # The first page starts after the header, the others are indexed
+            self._offsets: List[int] = [len(file.readline())]
+        self._done = False
+        self.page_starts = np.array([0, first.index.size], dtype=np.int64)
+        self._store_page(0, [column_values(fit_column(first.iloc[:, i], dtype)[0])
+                             for i, dtype in enumerate(self.dtypes)])
+        self._stop = stop = threading.Event()
+        self.destroyed.connect(lambda: stop.set())
+        # Queued, since the task reports from its worker thread
+        self._offsets_found.connect(self._on_offsets_found, qt.Qt.QueuedConnection)
+        qt.QThreadPool.globalInstance().start(IndexFileTask(
+            self._path, page_rows,
+            lambda offsets, rows, done: stop.is_set()
+            or self._offsets_found.emit(offsets, rows, done),
+            stop))
+
+    @property
+    def indexed(self) -> bool:
+        """Whether the whole file is indexed."""
+        return self._done
+
+    def close(self) -> None:
+        """Stop indexing the file."""
+        self._stop.set()
+
+    def dtype_widened(self, col: int) -> None:
+        self.dtype_changed.emit(col)
+
+    def _on_offsets_found(self, offsets: np.ndarray, rows: int, done: bool) -> None:
+        if self._stop.is_set():
+            return
+        self._offsets.extend(offsets.tolist())
+        self._done = done
+        starts = np.arange(len(self._offsets), dtype=np.int64) * self._page_rows
+        if done:
+            starts = np.r_[starts, rows]
+        # Else the last page found ends where the next one starts, not known yet
+        if done or starts.size > 1 and starts[-1] > self.row_count:
+            self.page_starts = starts
+            self.rows_indexed.emit(self.row_count)
+
+    def read_page(self, page: int) -> DF:
+        start = self._offsets[page]
+        stop = self._offsets[page + 1] if page + 1 < len(self._offsets) else None
+        with open(self._path, 'rb') as file:
+            file.seek(start)
+            data = file.read(-1 if stop is None else stop - start)
+        # Values not of the column dtypes widen them, see `fit_column`
+        # Blank lines are rows, as counted by `IndexFileTask`
+        return pd.read_csv(io.BytesIO(data), sep=self._sep, encoding=self._encoding,
+                           header=None, names=list(range(self.columns.size)),
+                           dtype=self._read_dtypes, skip_blank_lines=False)
+
+
+class FileStore(SourceStore):
+    """Read-only row store over a file, decoded in pages as rows are read.
+
+    Only the pages holding the rows read are decoded, and at most
+    `max_pages` of them are kept. Rows cannot be edited, inserted or
+    removed, except that appending rows without values shows rows of the
+    source indexed since, see `TableModel.extend_rows`. The index is
+    positional.
+
+    Use `open` to pick the source from the file extension.
+
+    Args:
+        source (PagedSource): Source of the rows.
+    """
+
+    def __init__(self, source: PagedSource) -> None:
+        """Create FileStore object.
+
+        Args:
+            source (PagedSource): Source of the rows.
+        """
+        super().__init__(source)
+
+    @classmethod
+    def open(cls, path: PathLike, **options: Any) -> 'FileStore':
+        """Open a Parquet or CSV file, from its extension.
+
+        Args:
+            path (PathLike): `.parquet` or `.pq` file, anything else is read
+                as CSV.
+            **options: Options of `ParquetSource` or `CsvSource`.
+
+        Returns:
+            FileStore: Store over the file.
+        """
+        extension = os.path.splitext(os.fspath(path))[1].lower()
+        if extension in ('.parquet', '.pq'):
+            return cls(ParquetSource(path, **options))
+        return cls(CsvSource(path, **options))
+
+    @property
+    def source(self) -> PagedSource:
+        """Source of the rows."""
+        return self._source
+
+    @property
+    def read_only(self) -> bool:
+        return True
+
+    @property
+    def available_rows(self) -> int:
+        """Number of rows of the source, shown or not yet."""
+        return self._source.row_count
+
+    def write(self, col: int, rows: np.ndarray, values: Any) -> None:
+        raise TypeError('Rows of a file are read-only')
+
+    def insert_rows(self, row: int, count: int, values: Optional[DF] = None) -> None:
+        """Show `count` more rows of the source, indexed since they were last shown.
+
+        Args:
+            row (int): Must be the number of rows.
+            count (int): Number of rows to show.
+            values (DataFrame, optional): Must be None.
+
+        Raises:
+            TypeError: If rows would be inserted, not shown.
+        """
+        if values is not None or row != self._length \
+                or self._length + count > self._source.row_count:
+            raise TypeError('Rows of a file are read-only')
+        if count <= 0:
+            return
+        self._moved(self._length)
+        self._length += count
+        self._size = self._capacity = self._length
+
+    def remove_rows(self, rows: Union[np.ndarray, Sequence[int]]) -> None:
+        raise TypeError('Rows of a file are read-only')
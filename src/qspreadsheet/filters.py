@@ -0,0 +1,338 @@
+"""Vectorized column filters, producing boolean row masks."""
+
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from qspreadsheet import logging
+
+logger = logging.getLogger(__name__)
+
+
+def as_series(values: Sequence[Any]) -> pd.Series:
+    """Wrap column values in a Series, without copying them.
+
+    Args:
+        values (Sequence[Any]): Column values, ndarray or pandas array.
+
+    Returns:
+        Series: Series over the values.
+    """
+    return pd.Series(values, copy=False)
+
+
+def to_mask(result: pd.Series) -> np.ndarray:
+    """Convert a boolean Series to a mask, missing values being False.
+
+    Args:
+        result (Series): Boolean or nullable boolean Series.
+
+    Returns:
+        ndarray: Boolean mask.
+    """
+    return result.to_numpy(dtype=bool, na_value=False)
+
+
+class Filter:
+    """Column filter, evaluated as a boolean mask over the column values."""
+
+    def mask(self, values: Sequence[Any]) -> np.ndarray:
+        """Return the mask of the values passing this filter.
+
+        Args:
+            values (Sequence[Any]): Column values, ndarray or pandas array.
+
+        Returns:
+            ndarray: Boolean mask.
+        """
+        raise NotImplementedError
+
+    def narrows(self, previous: 'Filter') -> bool:
+        """Return True if every value passing this filter passes `previous`.
+
+        Used to evaluate a changed filter only over the rows which passed
+        the previous one. Returning False is always safe.
+
+        Args:
+            previous (Filter): Filter replaced by this one.
+
+        Returns:
+            bool: Whether this filter passes a subset of `previous`.
+        """
+        return type(self) is type(previous) and vars(self) == vars(previous)
+
+    def __repr__(self) -> str:
+        args = ', '.join(f'{name.lstrip("_")}={value!r}' for name, value in vars(self).items())
+        return f'{self.__class__.__name__}({args})'
+
+
+class Equals(Filter):
+    """Values equal to `value`.
+
+    Args:
+        value (Any): Value to compare with.
+    """
+
+    def __init__(self, value: Any) -> None:
+        """Create Equals filter.
+
+        Args:
+            value (Any): Value to compare with.
+        """
+        self.value = value
+
+    def mask(self, values: Sequence[Any]) -> np.ndarray:
+        return to_mask(as_series(values).eq(self.value))
+
+
+class Range(Filter):
+    """Values between `lower` and `upper`.
+
+    Args:
+        lower (Any, optional): Lower bound, None for no lower bound.
+        upper (Any, optional): Upper bound, None for no upper bound.
+        inclusive (bool): Whether values equal to the bounds pass.
+    """
+
+    def __init__(self, lower: Any = None, upper: Any = None, inclusive: bool = True) -> None:
+        """Create Range filter.
+
+        Args:
+            lower (Any, optional): Lower bound.
+            upper (Any, optional): Upper bound.
+            inclusive (bool): Whether values equal to the bounds pass.
+        """
+        self.lower = lower
+        self.upper = upper
+        self.inclusive = inclusive
+
+    def narrows(self, previous: Filter) -> bool:
+        if not isinstance(previous, Range):
+            return False
+        try:
+            return (_bound_narrows(self.lower, previous.lower, self, previous, 1)
+                    and _bound_narrows(self.upper, previous.upper, self, previous, -1))
+        except TypeError:
+            return False
+
+    def mask(self, values: Sequence[Any]) -> np.ndarray:
+        series = as_series(values)
+        result = series.notna()
+        if self.lower is not None:
+            result &= series.ge(self.lower) if self.inclusive else series.gt(self.lower)
+        if self.upper is not None:
+            result &= series.le(self.upper) if self.inclusive else series.lt(self.upper)
+        return to_mask(result)
+
+
+def _bound_narrows(bound: Any, previous_bound: Any, range_filter: Range,
+                   previous: Range, direction: int) -> bool:
+    """Whether a range bound is at least as tight as the previous one.
+
+    `direction` is 1 for lower bounds and -1 for upper bounds.
+    """
+    if previous_bound is None:
+        return True
+    if bound is None:
+        return False
+    if bound == previous_bound:
+        return previous.inclusive or not range_filter.inclusive
+    return bool(bound > previous_bound) if direction > 0 else bool(bound < previous_bound)
+
+
+class Contains(Filter):
+    """Values whose text contains `text`.
+
+    Args:
+        text (str): Substring, or regular expression if `regex` is True.
+        case (bool): Whether the match is case sensitive.
+        regex (bool): Whether `text` is a regular expression.
+    """
+
+    def __init__(self, text: str, case: bool = False, regex: bool = False) -> None:
+        """Create Contains filter.
+
+        Args:
+            text (str): Substring or regular expression.
+            case (bool): Whether the match is case sensitive.
+            regex (bool): Whether `text` is a regular expression.
+        """
+        self.text = text
+        self.case = case
+        self.regex = regex
+
+    def narrows(self, previous: Filter) -> bool:
+        if not isinstance(previous, Contains) or self.case != previous.case:
+            return False
+        if self.regex or previous.regex:
+            return super().narrows(previous)
+        if self.case:
+            return previous.text in self.text
+        return previous.text.lower() in self.text.lower()
+
+    def mask(self, values: Sequence[Any]) -> np.ndarray:
+        series = as_series(values)
+        if series.dtype != object and not pd.api.types.is_string_dtype(series.dtype):
+            series = series.astype(str)
+        return to_mask(series.str.contains(
+            self.text, case=self.case, regex=self.regex, na=False))
+
+
+class IsIn(Filter):
+    """Values in `values`.
+
+    Args:
+        values (Iterable[Any]): Values to pass.
+    """
+
+    def __init__(self, values: Iterable[Any]) -> None:
+        """Create IsIn filter.
+
+        Args:
+            values (Iterable[Any]): Values to pass.
+        """
+        self.values = frozenset(values)
+
+    def narrows(self, previous: Filter) -> bool:
+        return isinstance(previous, IsIn) and self.values <= previous.values
+
+    def mask(self, values: Sequence[Any]) -> np.ndarray:
+        return to_mask(as_series(values).isin(list(self.values)))
+
+
+class IsNull(Filter):
+    """Missing values."""
+
+    def mask(self, values: Sequence[Any]) -> np.ndarray:
+        return np.asarray(pd.isna(values), dtype=bool)
+
+
+class NotNull(Filter):
+    """Not missing values."""
+
+    def mask(self, values: Sequence[Any]) -> np.ndarray:
+        return ~np.asarray(pd.isna(values), dtype=bool)
+
+
+class FilterEngine:
+    """Per-column filters, combined into one row mask.
+
+    The mask of each filtered column is cached, so changing the filter of
+    one column evaluates only that column. Adding a filter, or replacing one
+    with a narrower filter, evaluates it only over the rows passing all
+    filters. The mask of that column is then known only for those rows, and
+    is evaluated in full if a later change widens the result.
+
+    Args:
+        column_values (Callable[[int], Sequence[Any]]): Callable returning the
+            values of a column, by column number.
+        column_mask (Callable[[int, Filter], ndarray], optional): Callable
+            returning the mask of a whole column passing a filter, like
+            `RowStore.filter_mask`. If None, `Filter.mask` of the column values.
+    """
+
+    def __init__(self, column_values: Callable[[int], Sequence[Any]],
+                 column_mask: Optional[Callable[[int, Filter], np.ndarray]] = None) -> None:
+        """Create FilterEngine object.
+
+        Args:
+            column_values (Callable[[int], Sequence[Any]]): Column values getter.
+            column_mask (Callable[[int, Filter], ndarray], optional): Column mask getter.
+        """
+        self._column_values = column_values
+        self._column_mask = column_mask or (
+            lambda col, column_filter: column_filter.mask(column_values(col)))
+        self._filters: Dict[int, Filter] = {}
+        # Full mask per column, None if evaluated only over the passing rows
+        self._masks: Dict[int, Optional[np.ndarray]] = {}
+        self._combined: Optional[np.ndarray] = None
+
+    @property
+    def filters(self) -> Dict[int, Filter]:
+        """Filters by column number."""
+        return dict(self._filters)
+
+    def set_filter(self, col: int, column_filter: Optional[Filter]) -> None:
+        """Set or remove the filter of a column.
+
+        Args:
+            col (int): Column number.
+            column_filter (Filter, optional): Filter, None to remove it.
+        """
+        previous = self._filters.get(col)
+        if column_filter is None:
+            if previous is not None:
+                del self._filters[col]
+                del self._masks[col]
+                self._combine()
+            return
+        self._filters[col] = column_filter
+        if self._combined is not None and (
+                previous is None or column_filter.narrows(previous)):
+            self._refine(col, column_filter)
+        else:
+            self._masks[col] = self._column_mask(col, column_filter)
+            self._combine()
+
+    def clear(self) -> None:
+        """Remove all filters."""
+        self._filters.clear()
+        self._masks.clear()
+        self._combined = None
+
+    def insert_rows(self, row: int, count: int) -> None:
+        """Insert rows into the masks, the new rows passing all filters.
+
+        Args:
+            row (int): Data row where rows were inserted.
+            count (int): Number of inserted rows.
+        """
+        passing = np.ones(count, dtype=bool)
+        for col, mask in self._masks.items():
+            if mask is not None:
+                self._masks[col] = np.insert(mask, row, passing)
+        if self._combined is not None:
+            self._combined = np.insert(self._combined, row, passing)
+
+    def remove_rows(self, rows: np.ndarray) -> None:
+        """Remove rows from the masks.
+
+        Args:
+            rows (ndarray): Removed data rows.
+        """
+        for col, mask in self._masks.items():
+            if mask is not None:
+                self._masks[col] = np.delete(mask, rows)
+        if self._combined is not None:
+            self._combined = np.delete(self._combined, rows)
+
+    def mask(self) -> Optional[np.ndarray]:
+        """Return the combined mask of all filters.
+
+        Returns:
+            ndarray, optional: Boolean mask of the passing rows, None if no
+                filter is set.
+        """
+        return self._combined
+
+    def _refine(self, col: int, column_filter: Filter) -> None:
+        assert self._combined is not None
+        rows = np.flatnonzero(self._combined)
+        passing = column_filter.mask(self._column_values(col).take(rows))
+        combined = self._combined.copy()
+        combined[rows[~passing]] = False
+        self._masks[col] = None
+        self._combined = combined
+
+    def _combine(self) -> None:
+        if not self._filters:
+            self._combined = None
+            return
+        combined = None
+        for col, column_filter in self._filters.items():
+            mask = self._masks[col]
+            if mask is None:
+                mask = self._masks[col] = self._column_mask(col, column_filter)
+            combined = mask.copy() if combined is None else combined & mask
+        self._combined = combined
@@ -0,0 +1,154 @@
+"""Header view painting index labels."""
+
+from typing import List, Optional
+
+import numpy as np
+
+from qspreadsheet import qt
+from qspreadsheet.index_model import IndexModel
+
+# Sections measured from each end of the header for the level widths
+SIZE_SAMPLE_SECTIONS = 100
+# Label padding on both sides of the text
+LABEL_MARGIN = 12
+# Padding above and below a line of text
+LINE_MARGIN = 6
+
+
+def sample_sections(count: int, sample: int = SIZE_SAMPLE_SECTIONS) -> np.ndarray:
+    """Return the first and last sections of a header, to measure its size.
+
+    Args:
+        count (int): Number of sections.
+        sample (int): Number of sections taken from each end.
+
+    Returns:
+        ndarray: Logical section numbers.
+    """
+    if count <= 2 * sample:
+        return np.arange(count)
+    return np.r_[0:sample, count - sample:count]
+
+
+class IndexHeaderView(qt.QHeaderView):
+    """Header view painting the labels of an index model.
+
+    The header is installed on the table view itself, so its sections are the
+    rows or columns of the table, and it scrolls and resizes with them. Each
+    section paints its labels straight from `IndexModel.label`, backed by the
+    label cache, without item views, delegates or spans. A MultiIndex is
+    painted as one band per level. Repeated labels of the outer levels are
+    painted only at the start of their run, or on the first visible section.
+
+    Args:
+        orientation (Qt.Orientation): Horizontal for column labels, vertical
+            for row labels.
+        index_model (IndexModel): Model of the labels.
+        parent (QWidget): Optional parent for this header.
+    """
+
+    def __init__(self, orientation: qt.Qt.Orientation, index_model: IndexModel,
+                 parent: Optional[qt.QWidget] = None) -> None:
+        """Create IndexHeaderView object.
+
+        Args:
+            orientation (Qt.Orientation): Header orientation.
+            index_model (IndexModel): Model of the labels.
+            parent (QWidget): Optional parent for this header.
+        """
+        super().__init__(orientation, parent)
+        self._index_model = index_model
+        self._level_extents: Optional[List[int]] = None
+        self.setSectionsClickable(True)
+        self.setHighlightSections(True)
+        index_model.modelReset.connect(self.invalidate_levels)
+        self.sectionCountChanged.connect(self.invalidate_levels)
+
+    @property
+    def index_model(self) -> IndexModel:
+        """Model of the labels."""
+        return self._index_model
+
+    def level_extents(self) -> List[int]:
+        """Return the size of each level band, across the sections.
+
+        Bands of a horizontal header are one line high. Bands of a vertical
+        header are as wide as the widest label of `sample_sections`.
+
+        Returns:
+            List[int]: Height or width per level, outer level first.
+        """
+        if self._level_extents is None:
+            self._level_extents = self._measure_levels()
+        return self._level_extents
+
+    def invalidate_levels(self, *args) -> None:
+        """Measure the level bands again, when the labels changed."""
+        del args  # Unused, signals arguments
+        self._level_extents = None
+        self.updateGeometry()
+        self.geometriesChanged.emit()
+
+    def _line_height(self) -> int:
+        return self.fontMetrics().height() + LINE_MARGIN
+
+    def _measure_levels(self) -> List[int]:
+        nlevels = self._index_model.nlevels
+        if self.orientation() == qt.Qt.Horizontal:
+            return [self._line_height()] * nlevels
+        metrics = self.fontMetrics()
+        sections = sample_sections(self.count()).tolist()
+        extents = []
+        for level in range(nlevels):
+            labels = {self._index_model.label(section, level) for section in sections}
+            width = max((metrics.horizontalAdvance(label) for label in labels), default=0)
+            extents.append(width + LABEL_MARGIN)
+        return extents
+
+    def sizeHint(self) -> qt.QSize:
+        extent = sum(self.level_extents())
+        if self.orientation() == qt.Qt.Horizontal:
+            return qt.QSize(self.defaultSectionSize(), extent)
+        return qt.QSize(extent, self.defaultSectionSize())
+
+    def sectionSizeFromContents(self, logicalIndex: int) -> qt.QSize:
+        extents = self.level_extents()
+        if self.orientation() == qt.Qt.Vertical:
+            return qt.QSize(sum(extents), self._line_height())
+        metrics = self.fontMetrics()
+        width = max((metrics.horizontalAdvance(self._index_model.label(logicalIndex, level))
+                     for level in range(len(extents))), default=0)
+        return qt.QSize(width + LABEL_MARGIN, sum(extents))
+
+    def paintSection(self, painter: qt.QPainter, rect: qt.QRect, logicalIndex: int) -> None:
+        if not rect.isValid():
+            return
+        option = qt.QStyleOptionHeader()
+        self.initStyleOption(option)
+        option.rect = rect
+        option.section = logicalIndex
+        self.style().drawControl(qt.QStyle.CE_HeaderSection, option, painter, self)
+
+        # Outer labels repeat the previous section, unless it is scrolled out
+        previous = self.logicalIndex(self.visualIndex(logicalIndex) - 1)
+        repeated = previous >= 0 and self.sectionViewportPosition(logicalIndex) > 0
+        horizontal = self.orientation() == qt.Qt.Horizontal
+        extents = self.level_extents()
+        last_level = len(extents) - 1
+        alignment = qt.Qt.AlignLeft | qt.Qt.AlignVCenter
+        painter.save()
+        painter.setPen(self.palette().color(qt.QPalette.ButtonText))
+        offset = 0
+        for level, extent in enumerate(extents):
+            label = self._index_model.label(logicalIndex, level)
+            repeated = repeated and self._index_model.label(previous, level) == label
+            if horizontal:
+                band = qt.QRect(rect.left(), rect.top() + offset, rect.width(), extent)
+            else:
+                band = qt.QRect(rect.left() + offset, rect.top(), extent, rect.height())
+            offset += extent
+            if repeated and level < last_level:
+                continue
+            painter.drawText(band.adjusted(LABEL_MARGIN // 2, 0, -LABEL_MARGIN // 2, 0),
+                             alignment, label)
+        painter.restore()
@@ -1,6 +1,6 @@
 """Index model based on QAbstractTableModel."""
 
-from typing import Any, Optional
+from typing import Any, List, Optional, Sequence
 
 import pandas as pd
 
@@ -8,13 +8,37 @@ from qspreadsheet.types import DF, SER
 from qspreadsheet import logging
 from qspreadsheet import qt
 from qspreadsheet import resources_rc
+from qspreadsheet.display_cache import DisplayCache
+from qspreadsheet.row_mapping import RowMapping
+from qspreadsheet.row_store import RowStore
 
 logger = logging.getLogger(__name__)
 
+VIRTUAL_ROW_LABEL = '*'
+
+
+def format_labels(values: Sequence[Any]) -> List[str]:
+    """Format index labels to display strings, vectorized by `Index.astype(str)`.
+
+    Datetime and period labels are formatted like pandas shows them, without
+    building a scalar object per label.
+
+    Args:
+        values (Sequence[Any]): Index labels.
+
+    Returns:
+        List[str]: Display strings.
+    """
+    return pd.Index(values).astype(str).tolist()
+
 
 class IndexModel(qt.QAbstractTableModel):
     """Index model based on QAbstractTableModel.
 
+    A MultiIndex is shown with one row or column per level. Labels are
+    formatted in blocks by `format_labels` and kept in `label_cache`, by
+    label position and level.
+
     Args:
         parent (QObject): Optional parent for this index.
     """
@@ -30,6 +54,55 @@ class IndexModel(qt.QAbstractTableModel):
         """
         super(IndexModel, self).__init__(parent)
         self._data = data
+        self._levels: List[pd.Index] = []
+        self._label_cache = DisplayCache(self._load_labels, self._label_count,
+                                         formatter=format_labels)
+        self._set_index(data)
+
+    def _set_index(self, index: pd.Index) -> None:
+        """Split an index into its levels."""
+        self._data = index
+        self._levels = [index.get_level_values(level) for level in range(index.nlevels)]
+        self._label_cache.clear()
+
+    def _load_labels(self, level: int, start: int, stop: int) -> Sequence[Any]:
+        """Return labels `[start, stop)` of a level for the label cache."""
+        return self._levels[level][start:stop]
+
+    def _label_count(self) -> int:
+        return self._data.size
+
+    @property
+    def label_cache(self) -> DisplayCache:
+        """Cache of formatted labels."""
+        return self._label_cache
+
+    def set_index(self, index: pd.Index) -> None:
+        """Replace the index, resetting the model.
+
+        Args:
+            index (Index): New index.
+        """
+        self.beginResetModel()
+        self._set_index(index)
+        self.endResetModel()
+
+    @property
+    def nlevels(self) -> int:
+        """Number of index levels."""
+        return self._data.nlevels
+
+    def label(self, position: int, level: int) -> str:
+        """Return the display string of a label.
+
+        Args:
+            position (int): Label position, the row or column shown.
+            level (int): Index level.
+
+        Returns:
+            str: Display string.
+        """
+        return self._label_cache.value(position, level)
 
 
 class ColumnIndexModel(IndexModel):
@@ -46,10 +119,10 @@ class ColumnIndexModel(IndexModel):
             parent (QObject): Model's parent
         """
         super().__init__(data, parent)
-    
+
     def data(self, index: qt.QModelIndex, role: int = qt.Qt.DisplayRole) -> Any:
         if role == qt.Qt.DisplayRole:
-            return str(self._data[index.column()])
+            return self.label(index.column(), index.row())
         return None
     
     def columnCount(self, parent: qt.QModelIndex) -> int:
@@ -58,7 +131,7 @@ class ColumnIndexModel(IndexModel):
 
     def rowCount(self, parent: qt.QModelIndex) -> int:
         del parent # Unused
-        return 1
+        return self.nlevels
 
 
 class RowIndexModel(IndexModel):
@@ -66,25 +139,109 @@ class RowIndexModel(IndexModel):
 
     Args:
         parent (QObject): Optional parent for this index.
+        row_mapping (RowMapping, optional): Rows mapping shared with the
+            table model.
+        row_store (RowStore, optional): Store of the table model, to read
+            labels from after rows are inserted or removed.
     """
 
-    def __init__(self, data: pd.Index, parent: Optional[qt.QObject] = None) -> None:
+    def __init__(self, data: pd.Index, parent: Optional[qt.QObject] = None,
+                 row_mapping: Optional[RowMapping] = None,
+                 row_store: Optional[RowStore] = None) -> None:
         """Create RowIndexModel based on QAbstractTableModel.
 
         Args:
             parent (QObject): Model's parent
+            row_mapping (RowMapping, optional): Shared rows mapping.
+            row_store (RowStore, optional): Store to read labels from.
         """
         super().__init__(data, parent)
+        if row_mapping is None:
+            row_mapping = RowMapping(data.size, parent=self)
+        self._row_mapping = row_mapping
+        self._row_store = row_store
+        # Labels are read from the store from the first refresh on
+        self._store_version: Optional[int] = None
+        self._row_mapping.rows_about_to_be_inserted.connect(self._on_rows_about_to_be_inserted)
+        self._row_mapping.rows_inserted.connect(self.endInsertRows)
+        self._row_mapping.rows_about_to_be_removed.connect(self._on_rows_about_to_be_removed)
+        self._row_mapping.rows_removed.connect(self.endRemoveRows)
+        self._row_mapping.about_to_be_reset.connect(self.beginResetModel)
+        self._row_mapping.reset.connect(self.endResetModel)
+        self._row_mapping.virtual_rows_changed.connect(
+            lambda count: self.virtual_rows_enabled.emit(count > 0))
+
+    def _on_rows_about_to_be_inserted(self, first: int, last: int) -> None:
+        self.beginInsertRows(qt.QModelIndex(), first, last)
+
+    def _on_rows_about_to_be_removed(self, first: int, last: int) -> None:
+        self.beginRemoveRows(qt.QModelIndex(), first, last)
+
+    @property
+    def row_mapping(self) -> RowMapping:
+        """Rows mapping shared with the table model."""
+        return self._row_mapping
+
+    @property
+    def nlevels(self) -> int:
+        if self._row_store is not None:
+            return self._row_store.index_nlevels
+        return self._data.nlevels
+
+    def _refresh(self) -> None:
+        """Drop the cached labels of the rows moved since the store last changed.
+
+        Labels are then read from the store block by block. Appended rows
+        keep the labels cached before them, so appending a row costs no pass
+        over the whole index.
+        """
+        store = self._row_store
+        if store is not None and store.version != self._store_version:
+            if self._store_version is None:
+                self._label_cache.clear()
+            else:
+                self._label_cache.invalidate_from(store.moved_since(self._store_version))
+            self._store_version = store.version
+
+    def _load_labels(self, level: int, start: int, stop: int) -> Sequence[Any]:
+        if self._row_store is None:
+            return super()._load_labels(level, start, stop)
+        labels = self._row_store.index_slice(start, stop)
+        if self.nlevels == 1:
+            return labels
+        # Blank rows have no label tuple
+        return [label[level] if isinstance(label, tuple) else None for label in labels]
+
+    def _label_count(self) -> int:
+        if self._row_store is not None:
+            return len(self._row_store)
+        return super()._label_count()
+
+    def label(self, position: int, level: int) -> str:
+        if self._row_mapping.is_virtual(position):
+            return VIRTUAL_ROW_LABEL if level == 0 else ''
+        self._refresh()
+        return self._label_cache.value(self._row_mapping.to_source(position), level)
 
     def data(self, index: qt.QModelIndex, role: int = qt.Qt.DisplayRole) -> Any:
         if role == qt.Qt.DisplayRole:
-            return str(self._data[index.row()])
+            return self.label(index.row(), index.column())
         return None
 
     def columnCount(self, parent: qt.QModelIndex) -> int:
         del parent # Unused
-        return 1
+        return self.nlevels
 
     def rowCount(self, parent: qt.QModelIndex) -> int:
         del parent # Unused
-        return self._data.size
\ No newline at end of file
+        return self._row_mapping.row_count + self._row_mapping.visible_virtual_rows
+
+    def canFetchMore(self, parent: qt.QModelIndex) -> bool:
+        if parent.isValid():
+            return False
+        return self._row_mapping.can_fetch_more()
+
+    def fetchMore(self, parent: qt.QModelIndex) -> None:
+        if parent.isValid():
+            return
+        self._row_mapping.fetch_more()
\ No newline at end of file
@@ -0,0 +1,211 @@
+"""Row store over memory-mapped columns: Arrow IPC files and NumPy memmaps."""
+
+import os
+from typing import Any, Mapping, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from qspreadsheet import logging
+from qspreadsheet.data_source import DataSource, SourceStore
+from qspreadsheet.row_store import column_values
+
+logger = logging.getLogger(__name__)
+
+PathLike = Union[str, os.PathLike]
+
+
+def import_pyarrow() -> Any:
+    """Return the `pyarrow` module, an optional dependency.
+
+    Raises:
+        ImportError: If pyarrow is not installed.
+    """
+    try:
+        import pyarrow
+    except ImportError as exc:
+        raise ImportError('Reading Arrow data requires pyarrow') from exc
+    return pyarrow
+
+
+class ArraySource(DataSource):
+    """Source over one array per column, like NumPy memmaps, read in place.
+
+    Args:
+        columns (Mapping[Any, Sequence[Any]]): Column arrays by label, all
+            of the same length, supporting slicing and `take`.
+    """
+
+    def __init__(self, columns: Mapping[Any, Sequence[Any]]) -> None:
+        """Create ArraySource object.
+
+        Args:
+            columns (Mapping[Any, Sequence[Any]]): Column arrays by label.
+
+        Raises:
+            ValueError: If the columns have different lengths.
+        """
+        super().__init__()
+        lengths = {len(values) for values in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f'Columns have different lengths {sorted(lengths)}')
+        self._arrays = list(columns.values())
+        self._row_count = lengths.pop() if lengths else 0
+        self.columns = pd.Index(list(columns))
+        self.dtypes = [values.dtype for values in self._arrays]
+
+    @property
+    def row_count(self) -> int:
+        return self._row_count
+
+    def block(self, col: int, start: int, stop: int) -> Any:
+        return self._arrays[col][start:stop]
+
+    def take(self, col: int, rows: np.ndarray) -> Any:
+        return self._arrays[col].take(rows)
+
+
+class ArrowSource(DataSource):
+    """Source over the columns of an Arrow table, converted per access.
+
+    Reading rows only converts the record batches holding those rows, so
+    the columns of a memory-mapped file are paged in as they are shown. A
+    block within one record batch of a numeric column without missing
+    values is a zero-copy NumPy view of the mapped buffer.
+
+    Values have the dtype pandas gives the whole column: integer columns
+    with missing values are float, bool columns with missing values are
+    object, and dictionary columns are decoded to their values.
+
+    Args:
+        table (Table): Arrow table.
+    """
+
+    def __init__(self, table: Any) -> None:
+        """Create ArrowSource object.
+
+        Args:
+            table (Table): Arrow table.
+
+        Raises:
+            ImportError: If pyarrow is not installed.
+        """
+        super().__init__()
+        pa = import_pyarrow()
+        self._table = table
+        self._arrays = [table.column(i) for i in range(table.num_columns)]
+        self._value_types = [array.type.value_type if pa.types.is_dictionary(array.type)
+                             else None for array in self._arrays]
+        self.columns = pd.Index(table.column_names)
+        for col, array in enumerate(self._arrays):
+            # Null counts are in the batch metadata, nothing is paged in
+            dtype = self._to_pandas(col, array.slice(0, 0)).dtype
+            if array.null_count and isinstance(dtype, np.dtype):
+                if dtype.kind in 'iu':
+                    dtype = np.dtype(float)
+                elif dtype.kind == 'b':
+                    dtype = np.dtype(object)
+            self.dtypes.append(dtype)
+
+    @property
+    def row_count(self) -> int:
+        return self._table.num_rows
+
+    def block(self, col: int, start: int, stop: int) -> Any:
+        return self._convert(col, self._arrays[col].slice(start, max(stop - start, 0)))
+
+    def take(self, col: int, rows: np.ndarray) -> Any:
+        pa = import_pyarrow()
+        return self._convert(col, self._arrays[col].take(
+            pa.array(np.asarray(rows, dtype=np.int64))))
+
+    def _to_pandas(self, col: int, array: Any) -> pd.Series:
+        if self._value_types[col] is not None:
+            array = array.cast(self._value_types[col])
+        return array.to_pandas()
+
+    def _convert(self, col: int, array: Any) -> Any:
+        dtype = self.dtypes[col]
+        # Chunks of numeric values without missing values are NumPy views
+        if isinstance(dtype, np.dtype) and dtype.kind in 'iuf' \
+                and array.num_chunks == 1 and array.null_count == 0:
+            return array.chunk(0).to_numpy().astype(dtype, copy=False)
+        series = self._to_pandas(col, array)
+        if series.dtype != dtype:
+            series = series.astype(dtype)
+        return column_values(series)
+
+
+class MappedStore(SourceStore):
+    """Row store over memory-mapped columns, paged in by the rows read.
+
+    The columns are not loaded when the store is created. Showing rows reads
+    only the rows shown, so opening a file takes about constant time
+    whatever its size. Sorting, filtering, searching or formatting a column
+    reads the whole column. Like any `SourceStore`, written cells and
+    inserted rows are held in memory apart from the columns, which are never
+    copied nor written. The index is positional.
+
+    Use `from_arrow` for Arrow IPC or Feather files and `from_memmaps` for
+    NumPy memmaps per column.
+
+    Args:
+        columns (Union[Mapping[Any, Sequence[Any]], DataSource]): Column
+            arrays by label, all of the same length, or a source of them.
+    """
+
+    def __init__(self, columns: Union[Mapping[Any, Sequence[Any]], DataSource]) -> None:
+        """Create MappedStore object.
+
+        Args:
+            columns (Union[Mapping[Any, Sequence[Any]], DataSource]): Column
+                arrays by label, or a source of them.
+
+        Raises:
+            ValueError: If the columns have different lengths.
+        """
+        super().__init__(columns if isinstance(columns, DataSource) else ArraySource(columns))
+
+    @classmethod
+    def from_arrow(cls, source: Union[PathLike, Any],
+                   columns: Optional[Sequence[str]] = None) -> 'MappedStore':
+        """Open an Arrow table, memory-mapping an IPC or Feather file.
+
+        Only the file footer and record batch metadata are read. Compressed
+        files are decompressed when opened, so write large files with
+        `compression='uncompressed'` to map them without copying.
+
+        Args:
+            source (Union[PathLike, Table]): Path of an Arrow IPC file, or a
+                `pyarrow.Table`.
+            columns (Sequence[str], optional): Names of the columns to show.
+                All columns if None.
+
+        Raises:
+            ImportError: If pyarrow is not installed.
+
+        Returns:
+            MappedStore: Store over the table columns.
+        """
+        pa = import_pyarrow()
+        table = source
+        if not isinstance(source, pa.Table):
+            table = pa.ipc.open_file(pa.memory_map(os.fspath(source), 'r')).read_all()
+        if columns is not None:
+            table = table.select(list(columns))
+        return cls(ArrowSource(table))
+
+    @classmethod
+    def from_memmaps(cls, columns: Mapping[Any, Union[PathLike, np.ndarray]]) -> 'MappedStore':
+        """Open NumPy arrays per column, memory-mapping `.npy` files.
+
+        Args:
+            columns (Mapping[Any, Union[PathLike, ndarray]]): Path of a
+                `.npy` file, or an array like a `numpy.memmap`, by label.
+
+        Returns:
+            MappedStore: Store over the arrays.
+        """
+        return cls({label: values if isinstance(values, np.ndarray)
+                    else np.load(os.fspath(values), mmap_mode='r')
+                    for label, values in columns.items()})
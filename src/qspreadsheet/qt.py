@@ -10,13 +10,14 @@ os.environ['QT_QPA_PLATFORM_PLUGIN_PATH'] = plugin_path
 
 from PySide2.QtCore import (QAbstractItemModel, QAbstractTableModel, QDate,
                             QDateTime, QMargins, QModelIndex, QObject, QPoint,
-                            QRegExp, QRunnable, QSettings, QSignalMapper,
+                            QRect, QRegExp, QRunnable, QSettings, QSignalMapper,
                             QSize, QSortFilterProxyModel, Qt, QThreadPool,
-                            Signal, QEvent)
+                            QTimer, Signal, QEvent)
 from PySide2.QtGui import (QBrush, QCloseEvent, QColor, QContextMenuEvent,
                            QFont, QFontMetrics, QIcon, QKeySequence, QPixmap,
                            QResizeEvent, QShowEvent, QTextCharFormat,
-                           QTextDocument, QStandardItemModel, QPainter)
+                           QTextDocument, QStandardItemModel, QPainter,
+                           QPalette)
 from PySide2.QtWidgets import (QAction, QApplication, QBoxLayout, QCheckBox,
                                QComboBox, QDateEdit, QDateTimeEdit,
                                QDoubleSpinBox, QGridLayout, QHBoxLayout,
@@ -24,5 +25,6 @@ from PySide2.QtWidgets import (QAction, QApplication, QBoxLayout, QCheckBox,
                                QListWidgetItem, QMainWindow, QMenu,
                                QMessageBox, QPushButton, QSizePolicy, QSpinBox,
                                QStyle, QStyledItemDelegate,
-                               QStyleOptionViewItem, QTableView, QTextEdit,
+                               QStyleOptionHeader, QStyleOptionViewItem,
+                               QTableView, QTextEdit,
                                QVBoxLayout, QLayout, QWidget, QWidgetAction)
@@ -0,0 +1,474 @@
+"""Mapping from view rows to data rows, shared by the table and row index models."""
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+from qspreadsheet import logging
+from qspreadsheet import qt
+
+logger = logging.getLogger(__name__)
+
+
+class RowMapping(qt.QObject):
+    """Mapping from view rows to data rows.
+
+    Shared by the `TableModel` and the `RowIndexModel`, so both models expose
+    the same rows. Rows are mapped through an optional order, a permutation
+    of the data rows, and an optional filter mask. With `fetch_chunk_size`
+    set, rows are exposed incrementally in chunks through `fetch_more`,
+    instead of all at once. Inserting or removing data rows updates the
+    order and mask in place, so sorted and filtered views keep their rows.
+
+    Virtual rows are blank rows after the data rows, which exist only in the
+    views, to append new rows from. They are exposed once all data rows are.
+
+    Args:
+        source_size (int): Number of data rows.
+        fetch_chunk_size (int, optional): Number of rows exposed per fetch.
+            If None, all rows are exposed at once.
+        parent (QObject): Optional parent for this object.
+    """
+
+    rows_about_to_be_inserted = qt.Signal(int, int)
+    rows_inserted = qt.Signal()
+    rows_about_to_be_removed = qt.Signal(int, int)
+    rows_removed = qt.Signal()
+    about_to_be_reset = qt.Signal()
+    virtual_rows_changed = qt.Signal(int)
+    reset = qt.Signal()
+
+    def __init__(self, source_size: int, fetch_chunk_size: Optional[int] = None,
+                 parent: Optional[qt.QObject] = None) -> None:
+        """Create RowMapping object.
+
+        Args:
+            source_size (int): Number of data rows.
+            fetch_chunk_size (int, optional): Number of rows exposed per fetch.
+            parent (QObject): Optional parent for this object.
+        """
+        super().__init__(parent)
+        if fetch_chunk_size is not None and fetch_chunk_size < 1:
+            raise ValueError(f'fetch_chunk_size must be positive, got {fetch_chunk_size}')
+        self._fetch_chunk_size = fetch_chunk_size
+        self._source_size = source_size
+        self._order: Optional[np.ndarray] = None
+        self._mask: Optional[np.ndarray] = None
+        self._rows: Optional[np.ndarray] = None
+        self._inverse: Optional[np.ndarray] = None
+        self._size = source_size
+        self._row_count = self._initial_row_count()
+        self._virtual_rows = 0
+        self._visible_virtual_rows = 0
+        # (view row, data row, count) of the insert or remove in progress
+        self._pending: Optional[Tuple[int, int, int]] = None
+        self._removed: Optional[np.ndarray] = None
+        # Order and mask after the restore in progress
+        self._restored: Optional[Tuple[np.ndarray, Optional[np.ndarray]]] = None
+
+    @property
+    def fetch_chunk_size(self) -> Optional[int]:
+        """Number of rows exposed per fetch, None if all rows are exposed."""
+        return self._fetch_chunk_size
+
+    @property
+    def source_size(self) -> int:
+        """Number of data rows."""
+        return self._source_size
+
+    @property
+    def size(self) -> int:
+        """Number of mapped rows, the data rows passing the filter."""
+        return self._size
+
+    @property
+    def row_count(self) -> int:
+        """Number of rows exposed to the views."""
+        return self._row_count
+
+    @property
+    def virtual_rows(self) -> int:
+        """Number of virtual rows after the data rows."""
+        return self._virtual_rows
+
+    @property
+    def visible_virtual_rows(self) -> int:
+        """Number of virtual rows exposed to the views, after `row_count` data rows."""
+        return self._visible_virtual_rows
+
+    def set_virtual_rows(self, count: int) -> None:
+        """Set the number of virtual rows.
+
+        Args:
+            count (int): Number of virtual rows, 0 to disable them.
+        """
+        if count < 0:
+            raise ValueError(f'Expected a non-negative number of virtual rows, got {count}')
+        if count == self._virtual_rows:
+            return
+        self._virtual_rows = count
+        self._sync_virtual_rows()
+        self.virtual_rows_changed.emit(count)
+
+    def is_virtual(self, row: int) -> bool:
+        """Return True if a view row is a virtual row.
+
+        Args:
+            row (int): View row.
+        """
+        return row >= self._row_count
+
+    @property
+    def order(self) -> Optional[np.ndarray]:
+        """Permutation of all data rows, None if rows are in data order."""
+        return self._order
+
+    @property
+    def mask(self) -> Optional[np.ndarray]:
+        """Boolean mask of the data rows passing the filter, None if unfiltered."""
+        return self._mask
+
+    @property
+    def rows(self) -> Optional[np.ndarray]:
+        """Data rows in view order, None if all rows are shown in data order."""
+        return self._rows
+
+    def to_source(self, row: int) -> int:
+        """Map a view row to a data row.
+
+        Args:
+            row (int): View row.
+
+        Returns:
+            int: Data row.
+        """
+        if self._rows is None:
+            return row
+        return int(self._rows[row])
+
+    def from_source(self, rows: np.ndarray) -> np.ndarray:
+        """Map data rows to view rows.
+
+        Args:
+            rows (ndarray): Data rows.
+
+        Returns:
+            ndarray: View rows, -1 for data rows filtered out.
+        """
+        if self._rows is None:
+            return np.asarray(rows)
+        if self._inverse is None:
+            self._inverse = np.full(self._source_size, -1, dtype=np.intp)
+            self._inverse[self._rows] = np.arange(self._rows.size)
+        return self._inverse[rows]
+
+    def order_positions(self, rows: np.ndarray) -> Optional[np.ndarray]:
+        """Return the positions of data rows in the order.
+
+        Args:
+            rows (ndarray): Data rows.
+
+        Returns:
+            ndarray, optional: Position of each row in `order`, None if rows
+                are in data order.
+        """
+        if self._order is None:
+            return None
+        positions = np.empty(self._order.size, dtype=np.intp)
+        positions[self._order] = np.arange(self._order.size)
+        return positions[rows]
+
+    def set_order(self, order: Optional[np.ndarray]) -> None:
+        """Set the order of the data rows, resetting the attached models.
+
+        Args:
+            order (ndarray, optional): Permutation of the data rows, None for
+                data order.
+        """
+        if order is not None and order.size != self._source_size:
+            raise ValueError(f'Expected order of {self._source_size} rows, got {order.size}')
+        self.begin_reset()
+        self._order = order
+        self._update_rows()
+        self.reset.emit()
+
+    def set_mask(self, mask: Optional[np.ndarray]) -> None:
+        """Set the filter mask of the data rows, resetting the attached models.
+
+        Args:
+            mask (ndarray, optional): Boolean mask of the data rows to show,
+                None to show all rows.
+        """
+        if mask is not None and mask.size != self._source_size:
+            raise ValueError(f'Expected mask of {self._source_size} rows, got {mask.size}')
+        self.begin_reset()
+        self._mask = mask
+        self._update_rows()
+        self.reset.emit()
+
+    def can_fetch_more(self) -> bool:
+        """Return True if there are mapped rows not yet exposed."""
+        return self._row_count < self._size
+
+    def fetch_more(self) -> None:
+        """Expose the next chunk of rows."""
+        if self._fetch_chunk_size is None:
+            self.fetch_to(self._size)
+        else:
+            self.fetch_to(self._row_count + self._fetch_chunk_size)
+
+    def fetch_to(self, row_count: int) -> None:
+        """Expose rows until at least `row_count` rows are exposed.
+
+        Args:
+            row_count (int): Number of rows to expose.
+        """
+        row_count = min(row_count, self._size)
+        if row_count <= self._row_count:
+            return
+        self.rows_about_to_be_inserted.emit(self._row_count, row_count - 1)
+        self._row_count = row_count
+        self.rows_inserted.emit()
+        self._sync_virtual_rows()
+
+    def begin_insert(self, row: int, count: int) -> int:
+        """Start inserting data rows before a view row. Must be followed by `end_insert`.
+
+        Args:
+            row (int): View row to insert before, `size` to append.
+            count (int): Number of rows to insert.
+
+        Returns:
+            int: Data row where the rows are to be inserted.
+        """
+        if not 0 <= row <= self._size:
+            raise IndexError(f'Row {row} is out of bounds for {self._size} rows')
+        source_row = self._source_size if row == self._size else self.to_source(row)
+        self._begin_insert(row, source_row, count)
+        return source_row
+
+    def begin_insert_source(self, source_row: int, count: int) -> int:
+        """Start inserting data rows before a data row. Must be followed by `end_insert`.
+
+        Args:
+            source_row (int): Data row to insert before, `source_size` to append.
+            count (int): Number of rows to insert.
+
+        Returns:
+            int: View row where the rows are to be shown.
+        """
+        if not 0 <= source_row <= self._source_size:
+            raise IndexError(f'Row {source_row} is out of bounds for {self._source_size} rows')
+        if self._rows is None:
+            row = source_row
+        else:
+            # Rows go before the data row in the order, count the shown rows before it
+            if self._order is None:
+                before = np.arange(source_row)
+            elif source_row == self._source_size:
+                before = self._order
+            else:
+                before = self._order[:int(np.flatnonzero(self._order == source_row)[0])]
+            row = before.size if self._mask is None else int(np.count_nonzero(self._mask[before]))
+        self._begin_insert(row, source_row, count)
+        return row
+
+    def begin_restore(self, rows: np.ndarray, positions: np.ndarray) -> int:
+        """Start putting back removed data rows at their positions in the order.
+
+        Must be followed by `end_insert`. The rows pass the filter. If they
+        are not consecutive view rows, the attached models are reset instead.
+
+        Args:
+            rows (ndarray): Sorted data rows, numbered as after the insert.
+            positions (ndarray): Position of each row in the order, as
+                returned by `order_positions` before the rows were removed.
+
+        Returns:
+            int: First view row affected.
+        """
+        if self._order is None:
+            raise ValueError('Rows can only be restored into a sorted mapping')
+        size = self._source_size + rows.size
+        kept = np.ones(size, dtype=bool)
+        kept[rows] = False
+        # Renumber the current data rows around the restored ones
+        order = np.flatnonzero(kept)[self._order]
+        by_position = np.argsort(positions, kind='stable')
+        at = np.clip(positions[by_position] - np.arange(rows.size), 0, order.size)
+        order = np.insert(order, at, rows[by_position])
+        mask = None
+        if self._mask is not None:
+            mask = np.ones(size, dtype=bool)
+            mask[kept] = self._mask
+        shown = order if mask is None else order[mask[order]]
+        view_rows = np.flatnonzero(~kept[shown])
+        first = int(view_rows[0])
+        self._restored = (order, mask)
+        if view_rows[-1] - first + 1 == rows.size:
+            self._begin_insert(first, -1, rows.size)
+        else:
+            self._pending = (first, -1, -1)
+            self.begin_reset()
+        return first
+
+    def _begin_insert(self, row: int, source_row: int, count: int) -> None:
+        self._pending = (row, source_row, count)
+        if row <= self._row_count:
+            self.rows_about_to_be_inserted.emit(row, row + count - 1)
+
+    def end_insert(self) -> None:
+        """Finish inserting data rows. The new rows pass the filter."""
+        assert self._pending is not None
+        row, source_row, count = self._pending
+        self._pending = None
+        if self._restored is not None:
+            self._order, self._mask = self._restored
+            self._restored = None
+            self._source_size = self._order.size
+            if count < 0:
+                self._update_rows()
+                self.reset.emit()
+                return
+        else:
+            if self._order is not None:
+                order = np.where(self._order >= source_row, self._order + count, self._order)
+                at = (order.size if source_row == self._source_size
+                      else int(np.flatnonzero(order == source_row + count)[0]))
+                self._order = np.insert(order, at, np.arange(source_row, source_row + count))
+            if self._mask is not None:
+                self._mask = np.insert(self._mask, source_row, np.ones(count, dtype=bool))
+            self._source_size += count
+        self._update_rows(keep_row_count=True)
+        if row <= self._row_count:
+            self._row_count += count
+            self.rows_inserted.emit()
+        self._sync_virtual_rows()
+
+    def begin_remove(self, row: int, count: int) -> np.ndarray:
+        """Start removing view rows. Must be followed by `end_remove`.
+
+        Args:
+            row (int): First view row to remove.
+            count (int): Number of rows to remove.
+
+        Returns:
+            ndarray: Sorted data rows to remove.
+        """
+        if row < 0 or count < 1 or row + count > self._size:
+            raise IndexError(f'Rows [{row}, {row + count}) are out of bounds '
+                             f'for {self._size} rows')
+        if self._rows is None:
+            removed = np.arange(row, row + count)
+        else:
+            removed = np.sort(self._rows[row:row + count])
+        self._begin_remove(removed, row, count)
+        return removed
+
+    def begin_remove_source(self, rows: np.ndarray) -> int:
+        """Start removing data rows. Must be followed by `end_remove`.
+
+        If the shown rows among them are not consecutive view rows, the
+        attached models are reset instead.
+
+        Args:
+            rows (ndarray): Sorted data rows to remove.
+
+        Returns:
+            int: First view row affected.
+        """
+        view_rows = np.sort(self.from_source(rows))
+        view_rows = view_rows[view_rows >= 0]
+        if view_rows.size == 0:
+            # Nothing shown is removed
+            self._begin_remove(rows, self._size, 0)
+            return self._size
+        first = int(view_rows[0])
+        if view_rows[-1] - first + 1 == view_rows.size:
+            self._begin_remove(rows, first, view_rows.size)
+        else:
+            self._begin_remove(rows, first, -1)
+            self.begin_reset()
+        return first
+
+    def _begin_remove(self, removed: np.ndarray, row: int, count: int) -> None:
+        self._pending = (row, -1, count)
+        self._removed = removed
+        if count > 0 and row < self._row_count:
+            self.rows_about_to_be_removed.emit(row, min(row + count, self._row_count) - 1)
+
+    def end_remove(self) -> None:
+        """Finish removing rows."""
+        assert self._pending is not None and self._removed is not None
+        row, _, count = self._pending
+        removed = self._removed
+        self._pending = self._removed = None
+        if self._order is not None or self._mask is not None:
+            gone = np.zeros(self._source_size, dtype=bool)
+            gone[removed] = True
+            if self._order is not None:
+                order = self._order[~gone[self._order]]
+                # Shift each data row down by the number of removed rows before it
+                self._order = order - np.cumsum(gone)[order]
+            if self._mask is not None:
+                self._mask = self._mask[~gone]
+        self._source_size -= removed.size
+        if count < 0:
+            self._update_rows()
+            self.reset.emit()
+            return
+        self._update_rows(keep_row_count=True)
+        if count > 0 and row < self._row_count:
+            self._row_count -= min(row + count, self._row_count) - row
+            self.rows_removed.emit()
+        self._sync_virtual_rows()
+
+    def begin_reset(self) -> None:
+        """Start replacing the mapped rows. Must be followed by `end_reset`."""
+        self.about_to_be_reset.emit()
+
+    def end_reset(self, size: int) -> None:
+        """Finish replacing the mapped rows. Drops the rows order and filter.
+
+        Args:
+            size (int): New number of data rows.
+        """
+        self._source_size = size
+        self._order = None
+        self._mask = None
+        self._update_rows()
+        self.reset.emit()
+
+    def _update_rows(self, keep_row_count: bool = False) -> None:
+        if self._order is None:
+            self._rows = None if self._mask is None else np.flatnonzero(self._mask)
+        elif self._mask is None:
+            self._rows = self._order
+        else:
+            self._rows = self._order[self._mask[self._order]]
+        self._inverse = None
+        self._size = self._source_size if self._rows is None else self._rows.size
+        if not keep_row_count:
+            self._row_count = self._initial_row_count()
+            self._visible_virtual_rows = self._target_virtual_rows()
+
+    def _target_virtual_rows(self) -> int:
+        return self._virtual_rows if self._row_count == self._size else 0
+
+    def _sync_virtual_rows(self) -> None:
+        """Expose or hide virtual rows, after data rows were exposed or removed."""
+        first = self._row_count + self._visible_virtual_rows
+        target = self._target_virtual_rows()
+        if target > self._visible_virtual_rows:
+            self.rows_about_to_be_inserted.emit(first, self._row_count + target - 1)
+            self._visible_virtual_rows = target
+            self.rows_inserted.emit()
+        elif target < self._visible_virtual_rows:
+            self.rows_about_to_be_removed.emit(self._row_count + target, first - 1)
+            self._visible_virtual_rows = target
+            self.rows_removed.emit()
+
+    def _initial_row_count(self) -> int:
+        if self._fetch_chunk_size is None:
+            return self._size
+        return min(self._size, self._fetch_chunk_size)
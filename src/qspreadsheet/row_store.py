@@ -0,0 +1,712 @@
+"""Editable columnar row store, with cheap row inserts and removes."""
+
+import collections
+from typing import Any, Deque, List, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from qspreadsheet import logging
+from qspreadsheet import sorting
+from qspreadsheet.coercion import coerce_values
+from qspreadsheet.filters import Filter
+from qspreadsheet.types import DF, SER
+
+logger = logging.getLogger(__name__)
+
+MIN_CAPACITY = 16
+MIN_GAP = 16
+# Number of versions whose first moved row is kept, for `moved_since`
+MAX_MOVES = 64
+
+
+def column_values(series: Union[SER, pd.Index]) -> Sequence[Any]:
+    """Return positional accessor for the values of a column.
+
+    Plain NumPy dtypes are returned as an ndarray view, so lookups are
+    simple array indexing. Datetime-like and extension dtypes are returned
+    as their pandas array, which yields the same scalars as `iloc`.
+
+    Args:
+        series (Union[Series, Index]): DataFrame column or index.
+
+    Returns:
+        Sequence[Any]: Array supporting positional indexing and slicing.
+    """
+    dtype = series.dtype
+    if isinstance(dtype, np.dtype) and dtype.kind not in 'mM':
+        return series.to_numpy(copy=False)
+    return series.array
+
+
+def blank_value(dtype: np.dtype) -> Any:
+    """Return the value of new, blank rows in a NumPy column.
+
+    Args:
+        dtype (dtype): NumPy dtype.
+
+    Returns:
+        Any: NaN for float and complex, zero for int, False for bool, an
+            empty string for unicode and None for object columns.
+    """
+    if dtype.kind in 'fc':
+        return np.nan
+    if dtype.kind == 'U':
+        return ''
+    if dtype.kind == 'O':
+        return None
+    return dtype.type(0)
+
+
+def grow(values: Sequence[Any], size: int, capacity: int) -> Sequence[Any]:
+    """Copy the first `size` values into a new array of `capacity` values.
+
+    Args:
+        values (Sequence[Any]): ndarray or pandas array.
+        size (int): Number of values to keep.
+        capacity (int): Size of the new array.
+
+    Returns:
+        Sequence[Any]: New array, blank after the first `size` values.
+    """
+    if isinstance(values, np.ndarray):
+        result = np.empty(capacity, dtype=values.dtype)
+        result[:size] = values[:size]
+        result[size:] = blank_value(values.dtype)
+        return result
+    positions = np.arange(capacity)
+    positions[size:] = -1
+    return values.take(positions, allow_fill=True)
+
+
+def concat_values(pieces: List[Any]) -> Any:
+    """Concatenate ndarrays or pandas arrays of one dtype."""
+    if all(isinstance(piece, np.ndarray) for piece in pieces):
+        return np.concatenate(pieces)
+    return type(pieces[0])._concat_same_type(pieces)
+
+
+class RowStore:
+    """Columnar store of rows, with cheap inserts and removes.
+
+    Rows are kept in per-column physical arrays with spare capacity, grown
+    by doubling, so appending rows is amortized O(1). A logical-to-physical
+    row map, a gap buffer, orders the rows. Inserting or removing rows moves
+    the gap and never copies the columns. Removed rows are reclaimed when
+    they outnumber the live ones.
+
+    The store starts with views of the DataFrame columns, so creating it
+    copies nothing. A column is copied when it is first written, so the
+    DataFrame is never modified, whatever the pandas Copy-on-Write mode.
+    `to_frame` returns the current data as a new contiguous DataFrame.
+
+    A default `RangeIndex` is kept positional: labels follow the row
+    positions, as after `reset_index(drop=True)`. Other indexes are stored
+    like a column.
+
+    Args:
+        data (DataFrame): Initial data.
+    """
+
+    def __init__(self, data: DF) -> None:
+        """Create RowStore object.
+
+        Args:
+            data (DataFrame): Initial data.
+        """
+        self._version = 0
+        self.reset(data)
+
+    def reset(self, data: DF) -> None:
+        """Replace all rows with the rows of a DataFrame.
+
+        Args:
+            data (DataFrame): New data.
+        """
+        self._reset(data.columns,
+                    [column_values(data.iloc[:, i]) for i in range(data.columns.size)],
+                    data.index)
+        self._shared = set(range(data.columns.size))
+
+    def _reset(self, labels: pd.Index, columns: List[Sequence[Any]], index: pd.Index) -> None:
+        """Replace all rows with column arrays, of the length of the index."""
+        self._version += 1
+        # Versions and the first logical row they moved, since the rows were replaced
+        self._moves: Deque[Tuple[int, int]] = collections.deque(maxlen=MAX_MOVES)
+        self._label_offset = 0
+        self._labels = labels
+        self._columns = columns
+        # Columns still views of the caller's data, copied before they are written
+        self._shared: Set[int] = set()
+        self._index_names = list(index.names)
+        self._multi_index = isinstance(index, pd.MultiIndex)
+        self._index: Optional[Sequence[Any]] = None
+        if not (isinstance(index, pd.RangeIndex) and index.start == 0 and index.step == 1):
+            self._index = column_values(index)
+        self._length = index.size
+        self._size = index.size
+        self._capacity = index.size
+        self._garbage = 0
+        # Gap buffer of physical rows, None while logical and physical rows match
+        self._map: Optional[np.ndarray] = None
+        self._gap_start = 0
+        self._gap_end = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    @property
+    def version(self) -> int:
+        """Counter incremented whenever rows are inserted, removed or replaced."""
+        return self._version
+
+    def moved_since(self, version: int) -> int:
+        """Return the first logical row moved since an earlier version.
+
+        Rows before it kept their position and label, so cached strings
+        of those rows stay valid.
+
+        Args:
+            version (int): Earlier `version`.
+
+        Returns:
+            int: First moved row, the number of rows if none moved, 0 if the
+                rows were replaced or the version is too old.
+        """
+        moves = [row for moved, row in self._moves if moved > version]
+        if len(moves) < self._version - version:
+            return 0
+        return min(moves, default=self._length)
+
+    def _moved(self, row: int) -> None:
+        """Count a new version, in which the logical rows from `row` on moved."""
+        self._version += 1
+        self._moves.append((self._version, row))
+
+    @property
+    def column_count(self) -> int:
+        """Number of columns."""
+        return len(self._columns)
+
+    @property
+    def columns(self) -> pd.Index:
+        """Column labels."""
+        return self._labels
+
+    @property
+    def index_nlevels(self) -> int:
+        """Number of index levels."""
+        return len(self._index_names)
+
+    @property
+    def positional_index(self) -> bool:
+        """Whether the index labels are the row positions."""
+        return self._index is None
+
+    @property
+    def max_rows(self) -> Optional[int]:
+        """Maximum number of rows, None if unbounded."""
+        return None
+
+    @property
+    def read_only(self) -> bool:
+        """Whether rows cannot be written, inserted or removed."""
+        return False
+
+    def dtype(self, col: int) -> Any:
+        """Return the dtype of a column.
+
+        Args:
+            col (int): Column number.
+        """
+        return self._columns[col].dtype
+
+    def physical_rows(self, rows: np.ndarray) -> np.ndarray:
+        """Map logical rows to physical rows.
+
+        Args:
+            rows (ndarray): Logical rows.
+
+        Returns:
+            ndarray: Physical rows.
+        """
+        if self._map is None:
+            return rows
+        rows = np.asarray(rows)
+        return self._map[np.where(rows < self._gap_start, rows,
+                                  rows + (self._gap_end - self._gap_start))]
+
+    def _physical_range(self, start: int, stop: int) -> Union[slice, np.ndarray]:
+        if self._map is None:
+            return slice(start, stop)
+        gap_start, gap_len = self._gap_start, self._gap_end - self._gap_start
+        if stop <= gap_start:
+            return self._map[start:stop]
+        if start >= gap_start:
+            return self._map[start + gap_len:stop + gap_len]
+        return np.concatenate((self._map[start:gap_start],
+                               self._map[self._gap_end:stop + gap_len]))
+
+    def slice(self, col: int, start: int, stop: int) -> Sequence[Any]:
+        """Return the values of logical rows `[start, stop)` of a column.
+
+        Args:
+            col (int): Column number.
+            start (int): First row.
+            stop (int): One past the last row.
+
+        Returns:
+            Sequence[Any]: Column values, a view when rows are in physical order.
+        """
+        rows = self._physical_range(start, min(stop, self._length))
+        if isinstance(rows, slice):
+            return self._columns[col][rows]
+        return self._columns[col].take(rows)
+
+    def take(self, col: int, rows: np.ndarray) -> Sequence[Any]:
+        """Return the values of logical rows of a column.
+
+        Args:
+            col (int): Column number.
+            rows (ndarray): Logical rows.
+
+        Returns:
+            Sequence[Any]: Column values.
+        """
+        return self._columns[col].take(self.physical_rows(rows))
+
+    def column(self, col: int) -> Sequence[Any]:
+        """Return all values of a column in logical order.
+
+        Args:
+            col (int): Column number.
+
+        Returns:
+            Sequence[Any]: Column values, a view when rows are in physical order.
+        """
+        return self.slice(col, 0, self._length)
+
+    def argsort(self, columns: Sequence[int],
+                ascending: Union[bool, Sequence[bool]] = True) -> np.ndarray:
+        """Return the stable permutation sorting the rows by columns, see `sorting.argsort`.
+
+        Args:
+            columns (Sequence[int]): Column numbers, most significant first.
+            ascending (Union[bool, Sequence[bool]]): Sort direction, for all
+                or for each column.
+
+        Returns:
+            ndarray: Logical rows in sorted order.
+        """
+        return sorting.argsort([self.column(col) for col in columns], ascending)
+
+    def filter_mask(self, col: int, column_filter: Filter) -> np.ndarray:
+        """Return the mask of the rows of a column passing a filter.
+
+        Args:
+            col (int): Column number.
+            column_filter (Filter): Filter of the column.
+
+        Returns:
+            ndarray: Boolean mask over the logical rows.
+        """
+        return column_filter.mask(self.column(col))
+
+    def value(self, row: int, col: int) -> Any:
+        """Return the value of a cell.
+
+        Args:
+            row (int): Logical row.
+            col (int): Column number.
+        """
+        return self._columns[col][int(self.physical_rows(np.array([row]))[0])]
+
+    def index_label(self, row: int) -> Any:
+        """Return the index label of a row.
+
+        Args:
+            row (int): Logical row.
+        """
+        if self._index is None:
+            return self._label_offset + row
+        return self._index[int(self.physical_rows(np.array([row]))[0])]
+
+    def index_slice(self, start: int, stop: int) -> Sequence[Any]:
+        """Return the index labels of logical rows `[start, stop)`.
+
+        Args:
+            start (int): First row.
+            stop (int): One past the last row.
+        """
+        stop = min(stop, self._length)
+        if self._index is None:
+            return np.arange(start, stop) + self._label_offset
+        rows = self._physical_range(start, stop)
+        if isinstance(rows, slice):
+            return self._index[rows]
+        return self._index.take(rows)
+
+    def index(self) -> pd.Index:
+        """Return the index of the rows, in logical order."""
+        if self._index is None:
+            return pd.RangeIndex(self._label_offset, self._label_offset + self._length,
+                                 name=self._index_names[0])
+        return self._make_index(self.index_slice(0, self._length))
+
+    def _make_index(self, labels: Sequence[Any]) -> pd.Index:
+        if self._multi_index:
+            # Blank rows have no label tuple
+            blank = (None,) * len(self._index_names)
+            return pd.MultiIndex.from_tuples(
+                [label if isinstance(label, tuple) else blank for label in labels],
+                names=self._index_names)
+        return pd.Index(labels, name=self._index_names[0])
+
+    def to_frame(self) -> DF:
+        """Return the rows as a new, contiguous DataFrame."""
+        frame = pd.DataFrame({i: pd.Series(self.column(i), copy=True)
+                              for i in range(self.column_count)})
+        frame.columns = self._labels
+        frame.index = self.index()
+        return frame
+
+    def take_frame(self, rows: np.ndarray) -> DF:
+        """Return some rows as a new DataFrame.
+
+        Args:
+            rows (ndarray): Logical rows.
+        """
+        frame = pd.DataFrame({i: pd.Series(self.take(i, rows))
+                              for i in range(self.column_count)})
+        frame.columns = self._labels
+        if self._index is None:
+            frame.index = pd.Index(np.asarray(rows) + self._label_offset)
+        else:
+            frame.index = self._make_index(self._index.take(self.physical_rows(rows)))
+        return frame
+
+    def write(self, col: int, rows: np.ndarray, values: Any) -> None:
+        """Write values, already coerced to the column dtype, into rows of a column.
+
+        Args:
+            col (int): Column number.
+            rows (ndarray): Logical rows.
+            values (Any): Array of values, or one value for all rows.
+        """
+        column = self._columns[col]
+        if col in self._shared:
+            column = self._columns[col] = column.copy()
+            self._shared.discard(col)
+        column[self.physical_rows(rows)] = values
+
+    def insert_rows(self, row: int, count: int, values: Optional[DF] = None) -> None:
+        """Insert rows before a logical row.
+
+        Args:
+            row (int): Logical row to insert before, the number of rows to append.
+            count (int): Number of rows to insert.
+            values (DataFrame, optional): Values of the new rows, with one
+                column per store column. Blank rows are inserted if None.
+
+        Raises:
+            ValueError: If a value cannot be coerced to its column dtype.
+            TypeError: If a value cannot be coerced to its column dtype.
+        """
+        if not 0 <= row <= self._length:
+            raise IndexError(f'Row {row} is out of bounds for {self._length} rows')
+        if count <= 0:
+            return
+        columns = None
+        if values is not None:
+            if values.shape != (count, self.column_count):
+                raise ValueError(f'Expected values of shape {(count, self.column_count)}, '
+                                 f'got {values.shape}')
+            columns = self.coerce_columns(values)
+        self._reserve(count)
+        physical = np.arange(self._size, self._size + count)
+        if columns is not None:
+            for column, new_values in zip(self._columns, columns):
+                column[physical] = new_values
+            if self._index is not None:
+                self._write_index(physical, values.index)
+        self._size += count
+        self._moved(row)
+        if self._map is None and row == self._length and self._size == self._length + count:
+            self._length += count  # Appended in physical order
+            return
+        self._move_gap(row, count)
+        self._map[self._gap_start:self._gap_start + count] = physical
+        self._gap_start += count
+        self._length += count
+
+    def remove_rows(self, rows: Union[np.ndarray, Sequence[int]]) -> None:
+        """Remove logical rows.
+
+        Args:
+            rows (Union[ndarray, Sequence[int]]): Logical rows to remove.
+        """
+        rows = np.unique(np.asarray(rows, dtype=np.intp))
+        if rows.size == 0:
+            return
+        if rows[0] < 0 or rows[-1] >= self._length:
+            raise IndexError(f'Rows out of bounds for {self._length} rows')
+        if rows[-1] - rows[0] + 1 == rows.size:
+            self._move_gap(int(rows[0]), 0)
+            self._gap_end += rows.size
+        else:
+            logical = np.delete(self._logical_map(), rows)
+            self._set_map(logical)
+        self._length -= rows.size
+        self._garbage += rows.size
+        self._moved(int(rows[0]))
+        if self._garbage > max(self._length, MIN_CAPACITY):
+            self._compact()
+
+    def coerce_frame(self, values: DF) -> DF:
+        """Return rows of values with the dtypes of the store columns.
+
+        Args:
+            values (DataFrame): Values, one column per store column.
+
+        Raises:
+            ValueError: If a value cannot be coerced to its column dtype.
+            TypeError: If a value cannot be coerced to its column dtype.
+
+        Returns:
+            DataFrame: Values with the store dtypes, and the same index.
+        """
+        frame = pd.DataFrame({i: pd.Series(column, index=values.index, copy=False)
+                              for i, column in enumerate(self.coerce_columns(values))},
+                             index=values.index)
+        frame.columns = self._labels
+        return frame
+
+    def coerce_columns(self, values: DF) -> List[Sequence[Any]]:
+        """Return the columns of values with the dtypes of the store columns.
+
+        Columns already of the store dtype are returned without a copy.
+
+        Args:
+            values (DataFrame): Values, one column per store column.
+
+        Raises:
+            ValueError: If a value cannot be coerced to its column dtype.
+            TypeError: If a value cannot be coerced to its column dtype.
+
+        Returns:
+            List[Sequence[Any]]: One ndarray or pandas array per column.
+        """
+        columns = []
+        for i in range(self.column_count):
+            series = values.iloc[:, i]
+            if series.dtype == self.dtype(i):
+                columns.append(column_values(series))
+            else:
+                columns.append(coerce_values(series.array, self.dtype(i)))
+        return columns
+
+    def _write_index(self, physical: np.ndarray, labels: pd.Index) -> None:
+        assert self._index is not None
+        values = labels.to_numpy() if self._multi_index else labels.array
+        try:
+            self._index[physical] = coerce_values(values, self._index.dtype)
+        except (ValueError, TypeError):
+            index = np.empty(self._capacity, dtype=object)
+            index[:] = list(self._index)
+            index[physical] = list(values)
+            self._index = index
+
+    def _reserve(self, count: int) -> None:
+        needed = self._size + count
+        if needed <= self._capacity:
+            return
+        capacity = max(needed, 2 * self._capacity, MIN_CAPACITY)
+        self._columns = [grow(column, self._size, capacity) for column in self._columns]
+        self._shared.clear()
+        if self._index is not None:
+            self._index = grow(self._index, self._size, capacity)
+        self._capacity = capacity
+
+    def _logical_map(self) -> np.ndarray:
+        if self._map is None:
+            return np.arange(self._length)
+        return np.concatenate((self._map[:self._gap_start], self._map[self._gap_end:]))
+
+    def _set_map(self, logical: np.ndarray, gap: int = MIN_GAP) -> None:
+        self._map = np.empty(logical.size + gap, dtype=np.intp)
+        self._map[:logical.size] = logical
+        self._gap_start = logical.size
+        self._gap_end = self._map.size
+
+    def _move_gap(self, row: int, count: int) -> None:
+        """Move the gap to a logical row, making room for `count` rows."""
+        if self._map is None:
+            self._set_map(np.arange(self._length), max(count, MIN_GAP, self._length // 8))
+        if self._gap_end - self._gap_start < count:
+            logical = self._logical_map()
+            self._set_map(logical, max(count, MIN_GAP, logical.size // 4))
+        gap_start, gap_end = self._gap_start, self._gap_end
+        if row < gap_start:
+            moved = gap_start - row
+            self._map[gap_end - moved:gap_end] = self._map[row:gap_start]
+            self._gap_start, self._gap_end = row, gap_end - moved
+        elif row > gap_start:
+            moved = row - gap_start
+            self._map[gap_start:row] = self._map[gap_end:gap_end + moved]
+            self._gap_start, self._gap_end = row, gap_end + moved
+
+    def _compact(self) -> None:
+        """Reclaim removed rows, putting rows back in physical order."""
+        physical = self._logical_map()
+        self._columns = [column.take(physical) for column in self._columns]
+        self._shared.clear()
+        if self._index is not None:
+            self._index = self._index.take(physical)
+        self._size = self._capacity = self._length
+        self._garbage = 0
+        self._map = None
+        self._gap_start = self._gap_end = 0
+
+
+class RingStore(RowStore):
+    """Row store of at most `max_rows` rows, in a ring buffer.
+
+    Columns are allocated once, with `max_rows` rows. Rows are only
+    appended, and appending to a full store overwrites the oldest rows, so
+    memory stays constant and nothing is reallocated per append. Removing
+    the first rows only moves the head of the ring.
+
+    A default `RangeIndex` keeps counting: labels are the positions the rows
+    were appended at, not their current positions.
+
+    Args:
+        data (DataFrame): Initial data, of which the last `max_rows` rows are kept.
+        max_rows (int): Capacity of the ring.
+    """
+
+    def __init__(self, data: DF, max_rows: int) -> None:
+        """Create RingStore object.
+
+        Args:
+            data (DataFrame): Initial data.
+            max_rows (int): Capacity of the ring.
+        """
+        if max_rows < 1:
+            raise ValueError(f'max_rows must be positive, got {max_rows}')
+        self._max_rows = max_rows
+        self._head = 0
+        super().__init__(data)
+
+    def reset(self, data: DF) -> None:
+        dropped = max(data.index.size - self._max_rows, 0)
+        tail = data.iloc[dropped:]
+        index = data.index
+        positional = isinstance(index, pd.RangeIndex) and index.start == 0 and index.step == 1
+        if positional:
+            tail = tail.set_axis(pd.RangeIndex(tail.index.size, name=index.name), axis=0)
+        super().reset(tail)
+        if positional:
+            self._label_offset = dropped
+        size = self._length
+        self._columns = [grow(column, size, self._max_rows) for column in self._columns]
+        self._shared.clear()
+        if self._index is not None:
+            self._index = grow(self._index, size, self._max_rows)
+        self._size = size
+        self._capacity = self._max_rows
+        self._head = 0
+
+    @property
+    def max_rows(self) -> Optional[int]:
+        return self._max_rows
+
+    def physical_rows(self, rows: np.ndarray) -> np.ndarray:
+        return (self._head + np.asarray(rows)) % self._capacity
+
+    def _physical_range(self, start: int, stop: int) -> Union[slice, np.ndarray]:
+        first = (self._head + start) % self._capacity
+        if first + stop - start <= self._capacity:
+            return slice(first, first + stop - start)
+        return self.physical_rows(np.arange(start, stop))
+
+    def insert_rows(self, row: int, count: int, values: Optional[DF] = None) -> None:
+        """Append rows, overwriting the oldest rows when the ring is full.
+
+        Args:
+            row (int): Must be the number of rows, rows can only be appended.
+            count (int): Number of rows to append.
+            values (DataFrame, optional): Values of the new rows, with one
+                column per store column. Blank rows are appended if None.
+
+        Raises:
+            IndexError: If `row` is not the number of rows.
+            ValueError: If a value cannot be coerced to its column dtype.
+            TypeError: If a value cannot be coerced to its column dtype.
+        """
+        if row != self._length:
+            raise IndexError(f'Rows can only be appended, at row {self._length}, not {row}')
+        if count <= 0:
+            return
+        if values is not None and values.shape != (count, self.column_count):
+            raise ValueError(f'Expected values of shape {(count, self.column_count)}, '
+                             f'got {values.shape}')
+        # Skipped rows count in the positional labels of all rows
+        first_moved = row
+        if count > self._capacity:
+            if values is not None:
+                values = values.iloc[count - self._capacity:]
+            self._label_offset += count - self._capacity
+            count = self._capacity
+            first_moved = 0
+        columns = None if values is None else self.coerce_columns(values)
+        overflow = self._length + count - self._capacity
+        if overflow > 0:
+            self.remove_rows(np.arange(overflow))
+        physical = self.physical_rows(np.arange(self._length, self._length + count))
+        for i, column in enumerate(self._columns):
+            if columns is not None:
+                column[physical] = columns[i]
+            else:
+                column[physical] = _ring_blank(column)
+        if self._index is not None:
+            if values is not None:
+                self._write_index(physical, values.index)
+            else:
+                self._index[physical] = _ring_blank(self._index)
+        self._length += count
+        self._size = self._length
+        self._moved(min(first_moved, self._length - count))
+
+    def remove_rows(self, rows: Union[np.ndarray, Sequence[int]]) -> None:
+        """Remove logical rows. Removing the first rows only moves the head.
+
+        Args:
+            rows (Union[ndarray, Sequence[int]]): Logical rows to remove.
+        """
+        rows = np.unique(np.asarray(rows, dtype=np.intp))
+        if rows.size == 0:
+            return
+        if rows[0] < 0 or rows[-1] >= self._length:
+            raise IndexError(f'Rows out of bounds for {self._length} rows')
+        if rows[-1] + 1 == rows.size:
+            self._head = (self._head + rows.size) % self._capacity
+            if self._index is None:
+                self._label_offset += rows.size
+        else:
+            # Move the kept rows to the start of the ring, in place
+            physical = self.physical_rows(np.delete(np.arange(self._length), rows))
+            for column in self._columns:
+                column[:physical.size] = column.take(physical)
+            if self._index is not None:
+                self._index[:physical.size] = self._index.take(physical)
+            self._head = 0
+        self._length -= rows.size
+        self._size = self._length
+        self._moved(int(rows[0]))
+
+
+def _ring_blank(values: Sequence[Any]) -> Any:
+    """Value of blank rows written over old rows of a ring."""
+    if isinstance(values, np.ndarray):
+        return blank_value(values.dtype)
+    return None
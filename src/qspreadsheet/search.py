@@ -0,0 +1,239 @@
+"""Full-text search over the display strings of all columns."""
+
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from qspreadsheet import logging
+from qspreadsheet import qt
+from qspreadsheet.display_cache import FormatBlockTask, format_block
+
+logger = logging.getLogger(__name__)
+
+
+class SearchIndex(qt.QObject):
+    """Per-column display strings, searched with vectorized string matching.
+
+    The strings of a column are built on first search, or in the background
+    with `prepare`, and kept until the column is invalidated. Inserted and
+    removed rows are applied to the built strings, so appended rows only
+    format the new rows, and rows dropped from the front cost nothing.
+
+    Args:
+        column_values (Callable[[int], Sequence[Any]]): Callable returning the
+            values of a column in data order, by column number.
+        column_count (Callable[[], int]): Callable returning the number of columns.
+        thread_pool (QThreadPool, optional): Pool to build columns on. Defaults
+            to the global thread pool.
+        parent (QObject): Optional parent for this object.
+        take_values (Callable[[int, ndarray], Sequence[Any]], optional): Callable
+            returning the values of some data rows of a column. Without it,
+            inserted rows drop the built strings.
+    """
+
+    column_ready = qt.Signal(int)
+    _column_built = qt.Signal(int, int, object)
+
+    def __init__(self, column_values: Callable[[int], Sequence[Any]],
+                 column_count: Callable[[], int],
+                 thread_pool: Optional[qt.QThreadPool] = None,
+                 parent: Optional[qt.QObject] = None,
+                 take_values: Optional[Callable[[int, np.ndarray], Sequence[Any]]] = None
+                 ) -> None:
+        """Create SearchIndex object.
+
+        Args:
+            column_values (Callable[[int], Sequence[Any]]): Column values getter.
+            column_count (Callable[[], int]): Number of columns getter.
+            thread_pool (QThreadPool, optional): Pool to build columns on.
+            parent (QObject): Optional parent for this object.
+            take_values (Callable[[int, ndarray], Sequence[Any]], optional):
+                Values of data rows getter.
+        """
+        super().__init__(parent)
+        self._column_values = column_values
+        self._column_count = column_count
+        self._take_values = take_values
+        self._thread_pool = thread_pool or qt.QThreadPool.globalInstance()
+        # Strings of a column, with room to append, and their number
+        self._strings: Dict[int, np.ndarray] = {}
+        self._sizes: Dict[int, int] = {}
+        # Token of a background build, rows dropped from the front and rows now
+        self._pending: Dict[int, List[int]] = {}
+        self._token = 0
+        self._column_built.connect(self._on_column_built, qt.Qt.QueuedConnection)
+
+    def is_ready(self, col: int) -> bool:
+        """Return True if the strings of a column are built.
+
+        Args:
+            col (int): Column number.
+        """
+        return col in self._strings
+
+    def prepare(self) -> None:
+        """Build the strings of all columns in the background."""
+        for col in range(self._column_count()):
+            if col in self._strings or col in self._pending:
+                continue
+            self._token += 1
+            token = self._token
+            values = self._column_values(col)
+            self._pending[col] = [token, 0, len(values)]
+            task = FormatBlockTask(
+                values,
+                lambda strings, col=col, token=token: self._column_built.emit(col, token, strings))
+            self._thread_pool.start(task)
+
+    def wait_for_done(self, msecs: int = -1) -> bool:
+        """Wait for the background builds to finish.
+
+        Args:
+            msecs (int): Timeout in milliseconds, -1 to wait indefinitely.
+
+        Returns:
+            bool: True if all builds finished.
+        """
+        return self._thread_pool.waitForDone(msecs)
+
+    def invalidate_column(self, col: int) -> None:
+        """Drop the strings of a column, after its values changed.
+
+        Args:
+            col (int): Column number.
+        """
+        self._strings.pop(col, None)
+        self._sizes.pop(col, None)
+        self._pending.pop(col, None)
+
+    def insert_rows(self, row: int, count: int) -> None:
+        """Insert the strings of new data rows, after the rows were inserted.
+
+        Args:
+            row (int): First inserted data row.
+            count (int): Number of inserted rows.
+        """
+        if self._take_values is None:
+            self.clear()
+            return
+        for col, pending in list(self._pending.items()):
+            if row == pending[2]:
+                pending[2] += count  # Appended once built
+            else:
+                del self._pending[col]
+        rows = np.arange(row, row + count)
+        for col in list(self._strings):
+            strings = _object_array(format_block(self._take_values(col, rows)))
+            size = self._sizes[col]
+            if row < size:
+                self._strings[col] = np.insert(self._strings[col][:size], row, strings)
+                self._sizes[col] = size + count
+            else:
+                self._append(col, strings)
+
+    def remove_rows(self, rows: np.ndarray) -> None:
+        """Drop the strings of data rows, after the rows were removed.
+
+        Args:
+            rows (ndarray): Sorted data rows.
+        """
+        if not len(rows):
+            return
+        count = len(rows)
+        # Rows dropped from the front, as a bounded model does
+        leading = rows[-1] == count - 1
+        for col, pending in list(self._pending.items()):
+            if leading:
+                pending[1] += count
+                pending[2] -= count
+            else:
+                del self._pending[col]
+        for col in self._strings:
+            if leading:
+                self._strings[col] = self._strings[col][count:]
+            else:
+                self._strings[col] = np.delete(self._strings[col][:self._sizes[col]], rows)
+            self._sizes[col] -= count
+
+    def clear(self) -> None:
+        """Drop the strings of all columns."""
+        self._strings.clear()
+        self._sizes.clear()
+        self._pending.clear()
+
+    def column_strings(self, col: int) -> np.ndarray:
+        """Return the display strings of a column, building them if needed.
+
+        Args:
+            col (int): Column number.
+
+        Returns:
+            ndarray: Object array of strings, in data order.
+        """
+        if col not in self._strings:
+            self._store(col, format_block(self._column_values(col)))
+        return self._strings[col][:self._sizes[col]]
+
+    def find(self, pattern: str, regex: bool = False, case: bool = False,
+             columns: Optional[Sequence[int]] = None) -> np.ndarray:
+        """Return the cells whose display string matches a pattern.
+
+        Args:
+            pattern (str): Substring, or regular expression if `regex` is True.
+            regex (bool): Whether `pattern` is a regular expression.
+            case (bool): Whether the match is case sensitive.
+            columns (Sequence[int], optional): Columns to search, all if None.
+
+        Returns:
+            ndarray: Array of shape (n, 2) with the (data row, column) of the
+                matching cells, ordered by row then column.
+        """
+        if columns is None:
+            columns = range(self._column_count())
+        rows: List[np.ndarray] = []
+        cols: List[np.ndarray] = []
+        for col in columns:
+            matches = pd.Series(self.column_strings(col), copy=False).str.contains(
+                pattern, case=case, regex=regex, na=False)
+            hits = np.flatnonzero(matches.to_numpy(dtype=bool))
+            rows.append(hits)
+            cols.append(np.full(hits.size, col, dtype=hits.dtype))
+        if not rows:
+            return np.empty((0, 2), dtype=np.intp)
+        hits = np.column_stack((np.concatenate(rows), np.concatenate(cols)))
+        return hits[np.lexsort((hits[:, 1], hits[:, 0]))]
+
+    def _store(self, col: int, strings: List[str]) -> None:
+        self._strings[col] = _object_array(strings)
+        self._sizes[col] = len(strings)
+        self._pending.pop(col, None)
+
+    def _append(self, col: int, strings: np.ndarray) -> None:
+        buffer, size = self._strings[col], self._sizes[col]
+        count = len(strings)
+        if buffer.size < size + count:
+            # Grow geometrically, so appending a few rows at a time stays cheap
+            grown = np.empty(max(2 * size, size + count), dtype=object)
+            grown[:size] = buffer[:size]
+            buffer = self._strings[col] = grown
+        buffer[size:size + count] = strings
+        self._sizes[col] = size + count
+
+    def _on_column_built(self, col: int, token: int, strings: List[str]) -> None:
+        pending = self._pending.get(col)
+        if pending is None or pending[0] != token:
+            return  # Invalidated while building
+        _, dropped, size = pending
+        self._store(col, strings[dropped:])
+        # Rows appended while building
+        if size > self._sizes[col]:
+            rows = np.arange(self._sizes[col], size)
+            self._append(col, _object_array(format_block(self._take_values(col, rows))))
+        self.column_ready.emit(col)
+
+
+def _object_array(strings: List[str]) -> np.ndarray:
+    array = np.empty(len(strings), dtype=object)
+    array[:] = strings
+    return array
@@ -0,0 +1,153 @@
+"""Vectorized row sorting, producing a permutation of data rows."""
+
+from typing import Any, List, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from qspreadsheet import logging
+
+logger = logging.getLogger(__name__)
+
+# Integer keys spanning less than this are sorted with NumPy's radix sort.
+RADIX_SORT_SPAN = 1 << 16
+
+
+def sort_key(values: Sequence[Any], ascending: bool = True) -> np.ndarray:
+    """Return a numeric key, sorting like the column values.
+
+    Sorting the key ascending orders the values ascending or descending.
+    Missing values get the largest key, or NaN for float keys, so they go last.
+
+    Args:
+        values (Sequence[Any]): Column values, ndarray or pandas array.
+        ascending (bool): Sort direction.
+
+    Returns:
+        ndarray: Integer or float sort key.
+    """
+    if isinstance(values, np.ndarray) and values.dtype.kind in 'biuf':
+        if values.dtype.kind == 'u':
+            # Negating would wrap, the bitwise complement reverses the order
+            return values if ascending else ~values
+        key = values if values.dtype.kind in 'if' else values.astype(np.int64)
+        return key if ascending else -key
+    if isinstance(values, pd.Categorical):
+        key = values.codes.astype(np.int64)
+        isna = key < 0
+    elif hasattr(values, 'asi8'):
+        # Datetime, timedelta and period arrays
+        key = values.asi8
+        isna = np.asarray(values.isna())
+    else:
+        key = _factorize_sorted(values)
+        isna = key < 0
+    if not ascending:
+        key = -key
+    if isna.any():
+        key = np.where(isna, key[~isna].max(initial=0) + 1, key)
+    return key
+
+
+def _factorize_sorted(values: Sequence[Any]) -> np.ndarray:
+    try:
+        codes, _ = pd.factorize(values, sort=True)
+    except TypeError:
+        # Mixed types which do not compare, order them by their text
+        isna = pd.isna(values)
+        codes, _ = pd.factorize(np.asarray(values, dtype=object).astype(str), sort=True)
+        codes[np.asarray(isna)] = -1
+    return codes.astype(np.int64)
+
+
+def stable_argsort(key: np.ndarray) -> np.ndarray:
+    """Return the stable ascending argsort of a numeric key, NaN last.
+
+    Narrow integer keys use NumPy's radix sort. Other keys are sorted with
+    quicksort, then runs of equal keys are put back in their original order.
+
+    Args:
+        key (ndarray): Integer or float key.
+
+    Returns:
+        ndarray: Positions in sorted order.
+    """
+    if key.size == 0:
+        return np.arange(0, dtype=np.intp)
+    if key.dtype.kind in 'iu':
+        low = key.min()
+        if int(key.max()) - int(low) < RADIX_SORT_SPAN:
+            return np.argsort((key - low).astype(np.uint16), kind='stable')
+    order = np.argsort(key, kind='quicksort')
+    sorted_key = key[order]
+    ties = sorted_key[1:] == sorted_key[:-1]
+    if key.dtype.kind == 'f':
+        isnan = np.isnan(sorted_key)
+        ties |= isnan[1:] & isnan[:-1]
+    tie_count = np.count_nonzero(ties)
+    if tie_count == 0:
+        return order
+    run_ids = np.cumsum(np.concatenate(([False], ~ties)))
+    if tie_count > key.size // 8:
+        # Many ties, sort again by (run, position), which is unique
+        ranks = np.empty(key.size, dtype=np.int64)
+        ranks[order] = run_ids
+        if run_ids[-1] < RADIX_SORT_SPAN:
+            return np.argsort(ranks.astype(np.uint16), kind='stable')
+        return np.argsort(ranks * key.size + np.arange(key.size), kind='quicksort')
+    in_run = np.zeros(key.size, dtype=bool)
+    in_run[1:] = ties
+    in_run[:-1] |= ties
+    positions = np.flatnonzero(in_run)
+    tied = order[positions]
+    # Runs are contiguous, so sorting by run then position keeps them in place
+    order[positions] = tied[np.lexsort((tied, run_ids[positions]))]
+    return order
+
+
+def sort_directions(ascending: Union[bool, Sequence[bool]], count: int) -> List[bool]:
+    """Return one sort direction per sorted column.
+
+    Args:
+        ascending (Union[bool, Sequence[bool]]): Sort direction, for all or
+            for each column.
+        count (int): Number of sorted columns.
+
+    Raises:
+        ValueError: If there are not as many directions as columns.
+
+    Returns:
+        List[bool]: Whether each column is sorted ascending.
+    """
+    if isinstance(ascending, bool):
+        return [ascending] * count
+    if len(ascending) != count:
+        raise ValueError(f'Expected {count} ascending flags, got {len(ascending)}')
+    return list(ascending)
+
+
+def argsort(columns: Sequence[Sequence[Any]],
+            ascending: Union[bool, Sequence[bool]] = True) -> np.ndarray:
+    """Return the stable permutation sorting rows by one or more columns.
+
+    Rows are ordered by the first column, ties by the following ones.
+    Equal rows keep their original order. Missing values go last, whatever
+    the sort direction.
+
+    Args:
+        columns (Sequence[Sequence[Any]]): Column values, most significant first.
+        ascending (Union[bool, Sequence[bool]]): Sort direction, for all or
+            for each column.
+
+    Returns:
+        ndarray: Row positions in sorted order.
+    """
+    if not columns:
+        raise ValueError('Expected at least one column to sort by')
+    ascending = sort_directions(ascending, len(columns))
+    # Sort by the least significant column first, stable sorts keep its order for ties
+    keys = list(zip(columns, ascending))[::-1]
+    order = stable_argsort(sort_key(*keys[0]))
+    for values, asc in keys[1:]:
+        order = order[stable_argsort(sort_key(values, asc)[order])]
+    return order
@@ -0,0 +1,110 @@
+"""Buffer of rows appended from producer threads, committed once per frame."""
+
+import threading
+from typing import Callable, List, Optional
+
+import pandas as pd
+
+from qspreadsheet import logging
+from qspreadsheet import qt
+from qspreadsheet.types import DF
+
+logger = logging.getLogger(__name__)
+
+# About one commit per frame at 60 Hz
+FRAME_INTERVAL_MS = 16
+
+
+class AppendBuffer(qt.QObject):
+    """Buffer of row chunks, appended from any thread and committed on the GUI thread.
+
+    `append` only queues the chunk under a lock, so producers never touch
+    the model. The first chunk after a commit starts a single shot timer on
+    the GUI thread. When it fires, all buffered chunks are concatenated once
+    and passed to `commit`, so a model inserts them with one
+    `beginInsertRows`/`endInsertRows` per frame, however many chunks arrived.
+
+    Args:
+        commit (Callable[[DataFrame], None]): Called on the GUI thread with
+            the rows buffered since the last commit.
+        interval (int): Time between commits, in milliseconds.
+        parent (QObject): Optional parent for this object.
+    """
+
+    committed = qt.Signal(int)
+    _appended = qt.Signal()
+
+    def __init__(self, commit: Callable[[DF], None], interval: int = FRAME_INTERVAL_MS,
+                 parent: Optional[qt.QObject] = None) -> None:
+        """Create AppendBuffer object.
+
+        Args:
+            commit (Callable[[DataFrame], None]): Buffered rows callback.
+            interval (int): Time between commits, in milliseconds.
+            parent (QObject): Optional parent for this object.
+        """
+        super().__init__(parent)
+        self._commit = commit
+        self._lock = threading.Lock()
+        self._chunks: List[DF] = []
+        self._pending_rows = 0
+        self._timer = qt.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(interval)
+        self._timer.timeout.connect(self.flush)
+        # Queued, since producers emit from their own threads
+        self._appended.connect(self._timer.start, qt.Qt.QueuedConnection)
+
+    @property
+    def interval(self) -> int:
+        """Time between commits, in milliseconds."""
+        return self._timer.interval()
+
+    @property
+    def pending_rows(self) -> int:
+        """Number of rows buffered and not committed yet."""
+        with self._lock:
+            return self._pending_rows
+
+    def append(self, chunk: DF) -> None:
+        """Buffer a chunk of rows. Safe to call from any thread.
+
+        Args:
+            chunk (DataFrame): Rows to append.
+        """
+        if chunk.index.size == 0:
+            return
+        with self._lock:
+            self._chunks.append(chunk)
+            self._pending_rows += chunk.index.size
+            first = len(self._chunks) == 1
+        if first:
+            self._appended.emit()
+
+    def clear(self) -> None:
+        """Drop the buffered rows."""
+        with self._lock:
+            self._chunks = []
+            self._pending_rows = 0
+        self._timer.stop()
+
+    def flush(self) -> int:
+        """Commit the buffered rows now. Must be called from the GUI thread.
+
+        Returns:
+            int: Number of committed rows.
+        """
+        with self._lock:
+            chunks, self._chunks = self._chunks, []
+            self._pending_rows = 0
+        self._timer.stop()
+        if not chunks:
+            return 0
+        frame = chunks[0] if len(chunks) == 1 else pd.concat(chunks)
+        try:
+            self._commit(frame)
+        except (ValueError, TypeError):
+            logger.exception('Dropping {} appended rows'.format(frame.index.size))
+            return 0
+        self.committed.emit(frame.index.size)
+        return frame.index.size
@@ -1,12 +1,24 @@
 """Table model based on QAbstractTableModel."""
 
-from typing import Any, Optional 
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 
+import numpy as np
 import pandas as pd
 
 from qspreadsheet import logging
 from qspreadsheet import qt
 from qspreadsheet import resources_rc
+from qspreadsheet.coercion import coerce_value, coerce_values
+from qspreadsheet.conditional_format import FormatEngine, FormatRule
+from qspreadsheet.data_source import DataSource, SourceStore, as_source
+from qspreadsheet.display_cache import PLACEHOLDER, BackgroundFormatter, DisplayCache
+from qspreadsheet.filters import Filter, FilterEngine
+from qspreadsheet.row_mapping import RowMapping
+from qspreadsheet.row_store import RingStore, RowStore
+from qspreadsheet.search import SearchIndex
+from qspreadsheet.streaming import AppendBuffer
+from qspreadsheet.undo import CellsDelta, Delta, RowsInserted, RowsRemoved, UndoStack
+from qspreadsheet.updates import FlashHighlights, changed_regions, changed_rows
 from qspreadsheet.types import DF
 
 logger = logging.getLogger(__name__)
@@ -15,36 +27,896 @@ logger = logging.getLogger(__name__)
 class TableModel(qt.QAbstractTableModel):
     """Table model based on QAbstractTableModel.
 
+    The data is held in a `RowStore`, so rows can be inserted and removed
+    without copying the columns. Use `dataframe` for the current data.
+
+    With `virtual_rows` set, blank rows follow the data rows. Editing one
+    appends a data row, in amortized O(1) while rows are unsorted and
+    unfiltered.
+
+    Edits, inserts and removes are recorded as deltas on `undo_stack`, in
+    data rows, so they can be undone whatever the sort order and filters.
+
+    Rows streamed in with `append_rows`, from any thread, are buffered and
+    appended once per frame.
+
+    With `max_rows` set, the model is a tail of at most `max_rows` rows,
+    held in a `RingStore`. Rows can only be appended, and appending to a
+    full model first removes the oldest rows. Views see one remove at the
+    front and one insert at the back. Inserted and removed rows are not
+    recorded, since a ring can only append, and dropping rows clears the
+    undo stack, since the recorded data rows no longer exist.
+
+    Conditional format rules, see `set_format_rules`, are evaluated per
+    column into cached colour codes, so `BackgroundRole` and
+    `ForegroundRole` are array lookups.
+
+    Data of a fixed shape ticking in place is refreshed with `update_data`,
+    which diffs the columns and signals only the changed cells, optionally
+    flashing them for a moment.
+
+    The data can also be given as a store, like a `MappedStore` over a
+    memory-mapped file, which is then read as rows are shown. Other data,
+    like a Polars DataFrame or a NumPy structured array, is read through a
+    `DataSource` in a `SourceStore`, in blocks of the rows shown, without
+    converting it to pandas first. The store sorts and filters through the
+    source when the source supports it.
+
     Args:
+        data (Union[DataFrame, RowStore, DataSource, Any]): Model data, a
+            store or a source of it, or data `as_source` accepts.
         parent (QObject): Optional parent for this model.
+        row_mapping (RowMapping, optional): Rows mapping shared with the
+            row index model.
+        fetch_chunk_size (int, optional): Number of rows exposed per fetch,
+            if a new row mapping is created. If None, all rows are exposed.
+        background_formatting (bool): Format uncached blocks on the thread
+            pool, showing a placeholder until they are ready.
+        max_rows (int, optional): Keep only the last `max_rows` rows. If
+            None, the number of rows is unbounded.
+        prepare_search (bool): Build the search strings of all columns on
+            the thread pool whenever data is set, so the first search does
+            not format them.
     """
 
     mutable_rows_enabled = qt.Signal(bool)
+    column_dtype_changed = qt.Signal(int)
     virtual_rows_enabled = qt.Signal(bool)
 
-    def __init__(self, data: DF, parent: Optional[qt.QObject] = None) -> None:
+    def __init__(self, data: Union[DF, RowStore, DataSource, Any],
+                 parent: Optional[qt.QObject] = None,
+                 row_mapping: Optional[RowMapping] = None,
+                 fetch_chunk_size: Optional[int] = None,
+                 background_formatting: bool = False,
+                 max_rows: Optional[int] = None, prepare_search: bool = False) -> None:
         """Create TableModel based on QAbstractTableModel.
 
         Args:
+            data (Union[DataFrame, RowStore, DataSource, Any]): Model data,
+                a store or a source of it.
             parent (QObject): Model's parent
+            row_mapping (RowMapping, optional): Shared rows mapping.
+            fetch_chunk_size (int, optional): Number of rows exposed per fetch.
+            background_formatting (bool): Format uncached blocks in the background.
+            max_rows (int, optional): Keep only the last `max_rows` rows.
+            prepare_search (bool): Build the search strings in the background.
+
+        Raises:
+            ValueError: If `max_rows` is given with other data than a DataFrame.
+            TypeError: If the data is of an unsupported type.
         """
         super(TableModel, self).__init__(parent)
-        self._data = data
+        if isinstance(data, pd.DataFrame):
+            self._store = RowStore(data) if max_rows is None else RingStore(data, max_rows)
+        elif max_rows is not None:
+            raise ValueError('max_rows requires the data as a DataFrame')
+        elif isinstance(data, RowStore):
+            self._store = data
+        else:
+            self._store = SourceStore(as_source(data))
+        self._editable = not self._store.read_only
+        if row_mapping is None:
+            row_mapping = RowMapping(len(self._store), fetch_chunk_size, self)
+        self._row_mapping = row_mapping
+        self._row_mapping.rows_about_to_be_inserted.connect(self._on_rows_about_to_be_inserted)
+        self._row_mapping.rows_inserted.connect(self.endInsertRows)
+        self._row_mapping.rows_about_to_be_removed.connect(self._on_rows_about_to_be_removed)
+        self._row_mapping.rows_removed.connect(self.endRemoveRows)
+        self._row_mapping.about_to_be_reset.connect(self.beginResetModel)
+        self._row_mapping.reset.connect(self._on_mapping_reset)
+        self._row_mapping.virtual_rows_changed.connect(
+            lambda count: self.virtual_rows_enabled.emit(count > 0))
+        self._filter_engine = FilterEngine(
+            lambda col: self._store.column(col),
+            lambda col, column_filter: self._store.filter_mask(col, column_filter))
+        self._format_engine = FormatEngine(lambda col: self._store.column(col), self._store.take,
+                                           self._store.dtype)
+        self._search_index = SearchIndex(
+            lambda col: self._store.column(col), lambda: self._store.column_count, parent=self,
+            take_values=self._store.take)
+        self._display_cache = DisplayCache(
+            self._load_block, lambda: self._row_mapping.size)
+        self._undo_stack = UndoStack(parent=self)
+        self._recording = True
+        self._append_buffer = AppendBuffer(self._commit_appended, parent=self)
+        self._flash = FlashHighlights(parent=self)
+        self._flash.expired.connect(self._on_flash_expired)
+        self._visible_rows: Optional[Tuple[int, int]] = None
+        self._formatter: Optional[BackgroundFormatter] = None
+        if background_formatting:
+            self._formatter = BackgroundFormatter(self._display_cache, parent=self)
+            self._formatter.block_ready.connect(self._on_block_ready)
+        self._prepare_search = prepare_search
+        if prepare_search:
+            self._search_index.prepare()
+
+    def _load_block(self, col: int, start: int, stop: int) -> Sequence[Any]:
+        """Return values of view rows `[start, stop)` for the display cache."""
+        rows = self._row_mapping.rows
+        if rows is None:
+            return self._store.slice(col, start, stop)
+        return self._store.take(col, rows[start:stop])
+
+    def _source_rows(self, first: int, last: int) -> np.ndarray:
+        """Return the data rows of view rows `[first, last]`."""
+        rows = self._row_mapping.rows
+        if rows is None:
+            return np.arange(first, last + 1)
+        return rows[first:last + 1]
+
+    def _write_columns(self, first_row: int, last_row: int, first_col: int,
+                       columns: Sequence[Any]) -> None:
+        """Write coerced values, or scalars, into consecutive columns."""
+        if not self._editable:
+            raise TypeError('The model is not editable')
+        source_rows = np.array(self._source_rows(first_row, last_row))
+        delta = None
+        if self._recording:
+            old = [self._store.take(col, source_rows)
+                   for col in range(first_col, first_col + len(columns))]
+            delta = CellsDelta(source_rows, first_col, old, list(columns))
+        for col, values in enumerate(columns, first_col):
+            self._store.write(col, source_rows, values)
+            self._invalidate(first_row, last_row, col)
+            if self._format_engine.update_rows(col, source_rows):
+                self._colors_changed(col)
+        # Pushed once written, a failed write records nothing
+        if delta is not None:
+            self._undo_stack.push(delta)
+
+    def _write_source_columns(self, source_rows: np.ndarray, first_col: int,
+                              columns: Sequence[Any]) -> None:
+        """Write values into data rows of consecutive columns, wherever they are shown."""
+        for col, values in enumerate(columns, first_col):
+            self._store.write(col, source_rows, values)
+            self._display_cache.invalidate_column(col)
+            self._search_index.invalidate_column(col)
+            self._format_engine.update_rows(col, source_rows)
+        if self._formatter is not None:
+            self._formatter.discard_all()
+        row_count = self.rowCount(qt.QModelIndex())
+        if row_count:
+            self.dataChanged.emit(self.index(0, first_col),
+                                  self.index(row_count - 1, first_col + len(columns) - 1),
+                                  [qt.Qt.DisplayRole, qt.Qt.EditRole, qt.Qt.BackgroundRole,
+                                   qt.Qt.ForegroundRole])
+
+    def _colors_changed(self, col: int) -> None:
+        """Signal new colours for a whole column."""
+        row_count = self.rowCount(qt.QModelIndex())
+        if row_count:
+            self.dataChanged.emit(self.index(0, col), self.index(row_count - 1, col),
+                                  [qt.Qt.BackgroundRole, qt.Qt.ForegroundRole])
+
+    def _invalidate(self, first_row: int, last_row: int, col: int) -> None:
+        """Drop cached strings of view rows `[first_row, last_row]` of a column."""
+        block_size = self._display_cache.block_size
+        first_block = first_row - first_row % block_size
+        for row in range(first_block, last_row + 1, block_size):
+            self._display_cache.invalidate(row, col)
+            if self._formatter is not None:
+                self._formatter.discard(row, col)
+        self._search_index.invalidate_column(col)
+
+    def _invalidate_rows(self, rows: np.ndarray, col: int) -> None:
+        """Drop cached strings of some view rows of a column."""
+        self._display_cache.invalidate_rows(rows, col)
+        if self._formatter is not None:
+            block_size = self._display_cache.block_size
+            for block in np.unique(rows // block_size):
+                self._formatter.discard(int(block) * block_size, col)
+        self._search_index.invalidate_column(col)
+
+    def _shown_rows(self, visible_rows: Optional[Tuple[int, int]]) -> Tuple[int, int]:
+        """Return the first and last view rows to signal, within the exposed rows."""
+        first, last = (0, self._row_mapping.row_count - 1) if visible_rows is None \
+            else visible_rows
+        return max(first, 0), min(last, self._row_mapping.row_count - 1)
+
+    def _emit_regions(self, source_rows: np.ndarray, cols: np.ndarray,
+                      visible_rows: Optional[Tuple[int, int]], roles: List[int]) -> None:
+        """Signal the bounding rectangles of changed cells, given by data row, that are shown."""
+        rows = self._row_mapping.from_source(source_rows)
+        first, last = self._shown_rows(visible_rows)
+        shown = (rows >= first) & (rows <= last)
+        for first_row, first_col, last_row, last_col in changed_regions(rows[shown], cols[shown]):
+            self.dataChanged.emit(self.index(first_row, first_col),
+                                  self.index(last_row, last_col), roles)
+
+    def _on_flash_expired(self, source_rows: np.ndarray, cols: np.ndarray) -> None:
+        self._emit_regions(source_rows, cols, self._visible_rows, [qt.Qt.BackgroundRole])
+
+    def _check_range(self, first_row: int, last_row: int, first_col: int, last_col: int) -> None:
+        if (first_row < 0 or first_col < 0 or first_row > last_row or first_col > last_col
+                or last_row >= self._row_mapping.size or last_col >= self._store.column_count):
+            raise IndexError(f'Range rows [{first_row}, {last_row}], columns '
+                             f'[{first_col}, {last_col}] is out of bounds')
+
+    def _on_rows_about_to_be_inserted(self, first: int, last: int) -> None:
+        self.beginInsertRows(qt.QModelIndex(), first, last)
+
+    def _on_rows_about_to_be_removed(self, first: int, last: int) -> None:
+        self.beginRemoveRows(qt.QModelIndex(), first, last)
+
+    def _rows_moved(self, row: int) -> None:
+        """Drop cached strings of view rows moved by an insert or remove."""
+        self._display_cache.invalidate_from(row)
+        if self._formatter is not None:
+            self._formatter.discard_from(row)
+
+    def _source_rows_inserted(self, source_row: int, count: int) -> None:
+        """Shift the data rows held by the engines, after data rows were inserted."""
+        self._filter_engine.insert_rows(source_row, count)
+        self._format_engine.insert_rows(source_row, count)
+        self._search_index.insert_rows(source_row, count)
+        self._flash.insert_rows(source_row, count)
+
+    def _on_mapping_reset(self) -> None:
+        self._display_cache.clear()
+        if self._formatter is not None:
+            self._formatter.discard_all()
+        self.endResetModel()
+
+    def _on_block_ready(self, col: int, start: int, stop: int) -> None:
+        stop = min(stop, self._row_mapping.row_count)
+        if start < stop:
+            self.dataChanged.emit(self.index(start, col), self.index(stop - 1, col),
+                                  [qt.Qt.DisplayRole])
+
+    @property
+    def editable(self) -> bool:
+        """Whether cells can be edited and rows inserted or removed, never for read-only stores."""
+        return self._editable
+
+    @editable.setter
+    def editable(self, value: bool) -> None:
+        self._editable = value
+
+    @property
+    def undo_stack(self) -> UndoStack:
+        """Stack of recorded deltas."""
+        return self._undo_stack
+
+    def undo(self) -> bool:
+        """Undo the last recorded delta.
+
+        Returns:
+            bool: True if a delta was undone.
+        """
+        delta = self._undo_stack.pop_undo()
+        if delta is None:
+            return False
+        self._apply(delta, undo=True)
+        return True
+
+    def redo(self) -> bool:
+        """Redo the last undone delta.
+
+        Returns:
+            bool: True if a delta was redone.
+        """
+        delta = self._undo_stack.pop_redo()
+        if delta is None:
+            return False
+        self._apply(delta, undo=False)
+        return True
+
+    def _apply(self, delta: Delta, undo: bool) -> None:
+        self._recording = False
+        try:
+            if isinstance(delta, CellsDelta):
+                self._write_source_columns(
+                    delta.rows, delta.first_col, delta.old if undo else delta.new)
+            elif isinstance(delta, RowsInserted) and undo \
+                    or isinstance(delta, RowsRemoved) and not undo:
+                rows = (np.arange(delta.row, delta.row + delta.values.index.size)
+                        if isinstance(delta, RowsInserted) else delta.rows)
+                self._remove_source_rows(rows)
+            elif isinstance(delta, RowsInserted):
+                self._insert_source_rows(delta.row, delta.values)
+            elif delta.positions is not None and self._row_mapping.order is not None:
+                self._restore_source_rows(delta.rows, delta.values, delta.positions)
+            else:
+                # Insert each run of consecutive rows, first runs first
+                for start, stop in _runs(delta.rows):
+                    self._insert_source_rows(int(delta.rows[start]),
+                                             delta.values.iloc[start:stop])
+        finally:
+            self._recording = True
+
+    @property
+    def virtual_rows(self) -> int:
+        """Number of blank rows after the data rows, to append rows from."""
+        return self._row_mapping.virtual_rows
+
+    @virtual_rows.setter
+    def virtual_rows(self, count: int) -> None:
+        self._row_mapping.set_virtual_rows(count)
+
+    @property
+    def row_store(self) -> RowStore:
+        """Store of the model data."""
+        return self._store
+
+    @property
+    def row_mapping(self) -> RowMapping:
+        """Rows mapping shared with the row index model."""
+        return self._row_mapping
+
+    @property
+    def display_cache(self) -> DisplayCache:
+        """Cache of formatted display strings."""
+        return self._display_cache
+
+    @property
+    def search_index(self) -> SearchIndex:
+        """Search index over the display strings of all columns."""
+        return self._search_index
+
+    @property
+    def flash_highlights(self) -> FlashHighlights:
+        """Highlights of the cells changed by `update_data`."""
+        return self._flash
+
+    @property
+    def background_formatter(self) -> Optional[BackgroundFormatter]:
+        """Background formatter, None if cells are formatted on demand."""
+        return self._formatter
+
+    def dataframe(self) -> DF:
+        """Return the current data as a new DataFrame, in data order."""
+        return self._store.to_frame()
+
+    def reset_data(self, data: DF) -> None:
+        """Replace the model data and rebuild the row store.
+
+        Args:
+            data (DataFrame): New model data.
+        """
+        self._row_mapping.begin_reset()
+        self._append_buffer.clear()
+        self._store.reset(data)
+        self._undo_stack.clear()
+        self._filter_engine.clear()
+        self._format_engine.clear()
+        self._search_index.clear()
+        self._flash.clear()
+        self._row_mapping.end_reset(len(self._store))
+        if self._prepare_search:
+            self._search_index.prepare()
+
+    def refresh_column(self, col: int) -> None:
+        """Show a column again after its dtype changed in the store.
+
+        Like a column of a CSV file, widened for the values of a later page.
+        Its cells are formatted and coloured again, and
+        `column_dtype_changed` is emitted.
+
+        Args:
+            col (int): Column number.
+        """
+        self._display_cache.invalidate_column(col)
+        self._search_index.invalidate_column(col)
+        self._format_engine.refresh(col)
+        if self._formatter is not None:
+            self._formatter.discard_all()
+        row_count = self.rowCount(qt.QModelIndex())
+        if row_count:
+            self.dataChanged.emit(self.index(0, col), self.index(row_count - 1, col),
+                                  [qt.Qt.DisplayRole, qt.Qt.EditRole, qt.Qt.BackgroundRole,
+                                   qt.Qt.ForegroundRole])
+        self.column_dtype_changed.emit(col)
+
+    def update_data(self, data: DF, visible_rows: Optional[Tuple[int, int]] = None,
+                    flash: bool = False) -> int:
+        """Update the values in place from data of the same shape, signalling changed cells only.
+
+        Each column of `data` is coerced to the dtype of its column and
+        compared with the current values in one vectorized pass. Only the
+        changed cells are written and their cached strings dropped. One
+        `dataChanged` is emitted per bounding rectangle of changed cells
+        within `visible_rows`, so cells scrolled out of view cost no repaint.
+        There is no model reset, and sort order and filters are kept, as
+        for edits. Updates are not recorded for undo. Index and column
+        labels of `data` are ignored.
+
+        Args:
+            data (DataFrame): New values, with as many rows and columns as
+                the model data, in data order.
+            visible_rows (Tuple[int, int], optional): First and last view
+                rows shown. If None, all rows are signalled.
+            flash (bool): Highlight the changed cells for the duration of
+                `flash_highlights`.
+
+        Raises:
+            ValueError: If the shape does not match, or a value cannot be
+                coerced to its column dtype.
+            TypeError: If a value cannot be coerced to its column dtype.
+
+        Returns:
+            int: Number of changed cells.
+        """
+        shape = (len(self._store), self._store.column_count)
+        if data.shape != shape:
+            raise ValueError(f'Expected data of shape {shape}, got {data.shape}')
+        # Coerce all columns first, so a failed update writes nothing
+        columns = self._store.coerce_columns(data)
+        self._visible_rows = visible_rows
+        source_rows, cols, recolored = [], [], []
+        for col, new in enumerate(columns):
+            rows = changed_rows(self._store.column(col), new)
+            if not rows.size:
+                continue
+            self._store.write(col, rows, new[rows])
+            view_rows = self._row_mapping.from_source(rows)
+            self._invalidate_rows(view_rows[view_rows >= 0], col)
+            if self._format_engine.update_rows(col, rows):
+                recolored.append(col)
+            if flash:
+                self._flash.flash(col, rows, shape[0])
+            source_rows.append(rows)
+            cols.append(np.full(rows.size, col, dtype=np.intp))
+        if not source_rows:
+            return 0
+        source_rows, cols = np.concatenate(source_rows), np.concatenate(cols)
+        self._emit_regions(source_rows, cols, visible_rows,
+                           [qt.Qt.DisplayRole, qt.Qt.EditRole, qt.Qt.BackgroundRole,
+                            qt.Qt.ForegroundRole])
+        first, last = self._shown_rows(visible_rows)
+        if first <= last:
+            for col in recolored:
+                self.dataChanged.emit(self.index(first, col), self.index(last, col),
+                                      [qt.Qt.BackgroundRole, qt.Qt.ForegroundRole])
+        return source_rows.size
+
+    def set_values(self, row: int, col: int, values: Any) -> None:
+        """Write a rectangle of values, like a paste, starting at a cell.
+
+        Each column of `values` is coerced to the dtype of the column it is
+        written to and written in place, without changing the column dtype.
+        Nothing is written if any value cannot be coerced. One `dataChanged`
+        is emitted for the whole rectangle.
+
+        Args:
+            row (int): Top view row.
+            col (int): Left column.
+            values (Any): DataFrame or 2-D array-like of values.
+
+        Raises:
+            IndexError: If the rectangle does not fit in the table.
+            ValueError: If a value cannot be coerced to its column dtype.
+            TypeError: If a value cannot be coerced to its column dtype, or
+                the model is not editable.
+        """
+        frame = values if isinstance(values, pd.DataFrame) else pd.DataFrame(values)
+        if frame.empty:
+            return
+        last_row = row + frame.index.size - 1
+        last_col = col + frame.columns.size - 1
+        self._check_range(row, last_row, col, last_col)
+        columns = [coerce_values(frame.iloc[:, i].array, self._store.dtype(col + i))
+                   for i in range(frame.columns.size)]
+        self._write_columns(row, last_row, col, columns)
+        self.dataChanged.emit(self.index(row, col), self.index(last_row, last_col),
+                              [qt.Qt.DisplayRole, qt.Qt.EditRole])
+
+    def fill(self, first_row: int, first_col: int, last_row: int, last_col: int,
+             value: Any) -> None:
+        """Write one value into every cell of a rectangle.
+
+        Args:
+            first_row (int): Top view row.
+            first_col (int): Left column.
+            last_row (int): Bottom view row, inclusive.
+            last_col (int): Right column, inclusive.
+            value (Any): Value to write, coerced to each column dtype.
+
+        Raises:
+            IndexError: If the rectangle does not fit in the table.
+            ValueError: If the value cannot be coerced to a column dtype.
+            TypeError: If the value cannot be coerced to a column dtype, or
+                the model is not editable.
+        """
+        self._check_range(first_row, last_row, first_col, last_col)
+        scalars = [coerce_value(value, self._store.dtype(col))[0]
+                   for col in range(first_col, last_col + 1)]
+        self._write_columns(first_row, last_row, first_col, scalars)
+        self.dataChanged.emit(self.index(first_row, first_col), self.index(last_row, last_col),
+                              [qt.Qt.DisplayRole, qt.Qt.EditRole])
+
+    def find(self, pattern: str, regex: bool = False, case: bool = False) -> np.ndarray:
+        """Return the cells whose display string matches a pattern.
+
+        Args:
+            pattern (str): Substring, or regular expression if `regex` is True.
+            regex (bool): Whether `pattern` is a regular expression.
+            case (bool): Whether the match is case sensitive.
+
+        Returns:
+            ndarray: Array of shape (n, 2) with the (row, column) of the
+                matching cells in view order. Filtered out cells are skipped.
+        """
+        hits = self._search_index.find(pattern, regex, case)
+        if self._row_mapping.rows is None:
+            return hits
+        rows = self._row_mapping.from_source(hits[:, 0])
+        visible = rows >= 0
+        hits = np.column_stack((rows[visible], hits[visible, 1]))
+        return hits[np.lexsort((hits[:, 1], hits[:, 0]))]
+
+    def sort_by(self, columns: Sequence[int],
+                ascending: Union[bool, Sequence[bool]] = True) -> None:
+        """Sort rows by one or more columns.
+
+        The data is not reordered. The rows are mapped through a stable
+        permutation shared with the row index model. Missing values go last.
+
+        Args:
+            columns (Sequence[int]): Column numbers, most significant first.
+            ascending (Union[bool, Sequence[bool]]): Sort direction, for all
+                or for each column.
+        """
+        if not columns:
+            self._row_mapping.set_order(None)
+            return
+        order = self._store.argsort(columns, ascending)
+        self._row_mapping.set_order(order)
+
+    def insert_rows(self, row: int, values: DF) -> None:
+        """Insert rows of values before a view row.
+
+        Each column of `values` is coerced to the dtype of its column. Nothing
+        is inserted if any value cannot be coerced. The new rows are shown
+        where they are inserted, whatever the sort order and filters.
+
+        Args:
+            row (int): View row to insert before, the number of rows to append.
+            values (DataFrame): Values of the new rows, one column per column.
+
+        Raises:
+            IndexError: If the row is out of bounds.
+            ValueError: If a value cannot be coerced to its column dtype.
+            TypeError: If a value cannot be coerced to its column dtype, or
+                the store is read-only.
+        """
+        if self._store.read_only:
+            raise TypeError('Rows cannot be inserted into a read-only store')
+        self._insert_rows(row, values.index.size, values)
+
+    def append_rows(self, chunk: DF) -> None:
+        """Append rows at the end, coalesced with other chunks once per frame.
+
+        Safe to call from any thread: the chunk is buffered by `append_buffer`
+        and appended on the GUI thread, with one insert for all the chunks
+        of a frame. Appended rows are not recorded for undo. Chunks failing
+        coercion to the column dtypes are logged and dropped.
+
+        Args:
+            chunk (DataFrame): Rows to append, one column per column.
+
+        Raises:
+            ValueError: If the number of columns does not match.
+        """
+        if chunk.columns.size != self._store.column_count:
+            raise ValueError(f'Expected {self._store.column_count} columns, '
+                             f'got {chunk.columns.size}')
+        self._append_buffer.append(chunk)
+
+    @property
+    def append_buffer(self) -> AppendBuffer:
+        """Buffer of the rows given to `append_rows`."""
+        return self._append_buffer
+
+    def _commit_appended(self, values: DF) -> None:
+        self._recording = False
+        try:
+            self._insert_rows(self._row_mapping.size, values.index.size, values)
+        finally:
+            self._recording = True
+
+    def extend_rows(self, count: int) -> None:
+        """Show more rows held by the store, like rows of a file indexed in the background.
+
+        The rows are appended without values and are not recorded for undo.
+        With a `FileStore`, they are the rows of the file indexed since.
+
+        Args:
+            count (int): Number of rows to append.
+        """
+        self._recording = False
+        try:
+            self._insert_rows(self._row_mapping.size, count, None)
+        finally:
+            self._recording = True
+
+    def _insert_rows(self, row: int, count: int, values: Optional[DF]) -> None:
+        if not 0 <= row <= self._row_mapping.size:
+            raise IndexError(f'Row {row} is out of bounds for {self._row_mapping.size} rows')
+        if count < 1:
+            return
+        if values is not None and values.columns.size != self._store.column_count:
+            raise ValueError(f'Expected {self._store.column_count} columns, '
+                             f'got {values.columns.size}')
+        max_rows = self._store.max_rows
+        # Rows appended and dropped at once, skipped by the ring store
+        skipped = 0
+        if max_rows is not None:
+            if row != self._row_mapping.size:
+                raise IndexError(f'Rows can only be appended to a model of at most '
+                                 f'{max_rows} rows')
+            skipped = max(count - max_rows, 0)
+            count -= skipped
+        # Coerce before signalling, so a failed insert leaves the views untouched
+        if values is not None:
+            values = self._store.coerce_frame(values)
+        if max_rows is not None and len(self._store) + count > max_rows:
+            self._drop_oldest(len(self._store) + count - max_rows)
+            row = self._row_mapping.size
+        source_row = self._row_mapping.begin_insert(row, count)
+        self._finish_insert(row, source_row, count, values, skipped)
+
+    def _drop_oldest(self, count: int) -> None:
+        """Remove the first data rows of a bounded model, to make room for appended rows."""
+        recording, self._recording = self._recording, False
+        try:
+            self._remove_source_rows(np.arange(count))
+        finally:
+            self._recording = recording
+        self._undo_stack.clear()
+
+    @property
+    def max_rows(self) -> Optional[int]:
+        """Maximum number of rows, None if unbounded."""
+        return self._store.max_rows
+
+    @property
+    def _recording_rows(self) -> bool:
+        """Whether inserted and removed rows are recorded, never in a bounded model."""
+        return self._recording and self._store.max_rows is None
+
+    def _insert_source_rows(self, source_row: int, values: DF) -> None:
+        """Insert rows of values, with the store dtypes, before a data row."""
+        count = values.index.size
+        row = self._row_mapping.begin_insert_source(source_row, count)
+        self._finish_insert(row, source_row, count, values)
+
+    def _restore_source_rows(self, rows: np.ndarray, values: DF, positions: np.ndarray) -> None:
+        """Put back removed data rows at their recorded positions in the sort order."""
+        row = self._row_mapping.begin_restore(rows, positions)
+        for start, stop in _runs(rows):
+            self._store.insert_rows(int(rows[start]), stop - start, values.iloc[start:stop])
+            self._source_rows_inserted(int(rows[start]), stop - start)
+        self._rows_moved(row)
+        self._row_mapping.end_insert()
+
+    def _finish_insert(self, row: int, source_row: int, count: int,
+                       values: Optional[DF], skipped: int = 0) -> None:
+        # The store drops the first `skipped` rows, counting them in its labels
+        self._store.insert_rows(source_row, count + skipped, values)
+        self._source_rows_inserted(source_row, count)
+        self._rows_moved(row)
+        self._row_mapping.end_insert()
+        if self._recording_rows:
+            rows = np.arange(source_row, source_row + count)
+            self._undo_stack.push(RowsInserted(source_row, self._store.take_frame(rows)))
+
+    def insertRows(self, row: int, count: int,
+                   parent: qt.QModelIndex = qt.QModelIndex()) -> bool:
+        if parent.isValid() or count < 1 or not 0 <= row <= self._row_mapping.size:
+            return False
+        if not self._editable or self._store.read_only:
+            return False
+        if self._store.max_rows is not None and row != self._row_mapping.size:
+            return False
+        self._insert_rows(row, count, None)
+        return True
+
+    def removeRows(self, row: int, count: int,
+                   parent: qt.QModelIndex = qt.QModelIndex()) -> bool:
+        if parent.isValid() or count < 1 or row < 0 or row + count > self._row_mapping.size:
+            return False
+        if not self._editable or self._store.read_only:
+            return False
+        source_rows = self._row_mapping.begin_remove(row, count)
+        self._finish_remove(row, source_rows)
+        return True
+
+    def _remove_source_rows(self, source_rows: np.ndarray) -> None:
+        """Remove sorted data rows, wherever they are shown."""
+        row = self._row_mapping.begin_remove_source(source_rows)
+        self._finish_remove(row, source_rows)
+
+    def _finish_remove(self, row: int, source_rows: np.ndarray) -> None:
+        recording = self._recording_rows
+        if recording:
+            delta = RowsRemoved(source_rows, self._store.take_frame(source_rows),
+                                self._row_mapping.order_positions(source_rows))
+        self._store.remove_rows(source_rows)
+        self._filter_engine.remove_rows(source_rows)
+        self._format_engine.remove_rows(source_rows)
+        self._search_index.remove_rows(source_rows)
+        self._flash.remove_rows(source_rows)
+        self._rows_moved(row)
+        self._row_mapping.end_remove()
+        if recording:
+            self._undo_stack.push(delta)
+
+    @property
+    def filters(self) -> Dict[int, Filter]:
+        """Column filters by column number."""
+        return self._filter_engine.filters
+
+    def set_filter(self, col: int, column_filter: Optional[Filter]) -> None:
+        """Set or remove the filter of a column.
+
+        The filter is evaluated as a mask over the column, and the rows
+        passing all filters are mapped through the shared row mapping.
+
+        Args:
+            col (int): Column number.
+            column_filter (Filter, optional): Filter, None to remove it.
+        """
+        self._filter_engine.set_filter(col, column_filter)
+        self._row_mapping.set_mask(self._filter_engine.mask())
+
+    def clear_filters(self) -> None:
+        """Remove all filters."""
+        self._filter_engine.clear()
+        self._row_mapping.set_mask(None)
+
+    @property
+    def format_rules(self) -> Dict[int, List[FormatRule]]:
+        """Conditional format rules by column number."""
+        return self._format_engine.rules
+
+    def set_format_rules(self, col: int, rules: Sequence[FormatRule]) -> None:
+        """Set the conditional format rules of a column.
+
+        Rules are evaluated in order, the first matching rule giving the
+        colour of a cell for its role.
+
+        Args:
+            col (int): Column number.
+            rules (Sequence[FormatRule]): Rules, empty to remove them.
+
+        Raises:
+            TypeError: If a rule like `TopN` or `ColorScale` needs numbers
+                the column does not hold.
+        """
+        self._format_engine.set_rules(col, rules)
+        self._colors_changed(col)
+
+    def clear_format_rules(self) -> None:
+        """Remove all conditional format rules."""
+        columns = list(self._format_engine.rules)
+        self._format_engine.clear()
+        for col in columns:
+            self._colors_changed(col)
+
+    def sort(self, column: int, order: qt.Qt.SortOrder = qt.Qt.AscendingOrder) -> None:
+        if column < 0:
+            self._row_mapping.set_order(None)
+            return
+        self.sort_by([column], order == qt.Qt.AscendingOrder)
 
     def columnCount(self, parent: qt.QModelIndex) -> int:
         del parent # Unused
-        return self._data.columns.size
+        return self._store.column_count
 
     def rowCount(self, parent: qt.QModelIndex) -> int:
         del parent # Unused
-        return self._data.index.size
+        return self._row_mapping.row_count + self._row_mapping.visible_virtual_rows
+
+    def canFetchMore(self, parent: qt.QModelIndex) -> bool:
+        if parent.isValid():
+            return False
+        return self._row_mapping.can_fetch_more()
+
+    def fetchMore(self, parent: qt.QModelIndex) -> None:
+        if parent.isValid():
+            return
+        self._row_mapping.fetch_more()
 
     def data(self, index: qt.QModelIndex, role: int = qt.Qt.DisplayRole) -> Any:
         # logger.debug('data({}, {}), role: {}'.format( index.row(), index.column(), role))
         if index.row() < 0:
             logger.error('index.row() < 0')
             return None
-        
-        if role == qt.Qt.DisplayRole:
-            return str(self._data.iloc[index.row(), index.column()])
+
+        if role in (qt.Qt.DisplayRole, qt.Qt.EditRole):
+            return self._display_text(index.row(), index.column())
+        if role in (qt.Qt.BackgroundRole, qt.Qt.ForegroundRole):
+            return self._color(index.row(), index.column(), role)
         return None
+
+    def _color(self, row: int, col: int, role: int) -> Optional[qt.QColor]:
+        if self._row_mapping.is_virtual(row):
+            return None
+        source_row = self._row_mapping.to_source(row)
+        if role == qt.Qt.BackgroundRole and self._flash.is_flashing(source_row, col):
+            return self._flash.color
+        return self._format_engine.color(source_row, col, role)
+
+    def _display_text(self, row: int, col: int) -> str:
+        if self._row_mapping.is_virtual(row):
+            return ''
+        if self._formatter is None:
+            return self._display_cache.value(row, col)
+        text = self._formatter.value(row, col)
+        return PLACEHOLDER if text is None else text
+
+    def display_data(self, row: int, col: int) -> Tuple[str, Optional[qt.QColor],
+                                                         Optional[qt.QColor]]:
+        """Return everything a delegate paints for a cell, in one call.
+
+        Args:
+            row (int): Row number.
+            col (int): Column number.
+
+        Returns:
+            Tuple[str, QColor, QColor]: Display string, foreground and
+                background colours, None for the view defaults.
+        """
+        return (self._display_text(row, col), self._color(row, col, qt.Qt.ForegroundRole),
+                self._color(row, col, qt.Qt.BackgroundRole))
+
+    def flags(self, index: qt.QModelIndex) -> qt.Qt.ItemFlags:
+        flags = super().flags(index)
+        if self._editable and index.isValid():
+            flags |= qt.Qt.ItemIsEditable
+        return flags
+
+    def setData(self, index: qt.QModelIndex, value: Any, role: int = qt.Qt.EditRole) -> bool:
+        if not index.isValid() or role != qt.Qt.EditRole or not self._editable:
+            return False
+        row, col = index.row(), index.column()
+        try:
+            coerced = coerce_value(value, self._store.dtype(col))
+        except (ValueError, TypeError) as exc:
+            logger.warning('Cannot set ({}, {}) to {!r}: {}'.format(row, col, value, exc))
+            return False
+        if self._row_mapping.is_virtual(row):
+            # Append a data row where the first virtual row was, recorded as one insert
+            row = self._row_mapping.size
+            self._recording = False
+            try:
+                self._insert_rows(row, 1, None)
+                self._write_columns(row, row, col, [coerced])
+            finally:
+                self._recording = True
+            source_row = len(self._store) - 1
+            if self._store.max_rows is None:
+                self._undo_stack.push(RowsInserted(
+                    source_row, self._store.take_frame(np.array([source_row]))))
+            index = self.index(row, col)
+            self.dataChanged.emit(index, index, [qt.Qt.DisplayRole, qt.Qt.EditRole])
+            return True
+        self._write_columns(row, row, col, [coerced])
+        self.dataChanged.emit(index, index, [qt.Qt.DisplayRole, qt.Qt.EditRole])
+        return True
+
+
+def _runs(rows: np.ndarray) -> List[Tuple[int, int]]:
+    """Return the `[start, stop)` bounds of the runs of consecutive values in sorted rows."""
+    breaks = np.flatnonzero(np.diff(rows) != 1) + 1
+    return list(zip(np.r_[0, breaks].tolist(), np.r_[breaks, rows.size].tolist()))
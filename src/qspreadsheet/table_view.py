@@ -1,12 +1,70 @@
 """Table view."""
 
-from typing import Optional
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
 
 from qspreadsheet import qt
+from qspreadsheet.delegates import CategoryDelegate, CellDelegate, delegate_class
+from qspreadsheet.display_cache import format_block
+
+# Rows and columns measured for the size hint, larger tables scroll anyway
+SIZE_HINT_MAX_ROWS = 50
+SIZE_HINT_MAX_COLUMNS = 50
+
+# Rows sampled to fit column widths
+FIT_HEAD_ROWS = 20
+FIT_TAIL_ROWS = 20
+FIT_SAMPLE_ROWS = 1000
+FIT_LONGEST_ROWS = 10
+FIT_MAX_WIDTH = 400
+# Cell padding on both sides of the text
+FIT_MARGIN = 12
+
+
+def width_candidates(take: Callable[[np.ndarray], Sequence[Any]], size: int,
+                     sample_rows: int = FIT_SAMPLE_ROWS,
+                     rng: Optional[np.random.Generator] = None) -> List[str]:
+    """Return the display strings likely to be the widest of a column.
+
+    Takes the first and last rows and the longest strings of a random
+    sample of rows. Only these are formatted, whatever the
+    length of the column.
+
+    Args:
+        take (Callable[[ndarray], Sequence[Any]]): Callable returning the
+            column values of some rows.
+        size (int): Number of rows.
+        sample_rows (int): Number of randomly sampled rows.
+        rng (Generator, optional): Random generator for the sample.
+
+    Returns:
+        List[str]: Candidate display strings.
+    """
+    if size <= FIT_HEAD_ROWS + FIT_TAIL_ROWS + sample_rows:
+        return format_block(take(np.arange(size)))
+    rng = rng or np.random.default_rng()
+    strings = format_block(take(rng.integers(0, size, sample_rows)))
+    lengths = np.fromiter(map(len, strings), dtype=np.intp, count=len(strings))
+    longest = np.argpartition(lengths, -FIT_LONGEST_ROWS)[-FIT_LONGEST_ROWS:]
+    edges = np.r_[0:FIT_HEAD_ROWS, size - FIT_TAIL_ROWS:size]
+    return format_block(take(edges)) + [strings[i] for i in longest]
 
 
 class TableView(qt.QTableView):
-    """Table view."""
+    """Table view.
+
+    The size hint is measured over at most `SIZE_HINT_MAX_ROWS` rows and
+    `SIZE_HINT_MAX_COLUMNS` columns, and cached until rows or columns are
+    inserted, removed or resized.
+
+    Columns of models with a row store are painted by a delegate chosen by
+    `delegate_class` from the column dtype. Columns of the same dtype share
+    a delegate.
+
+    With `follow_tail` set, the view scrolls to the last row whenever rows
+    are inserted.
+    """
 
     def __init__(self, parent: Optional[qt.QObject] = None) -> None:
         """Create TableView object.
@@ -15,6 +73,181 @@ class TableView(qt.QTableView):
             parent: A QWidget, optional, to be assigned as parent.
         """
         super().__init__(parent)
+        self._size_hint: Optional[qt.QSize] = None
+        self._column_delegates: List[CellDelegate] = []
+        self._delegated_columns = 0
+        # Column dtypes the delegates were chosen for
+        self._delegated_dtypes: List[Any] = []
+        self._follow_tail = False
+        self.horizontalHeader().sectionResized.connect(self.invalidate_size_hint)
+        self.verticalHeader().sectionResized.connect(self.invalidate_size_hint)
+
+    def fit_columns(self, columns: Optional[Sequence[int]] = None,
+                    labels: Optional[Sequence[str]] = None,
+                    max_width: int = FIT_MAX_WIDTH) -> List[int]:
+        """Resize columns to fit their contents, estimated from a sample of rows.
+
+        Only the candidates of `width_candidates` are measured, so fitting
+        does not depend on the number of rows. Models without a row store
+        are fitted by Qt, measuring every cell.
+
+        Args:
+            columns: Column numbers, optional. All columns if None.
+            labels: Header labels, optional, one per column of the model,
+                to fit as well.
+            max_width: An int, the maximum column width.
+
+        Returns:
+            Widths of the fitted columns.
+        """
+        model = self.model()
+        if columns is None:
+            columns = range(model.columnCount(qt.QModelIndex()))
+        store = getattr(model, 'row_store', None)
+        if store is None:
+            for col in columns:
+                self.resizeColumnToContents(col)
+            return [self.columnWidth(col) for col in columns]
+        metrics = qt.QFontMetrics(self.font())
+        minimum = self.horizontalHeader().minimumSectionSize()
+        widths = []
+        for col in columns:
+            strings = width_candidates(lambda rows: store.take(col, rows), len(store))
+            if labels is not None:
+                strings.append(labels[col])
+            text_width = max((metrics.horizontalAdvance(text) for text in set(strings)),
+                             default=0)
+            width = min(max(text_width + FIT_MARGIN, minimum), max_width)
+            self.setColumnWidth(col, width)
+            widths.append(width)
+        return widths
+
+    def setHorizontalHeader(self, header: qt.QHeaderView) -> None:
+        """Set the column header, invalidating the size hint when it resizes.
+
+        Args:
+            header: A QHeaderView.
+        """
+        super().setHorizontalHeader(header)
+        header.sectionResized.connect(self.invalidate_size_hint)
+        self.invalidate_size_hint()
+
+    def setVerticalHeader(self, header: qt.QHeaderView) -> None:
+        """Set the row header, invalidating the size hint when it resizes.
+
+        Args:
+            header: A QHeaderView.
+        """
+        super().setVerticalHeader(header)
+        header.sectionResized.connect(self.invalidate_size_hint)
+        self.invalidate_size_hint()
+
+    def setModel(self, model: qt.QAbstractItemModel) -> None:
+        """Set the model, invalidating the size hint when its shape changes.
+
+        Args:
+            model: A QAbstractItemModel.
+        """
+        previous = self.model()
+        if previous is not None:
+            for signal in self._shape_signals(previous):
+                signal.disconnect(self.invalidate_size_hint)
+            for signal in self._column_signals(previous):
+                signal.disconnect(self.apply_dtype_delegates)
+            previous.modelReset.disconnect(self._on_model_reset)
+            previous.rowsInserted.disconnect(self._on_rows_inserted)
+        super().setModel(model)
+        if model is not None:
+            for signal in self._shape_signals(model):
+                signal.connect(self.invalidate_size_hint)
+            for signal in self._column_signals(model):
+                signal.connect(self.apply_dtype_delegates)
+            model.modelReset.connect(self._on_model_reset)
+            model.rowsInserted.connect(self._on_rows_inserted)
+        self.invalidate_size_hint()
+        self.apply_dtype_delegates()
+
+    @staticmethod
+    def _shape_signals(model: qt.QAbstractItemModel) -> List[Any]:
+        return [model.rowsInserted, model.rowsRemoved, model.columnsInserted,
+                model.columnsRemoved, model.modelReset, model.layoutChanged]
+
+    @property
+    def follow_tail(self) -> bool:
+        """Whether the view scrolls to the last row when rows are appended."""
+        return self._follow_tail
+
+    @follow_tail.setter
+    def follow_tail(self, value: bool) -> None:
+        self._follow_tail = value
+        if value:
+            self.scrollToBottom()
+
+    def _on_rows_inserted(self, *args) -> None:
+        del args  # Unused, signals arguments
+        if self._follow_tail:
+            self.scrollToBottom()
+
+    def visible_rows(self) -> Optional[Tuple[int, int]]:
+        """Return the first and last rows shown in the viewport, None if no row is shown."""
+        first = self.rowAt(0)
+        if first < 0:
+            return None
+        last = self.rowAt(self.viewport().height() - 1)
+        if last < 0:
+            last = self.model().rowCount(qt.QModelIndex()) - 1
+        return first, last
+
+    @staticmethod
+    def _column_signals(model: qt.QAbstractItemModel) -> List[Any]:
+        signals = [model.columnsInserted, model.columnsRemoved]
+        if hasattr(model, 'column_dtype_changed'):
+            signals.append(model.column_dtype_changed)
+        return signals
+
+    def _on_model_reset(self) -> None:
+        # Sorting and filtering reset the model too, keeping the columns
+        store = getattr(self.model(), 'row_store', None)
+        dtypes = [] if store is None else [store.dtype(col) for col in range(store.column_count)]
+        if dtypes != self._delegated_dtypes:
+            self.apply_dtype_delegates()
+
+    def apply_dtype_delegates(self, *args) -> None:
+        """Set the delegate of each column from its dtype, if the model has a row store.
+
+        Called when columns are inserted or removed, when a column dtype
+        changes, and on model resets that change the dtypes.
+        """
+        del args  # Unused, signals arguments
+        for col in range(self._delegated_columns):
+            self.setItemDelegateForColumn(col, None)
+        for delegate in self._column_delegates:
+            delegate.deleteLater()
+        self._column_delegates = []
+        self._delegated_columns = 0
+        self._delegated_dtypes = []
+        store = getattr(self.model(), 'row_store', None)
+        if store is None:
+            return
+        shared: Dict[Any, CellDelegate] = {}
+        for col in range(store.column_count):
+            dtype = store.dtype(col)
+            self._delegated_dtypes.append(dtype)
+            cls = delegate_class(dtype)
+            # Only category delegates depend on more than the dtype class
+            key = dtype if cls is CategoryDelegate else cls
+            delegate = shared.get(key)
+            if delegate is None:
+                delegate = shared[key] = cls.for_dtype(dtype, self)
+                self._column_delegates.append(delegate)
+            self.setItemDelegateForColumn(col, delegate)
+        self._delegated_columns = store.column_count
+
+    def invalidate_size_hint(self, *args) -> None:
+        """Drop the cached size hint and ask the layout to query it again."""
+        del args  # Unused, signals arguments
+        self._size_hint = None
+        self.updateGeometry()
 
     def contextMenuEvent(self, event: qt.QContextMenuEvent) -> None:
         """Handles right-clicking on a cell.
@@ -48,18 +281,30 @@ class TableView(qt.QTableView):
         menu = qt.QMenu('context menu', self)
         return menu
 
-    def sizeHint(self):
-        # Set width and height based on number of columns in model
+    def sizeHint(self) -> qt.QSize:
+        if self._size_hint is None:
+            self._size_hint = self._measure_size_hint()
+        return self._size_hint
+
+    def _measure_size_hint(self) -> qt.QSize:
+        """Size of the first rows and columns, plus the visible headers and the frame."""
+        model = self.model()
+        column_count = 0 if model is None else model.columnCount(qt.QModelIndex())
+        row_count = 0 if model is None else model.rowCount(qt.QModelIndex())
         # Width
         width = 2 * self.frameWidth()  # Account for border & padding
+        if not self.verticalHeader().isHidden():
+            width += self.verticalHeader().sizeHint().width()
         # width += self.verticalScrollBar().width()  # Dark theme has scrollbars always shown
-        for i in range(self.model().columnCount(qt.QModelIndex())):
+        for i in range(min(column_count, SIZE_HINT_MAX_COLUMNS)):
             width += self.columnWidth(i)
 
         # Height
         height = 2 * self.frameWidth()  # Account for border & padding
+        if not self.horizontalHeader().isHidden():
+            height += self.horizontalHeader().sizeHint().height()
         # height += self.horizontalScrollBar().height()  # Dark theme has scrollbars always shown
-        for i in range(self.model().rowCount(qt.QModelIndex())):
+        for i in range(min(row_count, SIZE_HINT_MAX_ROWS)):
             height += self.rowHeight(i)
 
-        return qt.QSize(width, height)
\ No newline at end of file
+        return qt.QSize(width, height)
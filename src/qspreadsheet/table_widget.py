@@ -1,11 +1,20 @@
 """A TableWidget to implement and manage table and index views and models."""
 
-from typing import Optional
+import os
+from typing import Any, Optional, Sequence, Union
 
+import numpy as np
+import pandas as pd
+
+from qspreadsheet.data_source import DataSource, SourceStore, as_source
+from qspreadsheet.file_store import CsvSource, FileStore
+from qspreadsheet.filters import Filter
+from qspreadsheet.row_store import RowStore
 from qspreadsheet.types import DF
 from qspreadsheet import qt
-from qspreadsheet import index_view
+from qspreadsheet import header_view
 from qspreadsheet import index_model
+from qspreadsheet import row_mapping
 from qspreadsheet import table_view
 from qspreadsheet import table_model
 
@@ -16,30 +25,199 @@ class TableWidget(qt.QWidget):
     Handle setting column delegates.
     """
 
-    def __init__(self, data: DF, parent: Optional[qt.QObject] = None) -> None:
+    def __init__(self, data: Union[DF, RowStore, DataSource, Any],
+                 parent: Optional[qt.QObject] = None,
+                 fetch_chunk_size: Optional[int] = None,
+                 max_rows: Optional[int] = None, follow_tail: bool = False) -> None:
         """Create TableWidget object.
 
         Args:
+            data: A DataFrame, a RowStore like a `MappedStore` over a
+                memory-mapped file, or a DataSource, or a Polars DataFrame or
+                NumPy structured array to read through one.
             parent: A QWidget, optional, to be assigned as parent.
+            fetch_chunk_size: An int, optional. If given, rows are loaded
+                incrementally in chunks of this size as the user scrolls.
+            max_rows: An int, optional. If given, only the last `max_rows`
+                rows are kept, appended rows overwriting the oldest ones.
+            follow_tail: A bool, whether to scroll to appended rows.
         """
         super(TableWidget, self).__init__(parent)
+        if not isinstance(data, (pd.DataFrame, RowStore)):
+            data = SourceStore(as_source(data))
         self._data = data
-
-        self._data_model = table_model.TableModel(data, self)
+        if isinstance(data, RowStore):
+            index, columns = data.index(), data.columns
+        else:
+            index, columns = data.index, data.columns
+
+        size = index.size if max_rows is None else min(index.size, max_rows)
+        self._row_mapping = row_mapping.RowMapping(size, fetch_chunk_size, self)
+        # Files read in pages are not read whole ahead of a search
+        prepare_search = not (isinstance(data, RowStore) and data.read_only)
+        self._data_model = table_model.TableModel(
+            data, self, row_mapping=self._row_mapping, max_rows=max_rows,
+            prepare_search=prepare_search)
         self.table_view = table_view.TableView(self)
-        self.table_view.setModel(self._data_model)        
+        self.table_view.setModel(self._data_model)
+        self.table_view.follow_tail = follow_tail
         
-        self._row_index_model = index_model.RowIndexModel(data.index, self)
-        self.row_index_view = index_view.IndexView('rows', self)
-        self.row_index_view.setModel(self._row_index_model)
-
-        self._col_index_model = index_model.ColumnIndexModel(data.columns, self)
-        self.col_index_vew = index_view.IndexView('columns', self)
-        self.col_index_vew.setModel(self._col_index_model)
+        # Index labels are painted by the table view's own headers
+        self._row_index_model = index_model.RowIndexModel(
+            index, self, row_mapping=self._row_mapping,
+            row_store=self._data_model.row_store)
+        self.row_header = header_view.IndexHeaderView(
+            qt.Qt.Vertical, self._row_index_model, self.table_view)
+        self.table_view.setVerticalHeader(self.row_header)
+
+        self._col_index_model = index_model.ColumnIndexModel(columns, self)
+        self.col_header = header_view.IndexHeaderView(
+            qt.Qt.Horizontal, self._col_index_model, self.table_view)
+        self.table_view.setHorizontalHeader(self.col_header)
+
+        self._search_hits = np.empty((0, 2), dtype=np.intp)
+        self._search_pos = -1
 
         self._name_managed()
         self._setup_ui()
 
+    @classmethod
+    def from_file(cls, path: Union[str, os.PathLike], parent: Optional[qt.QObject] = None,
+                  fetch_chunk_size: Optional[int] = None, **options: Any) -> 'TableWidget':
+        """Show a Parquet or CSV file, read in pages as rows are shown.
+
+        The first rows show at once. The rows of a CSV file are indexed in the
+        background, and appended as they are found. The table is read-only.
+
+        Args:
+            path: A path, `.parquet` or `.pq` for Parquet, anything else CSV.
+            parent: A QWidget, optional, to be assigned as parent.
+            fetch_chunk_size: An int, optional. If given, rows are loaded
+                incrementally in chunks of this size as the user scrolls.
+            **options: Options of the file source, see `FileStore.open`.
+
+        Returns:
+            A TableWidget showing the file.
+        """
+        store = FileStore.open(path, **options)
+        widget = cls(store, parent, fetch_chunk_size)
+        widget._data_model.editable = False
+        source = store.source
+        if isinstance(source, CsvSource):
+            source.setParent(widget)
+            source.rows_indexed.connect(
+                lambda rows: widget._data_model.extend_rows(rows - len(store)))
+            # Queued, since columns are widened while their cells are read
+            source.dtype_changed.connect(widget._data_model.refresh_column,
+                                         qt.Qt.QueuedConnection)
+        return widget
+
+    def sort(self, columns: Sequence[int], ascending: Union[bool, Sequence[bool]] = True) -> None:
+        """Sort rows by one or more columns, without copying the data.
+
+        Args:
+            columns: Column numbers, most significant first. Empty to restore
+                the data order.
+            ascending: A bool, or one bool per column, for the sort direction.
+        """
+        self._data_model.sort_by(columns, ascending)
+
+    def set_filter(self, column: int, column_filter: Optional[Filter]) -> None:
+        """Set or remove the filter of a column, without copying the data.
+
+        Args:
+            column: Column number.
+            column_filter: A Filter, or None to remove the column filter.
+        """
+        self._data_model.set_filter(column, column_filter)
+
+    def clear_filters(self) -> None:
+        """Remove all column filters."""
+        self._data_model.clear_filters()
+
+    def append_rows(self, chunk: DF) -> None:
+        """Append rows at the end, once per frame. Safe to call from any thread.
+
+        Args:
+            chunk: A DataFrame, rows with one column per column.
+        """
+        self._data_model.append_rows(chunk)
+
+    def update_data(self, data: DF, flash: bool = False) -> int:
+        """Update the values in place from data of the same shape, repainting changed cells.
+
+        Only the changed cells in the rows shown are signalled, see
+        `TableModel.update_data`.
+
+        Args:
+            data: A DataFrame, new values with the shape of the current data.
+            flash: A bool, whether to highlight the changed cells for a moment.
+
+        Returns:
+            Number of changed cells.
+        """
+        visible_rows = self.table_view.visible_rows()
+        if visible_rows is None:
+            visible_rows = (0, -1)
+        return self._data_model.update_data(data, visible_rows, flash)
+
+    def fit_columns(self, max_width: int = table_view.FIT_MAX_WIDTH) -> None:
+        """Resize columns to fit their contents and labels, from a sample of rows.
+
+        Args:
+            max_width: An int, the maximum column width.
+        """
+        model = self._col_index_model
+        labels = [max((model.label(col, level) for level in range(model.nlevels)), key=len)
+                  for col in range(model.columnCount(qt.QModelIndex()))]
+        self.table_view.fit_columns(labels=labels, max_width=max_width)
+
+    def find(self, pattern: str, regex: bool = False, case: bool = False) -> int:
+        """Find all cells matching a string or regular expression.
+
+        The first match becomes current. Use `find_next` and `find_previous`
+        to move through the matches.
+
+        Args:
+            pattern: A str, substring to find, or regular expression if `regex`.
+            regex: A bool, whether `pattern` is a regular expression.
+            case: A bool, whether the match is case sensitive.
+
+        Returns:
+            Number of matching cells.
+        """
+        self._search_hits = self._data_model.find(pattern, regex, case)
+        self._search_pos = -1
+        self.find_next()
+        return len(self._search_hits)
+
+    def find_next(self) -> bool:
+        """Make the next match current, wrapping around.
+
+        Returns:
+            True if there is any match.
+        """
+        return self._select_search_hit(self._search_pos + 1)
+
+    def find_previous(self) -> bool:
+        """Make the previous match current, wrapping around.
+
+        Returns:
+            True if there is any match.
+        """
+        return self._select_search_hit(self._search_pos - 1)
+
+    def _select_search_hit(self, pos: int) -> bool:
+        if not len(self._search_hits):
+            return False
+        self._search_pos = pos % len(self._search_hits)
+        row, col = self._search_hits[self._search_pos]
+        self._row_mapping.fetch_to(int(row) + 1)
+        index = self._data_model.index(int(row), int(col))
+        self.table_view.setCurrentIndex(index)
+        self.table_view.scrollTo(index)
+        return True
+
     def _name_managed(self):
         """Name managed Qt objects."""
         for attr_name in [a for a in dir(self) if not a.startswith('__') and a.startswith('_')]:
@@ -51,39 +229,13 @@ class TableWidget(qt.QWidget):
         """Setup UI layout for this widget."""
         
         self.setWindowTitle('Qspreadsheet - v0.0.1')
-        self.col_index_vew.horizontalHeader().setVisible(False)
-        self.col_index_vew.verticalHeader().setVisible(False)
-
-        self.row_index_view.horizontalHeader().setVisible(False)        
-        self.row_index_view.verticalHeader().setVisible(False)
-
-        self.table_view.horizontalHeader().setVisible(False)        
-        self.table_view.verticalHeader().setVisible(False)
         self._setup_table_grid_layout()
 
     def _setup_table_grid_layout(self):
-        corner = qt.QLabel('corner')
-
         v = qt.QVBoxLayout()
-        h = qt.QVBoxLayout()
-        v.addLayout(h)
         grid_layout = qt.QGridLayout()
-        h.addLayout(grid_layout)
+        v.addLayout(grid_layout)
 
         grid_layout.setObjectName('grid_layout')
-        grid_layout.addWidget(corner, 0, 0, qt.Qt.AlignTop | qt.Qt.AlignLeft)
-        grid_layout.addWidget(self.col_index_vew, 0, 1)
-        grid_layout.addWidget(self.row_index_view, 1, 0)
-        grid_layout.addWidget(self.table_view, 1, 1)
-        grid_layout.setRowStretch(0, 1)
-        grid_layout.setRowStretch(1, 100)
-        grid_layout.setColumnStretch(0, 1)
-        grid_layout.setColumnStretch(1, 100)
-        # grid_layout.setRowStretch(0, 0),
-        # grid_layout.setRowStretch(1, 2)
-        # grid_layout.setColumnStretch(0, 0)
-        # grid_layout.setColumnStretch(1, 1)
-
-        # grid_layout.setSpacing(0)
-        # grid_layout.setContentsMargins(qt.QMargins(2, 1, 2, 1))
+        grid_layout.addWidget(self.table_view, 0, 0)
         self.setLayout(v)
\ No newline at end of file
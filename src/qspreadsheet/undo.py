@@ -0,0 +1,232 @@
+"""Undo stack of compact edit deltas."""
+
+from collections import deque
+from typing import Any, Deque, List, Optional
+
+import numpy as np
+
+from qspreadsheet import logging
+from qspreadsheet import qt
+from qspreadsheet.types import DF
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MEMORY_BUDGET = 64 * 1024 * 1024
+# Estimated size of a Python object referenced from an object array
+OBJECT_NBYTES = 64
+
+
+def values_nbytes(values: Any) -> int:
+    """Return the estimated memory size of an array, or of a scalar.
+
+    Args:
+        values (Any): ndarray, pandas array or scalar.
+
+    Returns:
+        int: Size in bytes.
+    """
+    nbytes = getattr(values, 'nbytes', None)
+    if nbytes is None:
+        return OBJECT_NBYTES
+    if values.dtype == object:
+        nbytes += len(values) * OBJECT_NBYTES
+    return int(nbytes)
+
+
+class Delta:
+    """Recorded change, undone and redone by the model which recorded it."""
+
+    @property
+    def nbytes(self) -> int:
+        """Estimated memory size of the recorded values."""
+        raise NotImplementedError
+
+
+class CellsDelta(Delta):
+    """Values written into the same data rows of consecutive columns.
+
+    Args:
+        rows (ndarray): Data rows.
+        first_col (int): First column.
+        old (List[Any]): Previous values, one array per column.
+        new (List[Any]): Written values, one array or scalar per column.
+    """
+
+    def __init__(self, rows: np.ndarray, first_col: int,
+                 old: List[Any], new: List[Any]) -> None:
+        """Create CellsDelta object.
+
+        Args:
+            rows (ndarray): Data rows.
+            first_col (int): First column.
+            old (List[Any]): Previous values.
+            new (List[Any]): Written values.
+        """
+        self.rows = rows
+        self.first_col = first_col
+        self.old = old
+        self.new = new
+
+    @property
+    def nbytes(self) -> int:
+        return (self.rows.nbytes + sum(values_nbytes(values) for values in self.old)
+                + sum(values_nbytes(values) for values in self.new))
+
+
+class RowsInserted(Delta):
+    """Rows inserted before a data row.
+
+    Args:
+        row (int): First inserted data row.
+        values (DataFrame): Values of the inserted rows.
+    """
+
+    def __init__(self, row: int, values: DF) -> None:
+        """Create RowsInserted object.
+
+        Args:
+            row (int): First inserted data row.
+            values (DataFrame): Values of the inserted rows.
+        """
+        self.row = row
+        self.values = values
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.values.memory_usage(deep=False).sum())
+
+
+class RowsRemoved(Delta):
+    """Removed data rows, with their values and their positions in the sort order.
+
+    Args:
+        rows (ndarray): Sorted removed data rows.
+        values (DataFrame): Values of the removed rows.
+        positions (ndarray, optional): Position of each removed row in the
+            rows order, None if rows were in data order.
+    """
+
+    def __init__(self, rows: np.ndarray, values: DF,
+                 positions: Optional[np.ndarray] = None) -> None:
+        """Create RowsRemoved object.
+
+        Args:
+            rows (ndarray): Sorted removed data rows.
+            values (DataFrame): Values of the removed rows.
+            positions (ndarray, optional): Positions of the rows in the order.
+        """
+        self.rows = rows
+        self.values = values
+        self.positions = positions
+
+    @property
+    def nbytes(self) -> int:
+        nbytes = self.rows.nbytes + int(self.values.memory_usage(deep=False).sum())
+        return nbytes if self.positions is None else nbytes + self.positions.nbytes
+
+
+class UndoStack(qt.QObject):
+    """Bounded stack of deltas to undo and redo.
+
+    Deltas hold only the changed cells or rows, never a copy of the table.
+    When their estimated size exceeds `memory_budget`, the oldest deltas are
+    dropped first. The newest delta is always kept.
+
+    Args:
+        memory_budget (int): Maximum estimated size of the deltas, in bytes.
+        parent (QObject): Optional parent for this object.
+    """
+
+    changed = qt.Signal()
+
+    def __init__(self, memory_budget: int = DEFAULT_MEMORY_BUDGET,
+                 parent: Optional[qt.QObject] = None) -> None:
+        """Create UndoStack object.
+
+        Args:
+            memory_budget (int): Maximum estimated size of the deltas.
+            parent (QObject): Optional parent for this object.
+        """
+        super().__init__(parent)
+        self._memory_budget = memory_budget
+        self._undo: Deque[Delta] = deque()
+        self._redo: List[Delta] = []
+        self._nbytes = 0
+
+    @property
+    def memory_budget(self) -> int:
+        """Maximum estimated size of the deltas, in bytes."""
+        return self._memory_budget
+
+    @memory_budget.setter
+    def memory_budget(self, value: int) -> None:
+        self._memory_budget = value
+        self._evict()
+
+    @property
+    def nbytes(self) -> int:
+        """Estimated size of the deltas, in bytes."""
+        return self._nbytes
+
+    def __len__(self) -> int:
+        return len(self._undo)
+
+    def can_undo(self) -> bool:
+        """Return True if there is a delta to undo."""
+        return bool(self._undo)
+
+    def can_redo(self) -> bool:
+        """Return True if there is a delta to redo."""
+        return bool(self._redo)
+
+    def push(self, delta: Delta) -> None:
+        """Record a new delta, dropping the deltas to redo.
+
+        Args:
+            delta (Delta): Recorded change.
+        """
+        for dropped in self._redo:
+            self._nbytes -= dropped.nbytes
+        self._redo.clear()
+        self._undo.append(delta)
+        self._nbytes += delta.nbytes
+        self._evict()
+        self.changed.emit()
+
+    def pop_undo(self) -> Optional[Delta]:
+        """Move the newest delta to the redo stack.
+
+        Returns:
+            Delta, optional: Delta to undo, None if there is none.
+        """
+        if not self._undo:
+            return None
+        delta = self._undo.pop()
+        self._redo.append(delta)
+        self.changed.emit()
+        return delta
+
+    def pop_redo(self) -> Optional[Delta]:
+        """Move the last undone delta back to the undo stack.
+
+        Returns:
+            Delta, optional: Delta to redo, None if there is none.
+        """
+        if not self._redo:
+            return None
+        delta = self._redo.pop()
+        self._undo.append(delta)
+        self.changed.emit()
+        return delta
+
+    def clear(self) -> None:
+        """Drop all deltas."""
+        self._undo.clear()
+        self._redo.clear()
+        self._nbytes = 0
+        self.changed.emit()
+
+    def _evict(self) -> None:
+        while self._nbytes > self._memory_budget and len(self._undo) > 1:
+            self._nbytes -= self._undo.popleft().nbytes
+
@@ -0,0 +1,215 @@
+"""Vectorized diffs of in-place data updates, and flash highlights of changed cells."""
+
+import collections
+import time
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from qspreadsheet import logging
+from qspreadsheet import qt
+from qspreadsheet.conditional_format import ColorLike
+
+logger = logging.getLogger(__name__)
+
+# Unchanged rows allowed inside one changed region, to emit fewer rectangles
+MERGE_GAP = 3
+FLASH_DURATION_MS = 500
+FLASH_COLOR = '#ffe680'
+
+# (first row, first column, last row, last column), inclusive
+Region = Tuple[int, int, int, int]
+
+
+def changed_rows(old: Sequence[Any], new: Sequence[Any]) -> np.ndarray:
+    """Return the rows where two columns of the same dtype differ.
+
+    Missing values compare equal to each other, so a NaN that stays NaN is
+    not a change.
+
+    Args:
+        old (Sequence[Any]): ndarray or pandas array of old values.
+        new (Sequence[Any]): ndarray or pandas array of new values.
+
+    Returns:
+        ndarray: Sorted row numbers.
+    """
+    with np.errstate(invalid='ignore'):
+        differ = old != new
+    if isinstance(differ, pd.api.extensions.ExtensionArray):
+        differ = differ.to_numpy(dtype=bool, na_value=True)
+    rows = np.flatnonzero(differ)
+    # Missing values compare unequal, checked over the candidate rows only
+    both_missing = pd.isna(old[rows]) & pd.isna(new[rows])
+    return rows[~np.asarray(both_missing, dtype=bool)]
+
+
+def changed_regions(rows: np.ndarray, cols: np.ndarray,
+                    merge_gap: int = MERGE_GAP) -> List[Region]:
+    """Group changed cells into bounding rectangles.
+
+    Cells are grouped by runs of changed rows, a run going on over at
+    most `merge_gap` unchanged rows. Each run gives one rectangle, spanning
+    the changed columns of its rows.
+
+    Args:
+        rows (ndarray): Row of each changed cell.
+        cols (ndarray): Column of each changed cell.
+        merge_gap (int): Unchanged rows allowed inside a run.
+
+    Returns:
+        List[Region]: Rectangles `(first_row, first_col, last_row, last_col)`.
+    """
+    if not len(rows):
+        return []
+    order = np.argsort(rows, kind='stable')
+    rows, cols = np.asarray(rows)[order], np.asarray(cols)[order]
+    breaks = np.flatnonzero(np.diff(rows) > merge_gap + 1) + 1
+    starts = np.r_[0, breaks]
+    stops = np.r_[breaks, rows.size]
+    first_cols = np.minimum.reduceat(cols, starts)
+    last_cols = np.maximum.reduceat(cols, starts)
+    return [(int(first_row), int(first_col), int(last_row), int(last_col))
+            for first_row, first_col, last_row, last_col
+            in zip(rows[starts], first_cols, rows[stops - 1], last_cols)]
+
+
+class FlashHighlights(qt.QObject):
+    """Highlight state of recently changed cells, held in arrays.
+
+    Each flashed column holds an array of expiry times, one per data row,
+    zero for cells that are not highlighted. Flashes are queued in batches,
+    in the order they expire, and one single shot timer clears the next
+    batch due, so there is no timer per cell. Cells flashed again before
+    their batch expires stay highlighted until the later batch.
+
+    Args:
+        duration (int): Highlight time, in milliseconds.
+        color (ColorLike): Highlight background colour.
+        parent (QObject): Optional parent for this object.
+    """
+
+    # Data rows and columns of the cells no longer highlighted
+    expired = qt.Signal(object, object)
+
+    def __init__(self, duration: int = FLASH_DURATION_MS, color: ColorLike = FLASH_COLOR,
+                 parent: Optional[qt.QObject] = None) -> None:
+        """Create FlashHighlights object.
+
+        Args:
+            duration (int): Highlight time, in milliseconds.
+            color (ColorLike): Highlight background colour.
+            parent (QObject): Optional parent for this object.
+        """
+        super().__init__(parent)
+        self._duration = duration
+        self._color = qt.QColor(color)
+        self._expiry: Dict[int, np.ndarray] = {}
+        self._batches: Deque[Tuple[float, int, np.ndarray]] = collections.deque()
+        self._timer = qt.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._expire)
+
+    @property
+    def duration(self) -> int:
+        """Highlight time, in milliseconds."""
+        return self._duration
+
+    @duration.setter
+    def duration(self, value: int) -> None:
+        self._duration = value
+
+    @property
+    def color(self) -> qt.QColor:
+        """Highlight background colour."""
+        return self._color
+
+    @color.setter
+    def color(self, value: ColorLike) -> None:
+        self._color = qt.QColor(value)
+
+    def flash(self, col: int, rows: np.ndarray, size: int) -> None:
+        """Highlight data rows of a column for `duration`.
+
+        Args:
+            col (int): Column number.
+            rows (ndarray): Data rows.
+            size (int): Number of data rows.
+        """
+        if not len(rows):
+            return
+        expiry = self._expiry.get(col)
+        if expiry is None:
+            expiry = self._expiry[col] = np.zeros(size)
+        elif expiry.size < size:
+            # Rows appended since the last flash are not highlighted
+            expiry = self._expiry[col] = np.concatenate((expiry, np.zeros(size - expiry.size)))
+        due = time.monotonic() + self._duration / 1000
+        expiry[rows] = due
+        self._batches.append((due, col, np.asarray(rows)))
+        if not self._timer.isActive():
+            self._timer.start(self._duration)
+
+    def is_flashing(self, row: int, col: int) -> bool:
+        """Return whether a cell is highlighted.
+
+        Args:
+            row (int): Data row.
+            col (int): Column number.
+        """
+        expiry = self._expiry.get(col)
+        return expiry is not None and row < expiry.size and expiry[row] > 0
+
+    def insert_rows(self, row: int, count: int) -> None:
+        """Shift the highlights of the data rows after inserted rows.
+
+        Rows appended at the end leave the highlights untouched.
+
+        Args:
+            row (int): Data row the rows are inserted before.
+            count (int): Number of inserted rows.
+        """
+        for col, expiry in self._expiry.items():
+            if row < expiry.size:
+                self._expiry[col] = np.insert(expiry, row, np.zeros(count))
+        self._batches = collections.deque(
+            (due, col, np.where(rows >= row, rows + count, rows))
+            for due, col, rows in self._batches)
+
+    def remove_rows(self, rows: np.ndarray) -> None:
+        """Drop the highlights of removed data rows, shifting the following rows.
+
+        Args:
+            rows (ndarray): Sorted data rows.
+        """
+        for col, expiry in self._expiry.items():
+            self._expiry[col] = np.delete(expiry, rows[rows < expiry.size])
+        batches: Deque[Tuple[float, int, np.ndarray]] = collections.deque()
+        for due, col, batch_rows in self._batches:
+            kept = batch_rows[~np.isin(batch_rows, rows)]
+            batches.append((due, col, kept - np.searchsorted(rows, kept)))
+        self._batches = batches
+
+    def clear(self) -> None:
+        """Drop all highlights, without signalling."""
+        self._expiry.clear()
+        self._batches.clear()
+        self._timer.stop()
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        rows, cols = [], []
+        while self._batches and self._batches[0][0] <= now:
+            _, col, batch_rows = self._batches.popleft()
+            expiry = self._expiry.get(col)
+            if expiry is None:
+                continue
+            done = batch_rows[(expiry[batch_rows] > 0) & (expiry[batch_rows] <= now)]
+            expiry[done] = 0
+            rows.append(done)
+            cols.append(np.full(done.size, col, dtype=np.intp))
+        if self._batches:
+            self._timer.start(max(0, int((self._batches[0][0] - now) * 1000) + 1))
+        if rows:
+            self.expired.emit(np.concatenate(rows), np.concatenate(cols))
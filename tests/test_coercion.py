@@ -0,0 +1,42 @@
+"""Test for the coercion functions."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from qspreadsheet import coercion
+
+
+@pytest.mark.parametrize('values, dtype, expected', [
+    (['1', 2, ' 3 '], 'int64', [1, 2, 3]),
+    (['1.5', '', None], 'float64', [1.5, np.nan, np.nan]),
+    (['True', 'no', 1], 'bool', [True, False, True]),
+    (['4', ''], 'Int64', [4, pd.NA]),
+    (['2021-01-02', ''], 'datetime64[ns]',
+     [np.datetime64('2021-01-02'), np.datetime64('NaT')]),
+    (['2021-01-02 10:00'], pd.DatetimeTZDtype(tz='UTC'),
+     [pd.Timestamp('2021-01-02 10:00', tz='UTC')]),
+    (['b', None], pd.CategoricalDtype(['a', 'b']), ['b', np.nan]),
+    ([1, None], 'string', ['1', pd.NA]),
+    (np.array([1.0, 2.0]), 'int32', [1, 2]),
+])
+def test_coerce_values(values, dtype, expected):
+    """Values are converted to the column dtype."""
+    result = coercion.coerce_values(values, dtype)
+    assert result.dtype == pd.api.types.pandas_dtype(dtype)
+    assert pd.Series(result).equals(pd.Series(expected, dtype=result.dtype))
+
+
+@pytest.mark.parametrize('value, dtype', [
+    ('1.5', 'int64'),
+    ('', 'int64'),
+    ('abc', 'float64'),
+    ('maybe', 'bool'),
+    (1.5, 'Int64'),
+    ('c', pd.CategoricalDtype(['a', 'b'])),
+    (1e20, 'int64'),
+])
+def test_coerce_value_rejects(value, dtype):
+    """Values the column cannot hold exactly are rejected."""
+    with pytest.raises((ValueError, TypeError)):
+        coercion.coerce_value(value, dtype)
@@ -0,0 +1,121 @@
+"""Test for the conditional formats."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from qspreadsheet import qt
+from qspreadsheet import conditional_format as cf
+from qspreadsheet import table_model as tm
+
+
+@pytest.fixture
+def data():
+    """DataFrame with numbers and text."""
+    return pd.DataFrame({
+        'number': [3.0, -1.0, np.nan, 7.0, -5.0],
+        'text': ['a', 'b', 'a', 'c', None],
+    })
+
+
+def test_rules_codes(data):
+    """Rules produce one colour code per value."""
+    numbers = data['number'].to_numpy()
+    assert cf.Negative().codes(numbers).tolist() == [-1, 0, -1, -1, 0]
+    assert cf.ColorScale(steps=13).codes(numbers).tolist() == [8, 4, -1, 12, 0]
+    assert cf.TopN(2).codes(numbers).tolist() == [0, -1, -1, 0, -1]
+    assert cf.TopN(1, largest=False).codes(numbers).tolist() == [-1, -1, -1, -1, 0]
+    assert cf.Duplicates().codes(data['text'].to_numpy()).tolist() == [0, -1, 0, -1, -1]
+    condition = cf.Condition(lambda series: series.isin(['b', 'c']), 'blue')
+    assert condition.codes(data['text'].to_numpy()).tolist() == [-1, 0, -1, 0, -1]
+
+
+def test_color_scale_colors():
+    """The scale runs from the low to the high colour."""
+    colors = cf.ColorScale('black', 'white', steps=3).colors()
+    assert [color.red() for color in colors] == [0, 128, 255]
+
+
+def test_first_matching_rule_wins(data):
+    """Rules of a role combine into one code array and palette."""
+    engine = cf.FormatEngine(lambda col: data.iloc[:, col].to_numpy(),
+                             lambda col, rows: data.iloc[:, col].to_numpy()[rows])
+    engine.set_rules(0, [cf.TopN(1, 'green'), cf.ColorScale('white', 'red', steps=2),
+                         cf.Negative('red')])
+    background = int(qt.Qt.BackgroundRole)
+    assert engine.color(3, 0, background) == qt.QColor('green')
+    assert engine.color(4, 0, background) == qt.QColor('white')
+    assert engine.color(0, 0, background) == qt.QColor('red')
+    assert engine.color(2, 0, background) is None
+    assert engine.color(4, 0, int(qt.Qt.ForegroundRole)) == qt.QColor('red')
+    assert engine.color(0, 1, background) is None
+
+
+def test_model_colors_follow_data_rows(qtbot, data):
+    """Colours are looked up by data row, whatever the sort order."""
+    model = tm.TableModel(data)
+    model.set_format_rules(0, [cf.Negative()])
+    assert model.data(model.index(1, 0), qt.Qt.ForegroundRole) == qt.QColor('red')
+    model.sort(0)
+    assert model.data(model.index(0, 0), qt.Qt.ForegroundRole) == qt.QColor('red')
+    assert model.data(model.index(2, 0), qt.Qt.ForegroundRole) is None
+    assert model.display_data(0, 0) == ('-5.0', qt.QColor('red'), None)
+
+
+def test_edit_evaluates_edited_rows_only(qtbot, data, monkeypatch):
+    """Per-value rules evaluate the edited values, column-wide rules the column."""
+    model = tm.TableModel(data)
+    rule = cf.Negative()
+    model.set_format_rules(0, [rule])
+    model.data(model.index(0, 0), qt.Qt.ForegroundRole)
+    sizes = []
+    codes = rule.codes
+    monkeypatch.setattr(rule, 'codes', lambda values: sizes.append(len(values)) or codes(values))
+    model.setData(model.index(0, 0), -2)
+    assert model.data(model.index(0, 0), qt.Qt.ForegroundRole) == qt.QColor('red')
+    assert sizes == [1]
+
+    model.set_format_rules(0, [cf.TopN(1)])
+    with qtbot.waitSignal(model.dataChanged) as blocker:
+        model.setData(model.index(1, 0), 10)
+    assert model.data(model.index(1, 0), qt.Qt.BackgroundRole) == qt.QColor('yellow')
+    assert model.data(model.index(3, 0), qt.Qt.BackgroundRole) is None
+    assert blocker.args[1].row() == 4
+
+
+def test_colors_survive_inserts_and_removes(qtbot, data):
+    """Inserted rows are evaluated, removed rows dropped from the codes."""
+    model = tm.TableModel(data)
+    model.set_format_rules(0, [cf.Negative()])
+    model.data(model.index(0, 0), qt.Qt.ForegroundRole)
+    model.insert_rows(0, pd.DataFrame({'number': [-9.0], 'text': ['z']}))
+    assert model.data(model.index(0, 0), qt.Qt.ForegroundRole) == qt.QColor('red')
+    assert model.data(model.index(2, 0), qt.Qt.ForegroundRole) == qt.QColor('red')
+    model.removeRows(0, 2)
+    assert model.data(model.index(0, 0), qt.Qt.ForegroundRole) == qt.QColor('red')
+    assert model.data(model.index(2, 0), qt.Qt.ForegroundRole) is None
+
+
+def test_numeric_rules_check_dtype(qtbot, data):
+    """Rules needing numbers are rejected on other columns, and dropped once a column widens."""
+    model = tm.TableModel(data)
+    with pytest.raises(TypeError):
+        model.set_format_rules(1, [cf.TopN(1)])
+    with pytest.raises(TypeError):
+        model.set_format_rules(1, [cf.ColorScale()])
+    assert model.format_rules == {}
+    model.set_format_rules(0, [cf.TopN(1), cf.Negative()])
+    model.row_store._columns[0] = data['text'].to_numpy()
+    model.refresh_column(0)
+    assert [type(rule) for rule in model.format_rules[0]] == [cf.Negative]
+
+
+def test_edit_updates_codes_in_place(qtbot, data):
+    """An edit writes the codes of the edited rows, without copying the code array."""
+    model = tm.TableModel(data)
+    model.set_format_rules(0, [cf.Negative()])
+    model.data(model.index(0, 0), qt.Qt.ForegroundRole)
+    codes = model._format_engine._codes[(0, int(qt.Qt.ForegroundRole))][0]
+    model.setData(model.index(0, 0), -2)
+    assert model._format_engine._codes[(0, int(qt.Qt.ForegroundRole))][0] is codes
+    assert model.data(model.index(0, 0), qt.Qt.ForegroundRole) == qt.QColor('red')
@@ -0,0 +1,105 @@
+"""Test for the tabular data sources behind the table model."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from qspreadsheet import qt
+from qspreadsheet import table_model as tm
+from qspreadsheet import table_widget as tw
+from qspreadsheet.data_source import NumpySource, PandasSource, SourceStore, as_source
+from qspreadsheet.filters import Contains, IsNull, Range
+
+
+@pytest.fixture
+def records():
+    """Structured array of a float, an int and a text field."""
+    array = np.zeros(6, dtype=[('price', float), ('size', int), ('side', 'U4')])
+    array['price'] = [3.5, np.nan, 1.0, 2.5, 0.5, 4.0]
+    array['size'] = [10, 20, 30, 40, 50, 60]
+    array['side'] = ['buy', 'sell', 'buy', 'sell', 'buy', 'sell']
+    return array
+
+
+class ReversedSource(NumpySource):
+    """Source sorting rows by reversing them, recording the pushed down sorts."""
+
+    def __init__(self, array):
+        """Create ReversedSource object."""
+        super().__init__(array)
+        self.sorts = []
+
+    def argsort(self, columns, ascending):
+        self.sorts.append((list(columns), list(ascending)))
+        return np.arange(self.row_count)[::-1]
+
+
+def test_structured_array(qtbot, records):
+    """Fields are read as views, sorted and filtered by the model."""
+    model = tm.TableModel(records)
+    store = model.row_store
+    assert isinstance(store, SourceStore)
+    assert store.source.shape == (6, 3)
+    assert store.source.dtypes == [np.dtype(float), np.dtype(int), np.dtype('U4')]
+    assert np.shares_memory(store.slice(1, 0, 3), records)
+    assert model.data(model.index(5, 2)) == 'sell'
+    model.sort_by([2, 0], [True, False])
+    assert [model.data(model.index(row, 1)) for row in range(6)] == \
+        ['10', '30', '50', '60', '40', '20']
+    model.set_filter(0, Range(1.0, 3.5))
+    assert model.rowCount(qt.QModelIndex()) == 3
+
+
+def test_pushdown_until_modified(qtbot, records):
+    """Sorts go to the source until the rows or the sorted column change."""
+    source = ReversedSource(records)
+    model = tm.TableModel(source)
+    model.sort_by([1], False)
+    assert source.sorts == [([1], [False])]
+    assert model.data(model.index(0, 1)) == '60'
+    model.setData(model.index(0, 0), 9.0)
+    model.sort_by([1])
+    assert len(source.sorts) == 2
+    model.sort_by([0])
+    assert len(source.sorts) == 2
+    assert model.data(model.index(5, 0)) == 'nan'
+    assert records['price'][5] == 4.0
+    model.sort_by([])
+    model.insert_rows(0, pd.DataFrame({'price': [0.0], 'size': [0], 'side': ['buy']}))
+    model.sort_by([1])
+    assert len(source.sorts) == 2
+    assert model.dataframe()['size'].tolist() == [0, 10, 20, 30, 40, 50, 60]
+
+
+def test_pandas_source(qtbot):
+    """A pandas source keeps the index, and edits leave the frame unchanged."""
+    frame = pd.DataFrame({'a': [3, 1, 2]}, index=['x', 'y', 'z'])
+    widget = tw.TableWidget(PandasSource(frame))
+    qtbot.addWidget(widget)
+    model = widget.table_view.model()
+    assert widget.row_header.index_model.label(2, 0) == 'z'
+    model.setData(model.index(0, 0), 5)
+    assert frame['a'].tolist() == [3, 1, 2]
+    assert model.dataframe()['a'].tolist() == [5, 1, 2]
+    with pytest.raises(TypeError):
+        as_source([1, 2])
+    with pytest.raises(ValueError):
+        NumpySource(np.arange(3))
+
+
+def test_polars_source(qtbot):
+    """Polars columns keep pandas dtypes, and sorts and filters are pushed down."""
+    pl = pytest.importorskip('polars')
+    frame = pl.DataFrame({'count': [3, None, 1, 2], 'price': [1.5, float('nan'), None, 0.5],
+                          'name': ['Bb', 'a', None, 'cb']})
+    store = SourceStore(as_source(frame))
+    assert store.dtype(0) == np.dtype(float)
+    assert store.slice(2, 1, 3).tolist() == ['a', None]
+    assert store.take(0, np.array([3, 0])).tolist() == [2.0, 3.0]
+    assert store.argsort([0], False).tolist() == [0, 3, 2, 1]
+    assert store.argsort([1]).tolist() == [3, 0, 1, 2]
+    assert store.filter_mask(2, Contains('B')).tolist() == [True, False, False, True]
+    assert store.filter_mask(1, IsNull()).tolist() == [False, True, True, False]
+    model = tm.TableModel(frame)
+    model.set_filter(0, Range(2))
+    assert model.rowCount(qt.QModelIndex()) == 2
@@ -0,0 +1,93 @@
+"""Test for the cell delegates."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from qspreadsheet import qt
+from qspreadsheet import delegates as dg
+from qspreadsheet import table_model as tm
+from qspreadsheet import table_view as tv
+
+
+@pytest.fixture
+def data():
+    """DataFrame with one column per delegate."""
+    return pd.DataFrame({
+        'int': [1, 2],
+        'float': [0.5, np.nan],
+        'bool': [True, False],
+        'date': pd.to_datetime(['2021-01-01', '2021-01-02']),
+        'category': pd.Categorical(['x', 'y']),
+        'text': ['a', 'b'],
+    })
+
+
+def test_delegate_class(data):
+    """Delegates are chosen by the column dtype."""
+    classes = [dg.delegate_class(dtype) for dtype in data.dtypes]
+    assert classes == [dg.NumericDelegate, dg.NumericDelegate, dg.BoolDelegate,
+                       dg.DatetimeDelegate, dg.CategoryDelegate, dg.CellDelegate]
+    assert dg.delegate_class(pd.BooleanDtype()) is dg.BoolDelegate
+    assert dg.delegate_class(pd.PeriodDtype('M')) is dg.DatetimeDelegate
+
+
+def test_text_metrics_cache(qtbot):
+    """Widths and elided strings are computed once per text."""
+    metrics = dg.TextMetrics(qt.QApplication.font(), cache_size=2)
+    width = metrics.advance('some text')
+    assert metrics.elide('some text', width) == 'some text'
+    elided = metrics.elide('some text', width // 2)
+    assert elided != 'some text' and metrics.advance(elided) <= width // 2
+    assert metrics.elide('some text', width // 2) is elided
+    metrics.advance('other')
+    metrics.advance('third')
+    assert len(metrics._advances) <= 2
+
+
+def test_bool_glyphs():
+    """Booleans are painted as checkbox glyphs, missing values blank."""
+    delegate = dg.BoolDelegate()
+    assert delegate.display_text('True') == dg.CHECKED_GLYPH
+    assert delegate.display_text('False') == dg.UNCHECKED_GLYPH
+    assert delegate.display_text('<NA>') == ''
+
+
+def test_view_sets_shared_delegates(qtbot, data):
+    """Columns of the same dtype class share a delegate, replaced on reset."""
+    view = tv.TableView()
+    qtbot.addWidget(view)
+    model = tm.TableModel(data, view)
+    view.setModel(model)
+    assert view.itemDelegateForColumn(0) is view.itemDelegateForColumn(1)
+    assert isinstance(view.itemDelegateForColumn(4), dg.CategoryDelegate)
+    model.reset_data(data[['text']])
+    assert isinstance(view.itemDelegateForColumn(0), dg.CellDelegate)
+    assert view.itemDelegateForColumn(1) is None
+
+
+def test_sort_keeps_delegates(qtbot, data):
+    """Sorting and filtering reset the model without rebuilding the delegates."""
+    view = tv.TableView()
+    qtbot.addWidget(view)
+    model = tm.TableModel(data, view)
+    view.setModel(model)
+    delegate = view.itemDelegateForColumn(0)
+    model.sort(0, qt.Qt.DescendingOrder)
+    assert view.itemDelegateForColumn(0) is delegate
+    model.column_dtype_changed.emit(0)
+    assert view.itemDelegateForColumn(0) is not delegate
+
+
+def test_size_hint_is_one_lookup(qtbot, data, monkeypatch):
+    """The size hint reads the cell once through `display_data`, not per role."""
+    model = tm.TableModel(data)
+    calls = []
+    monkeypatch.setattr(model, 'data', lambda *args: calls.append(args))
+    delegate = dg.NumericDelegate()
+    option = qt.QStyleOptionViewItem()
+    option.font = qt.QApplication.font()
+    hint = delegate.sizeHint(option, model.index(0, 1))
+    assert model.display_data(0, 1) == ('0.5', None, None)
+    assert hint.width() == delegate.text_metrics(option.font).advance('0.5') + 2 * dg.TEXT_MARGIN
+    assert not calls
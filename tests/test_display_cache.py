@@ -0,0 +1,74 @@
+"""Test for the DisplayCache object."""
+
+import numpy as np
+import pandas as pd
+
+from qspreadsheet import display_cache as dc
+
+
+def make_cache(values, **kwargs):
+    """DisplayCache over a single column, recording loaded blocks."""
+    loads = []
+
+    def loader(col, start, stop):
+        loads.append((col, start, stop))
+        return values[start:stop]
+
+    cache = dc.DisplayCache(loader, lambda: len(values), **kwargs)
+    return cache, loads
+
+
+def test_format_block_matches_str():
+    """Vectorized formatting matches `str` of the scalars."""
+    floats = np.array([0.1, 1 / 3, 1e20, np.nan, -0.0])
+    assert dc.format_block(floats) == [str(v) for v in floats]
+    dates = pd.array(pd.to_datetime(['2021-01-01', None]))
+    assert dc.format_block(dates) == [str(v) for v in dates]
+
+
+def test_value_loads_whole_block():
+    """A miss formats the whole block; following hits do not reload."""
+    cache, loads = make_cache(np.arange(10), block_size=4)
+    assert cache.value(5, 0) == '5'
+    assert cache.value(7, 0) == '7'
+    assert loads == [(0, 4, 8)]
+    assert cache.value(9, 0) == '9'
+    assert loads[-1] == (0, 8, 10)
+
+
+def test_invalidate_drops_only_cell_block():
+    """Invalidating a cell reloads only the block holding it."""
+    values = np.arange(10)
+    cache, loads = make_cache(values, block_size=4)
+    cache.value(0, 0)
+    cache.value(4, 0)
+    values[5] = 50
+    cache.invalidate(5, 0)
+    assert len(cache) == 1
+    assert cache.value(5, 0) == '50'
+    assert cache.value(0, 0) == '0'
+    assert loads == [(0, 0, 4), (0, 4, 8), (0, 4, 8)]
+
+
+def test_memory_budget_evicts_least_recently_used():
+    """Blocks over the memory budget are evicted oldest first."""
+    cache, loads = make_cache(np.arange(100), block_size=10)
+    cache.memory_budget = dc.block_nbytes(dc.format_block(np.arange(10, 20))) * 2
+    cache.value(10, 0)
+    cache.value(20, 0)
+    cache.value(10, 0)
+    cache.value(30, 0)
+    assert len(cache) == 2
+    assert cache.nbytes <= cache.memory_budget
+    cache.value(10, 0)
+    assert loads == [(0, 10, 20), (0, 20, 30), (0, 30, 40)]
+
+
+def test_format_task_copies_values():
+    """Tasks format the values as they were when created, on the calling thread."""
+    values = np.arange(3)
+    blocks = []
+    task = dc.FormatBlockTask(values, blocks.append)
+    values[0] = 9
+    task.run()
+    assert blocks == [['0', '1', '2']]
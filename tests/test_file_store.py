@@ -0,0 +1,135 @@
+"""Test for the paged row store over files."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from qspreadsheet import qt
+from qspreadsheet import table_model as tm
+from qspreadsheet import table_widget as tw
+from qspreadsheet.file_store import CsvSource, FileStore
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    """CSV file of 35 rows, with a missing count and text in the price column."""
+    frame = pd.DataFrame({'count': np.arange(35), 'price': np.arange(35) / 4,
+                          'name': [f'row{i}' for i in range(35)]})
+    frame['count'] = frame['count'].astype(object)
+    frame.loc[22, 'count'] = None
+    frame['price'] = frame['price'].astype(object)
+    frame.loc[31, 'price'] = 'n/a'
+    path = tmp_path / 'data.csv'
+    frame.to_csv(path, index=False)
+    return path
+
+
+def test_csv_pages(qtbot, csv_path):
+    """The first page shows at once, the other rows once indexed."""
+    store = FileStore.open(csv_path, page_rows=10, max_pages=2)
+    source = store.source
+    assert len(store) == 10
+    assert store.value(9, 2) == 'row9'
+    with qtbot.waitSignal(source.rows_indexed) as blocker:
+        pass
+    qtbot.waitUntil(lambda: source.indexed)
+    assert source.row_count == 35
+    assert source.page_starts.tolist() == [0, 10, 20, 30, 35]
+    store.insert_rows(len(store), source.row_count - len(store))
+    assert store.slice(2, 28, 32).tolist() == ['row28', 'row29', 'row30', 'row31']
+    assert store.dtype(0) == pd.Int64Dtype()
+    assert store.value(22, 0) is pd.NA
+    assert np.isnan(store.value(31, 1))
+    assert store.take(0, np.array([34, 3, 12])).tolist() == [34, 3, 12]
+    assert len(source.cached_pages) == 2
+    assert blocker.args[0] >= 20
+
+
+def test_csv_widget(qtbot, csv_path):
+    """A widget shows the file rows as they are indexed, read-only."""
+    widget = tw.TableWidget.from_file(csv_path, page_rows=10)
+    qtbot.addWidget(widget)
+    model = widget.table_view.model()
+    qtbot.waitUntil(lambda: model.rowCount(qt.QModelIndex()) == 35)
+    assert model.data(model.index(34, 2)) == 'row34'
+    assert widget.row_header.index_model.label(34, 0) == '34'
+    assert not model.editable
+    with pytest.raises(TypeError):
+        model.row_store.write(0, np.array([0]), 1)
+
+
+def test_file_store_is_read_only(qtbot, csv_path):
+    """Rows cannot be inserted with values or removed."""
+    store = FileStore(CsvSource(csv_path, page_rows=100))
+    model = tm.TableModel(store)
+    assert model.rowCount(qt.QModelIndex()) == 35
+    signals = []
+    model.rowsAboutToBeInserted.connect(lambda *args: signals.append('abi'))
+    model.rowsAboutToBeRemoved.connect(lambda *args: signals.append('abr'))
+    assert not model.editable
+    assert not model.insertRows(0, 1)
+    assert not model.removeRows(0, 1)
+    assert signals == []
+    with pytest.raises(TypeError):
+        model.insert_rows(35, model.dataframe().iloc[:1])
+    model.editable = True
+    with pytest.raises(TypeError):
+        model.fill(0, 0, 1, 0, 5)
+    assert len(model.undo_stack) == 0
+    with pytest.raises(TypeError):
+        store.insert_rows(0, 1)
+    with pytest.raises(TypeError):
+        store.remove_rows([0])
+
+
+def test_parquet_row_groups(qtbot, tmp_path):
+    """Parquet pages are the row groups."""
+    pytest.importorskip('pyarrow')
+    frame = pd.DataFrame({'count': np.arange(25), 'name': [f'row{i}' for i in range(25)]})
+    path = tmp_path / 'data.parquet'
+    frame.to_parquet(path, row_group_size=10)
+    store = FileStore.open(path, max_pages=1)
+    assert store.source.page_starts.tolist() == [0, 10, 20, 25]
+    assert store.slice(1, 8, 12).tolist() == ['row8', 'row9', 'row10', 'row11']
+    assert store.source.cached_pages == [1]
+
+
+def test_csv_blank_lines(qtbot, tmp_path):
+    """Blank lines are rows of missing values, in step with the indexed pages."""
+    path = tmp_path / 'blank.csv'
+    path.write_text('count,name\n0,a\n\n2,c\n3,d\n\n5,f\n6,g\n')
+    store = FileStore.open(path, page_rows=2, max_pages=1)
+    source = store.source
+    source.max_pages = 1
+    source._pages.clear()  # Page 0 evicted before the file is indexed
+    assert store.value(0, 1) == 'a'
+    qtbot.waitUntil(lambda: source.indexed)
+    assert source.page_starts.tolist() == [0, 2, 4, 6, 7]
+    store.insert_rows(len(store), source.row_count - len(store))
+    names = store.slice(1, 0, 7)
+    assert pd.isna(names).tolist() == [False, True, False, False, True, False, False]
+    assert names[[0, 2, 3, 5, 6]].tolist() == ['a', 'c', 'd', 'f', 'g']
+    counts = store.take(0, np.array([6, 4, 1]))
+    assert counts[0] == 6 and pd.isna(counts[1:]).all()
+
+
+def test_csv_widens_dtypes(qtbot, tmp_path):
+    """Values of later pages not fitting the inferred dtypes widen them, nothing is lost."""
+    path = tmp_path / 'mixed.csv'
+    path.write_text('count,flag,size\n' + ''.join(f'{i},True,{i}\n' for i in range(6))
+                    + '6.5,True,6\n7,maybe,big\n')
+    source = CsvSource(path, page_rows=3)
+    store = FileStore(source)
+    model = tm.TableModel(store)
+    source.dtype_changed.connect(model.refresh_column)
+    qtbot.waitUntil(lambda: source.indexed)
+    model.extend_rows(source.row_count - len(store))
+    assert store.dtype(0) == pd.Int64Dtype()
+    assert store.value(1, 0) == 1
+    with qtbot.waitSignal(model.column_dtype_changed):
+        assert store.take(0, np.array([7, 6, 1])).tolist() == [7.0, 6.5, 1.0]
+    assert store.dtype(0) == np.dtype(float)
+    assert model.data(model.index(1, 0)) == '1.0'
+    assert store.value(7, 1) == 'maybe' and store.value(0, 1) is True
+    assert store.dtype(1) == np.dtype(object)
+    assert [model.data(model.index(row, 2)) for row in range(5, 8)] == ['5', '6', 'big']
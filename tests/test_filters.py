@@ -0,0 +1,100 @@
+"""Test for the column filters."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from qspreadsheet import filters
+
+
+@pytest.mark.parametrize('column_filter, values, expected', [
+    (filters.Equals(2), np.array([1, 2, 2]), [False, True, True]),
+    (filters.Range(1, 2), np.array([0.5, 1.0, 2.0, np.nan]), [False, True, True, False]),
+    (filters.Range(1, 2, inclusive=False), np.array([1, 1.5, 2]), [False, True, False]),
+    (filters.Range(upper=pd.Timestamp('2021-02-01')),
+     pd.array(pd.to_datetime(['2021-01-01', None, '2021-03-01'])), [True, False, False]),
+    (filters.Contains('AB'), np.array(['xab', None, 'b'], dtype=object), [True, False, False]),
+    (filters.Contains('2', case=True), np.array([12, 3, 20]), [True, False, True]),
+    (filters.Contains('^a.c$', regex=True), np.array(['abc', 'abcd'], dtype=object),
+     [True, False]),
+    (filters.IsIn(['x', 'z']), pd.Categorical(['x', 'y', 'z']), [True, False, True]),
+    (filters.IsNull(), pd.array([1, None], dtype='Int64'), [False, True]),
+    (filters.NotNull(), np.array([1.0, np.nan]), [True, False]),
+])
+def test_filter_mask(column_filter, values, expected):
+    """Filters evaluate to boolean masks, missing values not passing."""
+    mask = column_filter.mask(values)
+    assert mask.dtype == bool
+    assert mask.tolist() == expected
+
+
+def test_engine_combines_column_masks():
+    """The engine combines the masks of all filtered columns."""
+    columns = [np.arange(6), np.array(list('aabbcc'), dtype=object)]
+    engine = filters.FilterEngine(lambda col: columns[col])
+    assert engine.mask() is None
+    engine.set_filter(0, filters.Range(lower=1))
+    engine.set_filter(1, filters.IsIn(['a', 'c']))
+    assert np.flatnonzero(engine.mask()).tolist() == [1, 4, 5]
+    engine.set_filter(0, None)
+    assert np.flatnonzero(engine.mask()).tolist() == [0, 1, 4, 5]
+
+
+@pytest.mark.parametrize('new, previous, expected', [
+    (filters.Contains('ab'), filters.Contains('a'), True),
+    (filters.Contains('a'), filters.Contains('ab'), False),
+    (filters.Contains('xAb'), filters.Contains('aB'), True),
+    (filters.Contains('ab', case=True), filters.Contains('a'), False),
+    (filters.Contains('a.', regex=True), filters.Contains('a'), False),
+    (filters.Range(2, 5), filters.Range(1, 5), True),
+    (filters.Range(2), filters.Range(1, 5), False),
+    (filters.Range(1, 5, inclusive=False), filters.Range(1, 5), True),
+    (filters.Range(1, 5), filters.Range(1, 5, inclusive=False), False),
+    (filters.Range('b'), filters.Range(1), False),
+    (filters.IsIn([1]), filters.IsIn([1, 2]), True),
+    (filters.IsIn([1, 3]), filters.IsIn([1, 2]), False),
+    (filters.Equals(1), filters.Equals(1), True),
+    (filters.Equals(1), filters.Equals(2), False),
+    (filters.IsNull(), filters.NotNull(), False),
+])
+def test_narrows(new, previous, expected):
+    """Narrowing changes are detected."""
+    assert new.narrows(previous) is expected
+
+
+class RecordingContains(filters.Contains):
+    """Contains filter recording the number of values it is evaluated over."""
+
+    evaluated = []
+
+    def mask(self, values):
+        self.evaluated.append(len(values))
+        return super().mask(values)
+
+
+def test_engine_refines_passing_rows():
+    """Narrowing evaluates only the passing rows; widening evaluates in full."""
+    values = np.array(['a', 'ab', 'abc', 'b', 'abd'], dtype=object)
+    evaluated = RecordingContains.evaluated
+    engine = filters.FilterEngine(lambda col: values)
+    engine.set_filter(0, RecordingContains('a'))
+    engine.set_filter(0, RecordingContains('ab'))
+    engine.set_filter(0, RecordingContains('abc'))
+    assert evaluated == [5, 4, 3]
+    assert np.flatnonzero(engine.mask()).tolist() == [2]
+    engine.set_filter(0, RecordingContains('b'))
+    assert evaluated[-1] == 5
+    assert np.flatnonzero(engine.mask()).tolist() == [1, 2, 3, 4]
+
+
+def test_engine_widening_evaluates_partial_masks():
+    """A column refined over the passing rows is evaluated in full when widening."""
+    columns = [np.arange(6), np.array(list('aabbcc'), dtype=object)]
+    engine = filters.FilterEngine(lambda col: columns[col])
+    engine.set_filter(0, filters.Range(lower=2))
+    engine.set_filter(1, filters.IsIn(['b', 'c']))
+    assert np.flatnonzero(engine.mask()).tolist() == [2, 3, 4, 5]
+    engine.set_filter(0, None)
+    assert np.flatnonzero(engine.mask()).tolist() == [2, 3, 4, 5]
+    engine.set_filter(1, filters.IsIn(['a']))
+    assert np.flatnonzero(engine.mask()).tolist() == [0, 1]
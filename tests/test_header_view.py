@@ -0,0 +1,71 @@
+"""Test for the painted index headers."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from qspreadsheet import qt
+from qspreadsheet import header_view as hv
+from qspreadsheet import index_model as im
+from qspreadsheet import table_model as tm
+from qspreadsheet import table_view as tv
+
+
+@pytest.fixture
+def pivoted():
+    """DataFrame with a 2-level MultiIndex on rows and columns."""
+    rows = pd.MultiIndex.from_product([['a', 'b'], ['long label', 'y']])
+    columns = pd.MultiIndex.from_product([['p', 'q'], ['s', 't']])
+    return pd.DataFrame(np.arange(16).reshape(4, 4), index=rows, columns=columns)
+
+
+@pytest.fixture
+def table(qtbot, pivoted):
+    """TableView with painted row and column headers."""
+    view = tv.TableView()
+    qtbot.addWidget(view)
+    model = tm.TableModel(pivoted, view)
+    view.setModel(model)
+    rows = im.RowIndexModel(pivoted.index, view, row_mapping=model.row_mapping,
+                            row_store=model.row_store)
+    view.setVerticalHeader(hv.IndexHeaderView(qt.Qt.Vertical, rows, view))
+    columns = im.ColumnIndexModel(pivoted.columns, view)
+    view.setHorizontalHeader(hv.IndexHeaderView(qt.Qt.Horizontal, columns, view))
+    return view
+
+
+def test_sample_sections():
+    """Only the sections at both ends are measured."""
+    assert hv.sample_sections(5).tolist() == [0, 1, 2, 3, 4]
+    assert hv.sample_sections(1_000_000, sample=2).tolist() == [0, 1, 999_998, 999_999]
+
+
+def test_headers_follow_the_table(table):
+    """Sections are the rows and columns of the table, labels come from the index."""
+    rows, columns = table.verticalHeader(), table.horizontalHeader()
+    assert rows.count() == 4 and columns.count() == 4
+    assert rows.index_model.label(1, 1) == 'y'
+    table.model().sort(0, qt.Qt.DescendingOrder)
+    assert rows.index_model.label(0, 0) == 'b'
+    assert table.columnWidth(2) == columns.sectionSize(2)
+
+
+def test_level_extents(table):
+    """Column levels stack one line each, row levels fit their widest label."""
+    rows, columns = table.verticalHeader(), table.horizontalHeader()
+    assert len(set(columns.level_extents())) == 1
+    assert columns.sizeHint().height() == sum(columns.level_extents())
+    outer, inner = rows.level_extents()
+    assert inner > outer
+    assert rows.sizeHint().width() == outer + inner
+
+
+def test_levels_measured_again_on_rows_change(table):
+    """Inserted rows with wider labels widen the row header."""
+    rows = table.verticalHeader()
+    width = rows.sizeHint().width()
+    values = pd.DataFrame([[0] * 4], columns=table.model().dataframe().columns,
+                          index=pd.MultiIndex.from_tuples([('c', 'a much longer label')]))
+    table.model().insert_rows(4, values)
+    assert rows.count() == 5
+    assert rows.sizeHint().width() > width
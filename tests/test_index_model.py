@@ -0,0 +1,100 @@
+"""Test for the index models."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from qspreadsheet import qt
+from qspreadsheet import index_model as im
+from qspreadsheet import table_model as tm
+
+
+@pytest.fixture
+def pivoted():
+    """DataFrame with a 3-level MultiIndex on rows and 2 levels on columns."""
+    rows = pd.MultiIndex.from_product([['a', 'b'], ['x', 'y'], [1, 2]],
+                                      names=['l0', 'l1', 'l2'])
+    columns = pd.MultiIndex.from_product([['p', 'q'], ['s', 't']])
+    return pd.DataFrame(np.arange(32).reshape(8, 4), index=rows, columns=columns)
+
+
+def test_row_index_levels(qtbot, pivoted):
+    """One column per level, labels follow the view order."""
+    model = tm.TableModel(pivoted)
+    index_model = im.RowIndexModel(pivoted.index, row_mapping=model.row_mapping,
+                                   row_store=model.row_store)
+    assert index_model.columnCount(qt.QModelIndex()) == 3
+    assert index_model.data(index_model.index(5, 1)) == 'x'
+    model.sort(0, qt.Qt.DescendingOrder)
+    assert index_model.data(index_model.index(0, 0)) == 'b'
+    model.removeRows(0, 3)
+    assert index_model.data(index_model.index(0, 2)) == '1'
+
+
+def test_column_index_levels(qtbot, pivoted):
+    """One row per level."""
+    model = im.ColumnIndexModel(pivoted.columns)
+    assert model.rowCount(qt.QModelIndex()) == 2
+    assert model.data(model.index(0, 2)) == 'q'
+    assert model.data(model.index(1, 3)) == 't'
+
+
+def test_labels_are_cached_by_data_row(qtbot):
+    """Labels are formatted per block, and survive sorting."""
+    data = pd.DataFrame({'a': [3, 1, 2]}, index=pd.period_range('2021-01', periods=3, freq='M'))
+    model = tm.TableModel(data)
+    index_model = im.RowIndexModel(data.index, row_mapping=model.row_mapping,
+                                   row_store=model.row_store)
+    assert index_model.data(index_model.index(0, 0)) == '2021-01'
+    assert len(index_model.label_cache) == 1
+    model.sort(0)
+    assert index_model.data(index_model.index(0, 0)) == '2021-02'
+    assert len(index_model.label_cache) == 1
+
+
+def test_labels_invalidate_on_index_change(qtbot):
+    """Inserted rows and a new index drop the cached labels."""
+    data = pd.DataFrame({'a': [1, 2]})
+    model = tm.TableModel(data)
+    index_model = im.RowIndexModel(data.index, row_mapping=model.row_mapping,
+                                   row_store=model.row_store)
+    assert index_model.data(index_model.index(1, 0)) == '1'
+    model.insertRows(0, 1)
+    assert index_model.data(index_model.index(2, 0)) == '2'
+    columns = im.ColumnIndexModel(data.columns)
+    with qtbot.waitSignal(columns.modelReset):
+        columns.set_index(pd.Index(['b', 'c']))
+    assert columns.data(columns.index(0, 1)) == 'c'
+
+
+def test_appends_keep_cached_labels(qtbot):
+    """Appended rows keep the labels cached before them, inserted rows drop those after."""
+    data = pd.DataFrame({'a': np.arange(600)})
+    model = tm.TableModel(data)
+    index_model = im.RowIndexModel(data.index, row_mapping=model.row_mapping,
+                                   row_store=model.row_store)
+    index_model.label(0, 0)
+    index_model.label(599, 0)
+    model.insertRows(600, 2)
+    assert index_model.label(601, 0) == '601'
+    assert index_model.label_cache.get(0, 0) == '0'
+    model.insertRows(300, 1)
+    assert index_model.label(0, 0) == '0'
+    assert index_model.label_cache.get(599, 0) is None
+    assert index_model.label_cache.get(0, 0) == '0'
+
+
+def test_multi_index_appends_do_not_rebuild(qtbot, pivoted, monkeypatch):
+    """Rows appended through a virtual row read their labels without rebuilding the index."""
+    model = tm.TableModel(pivoted)
+    index_model = im.RowIndexModel(pivoted.index, row_mapping=model.row_mapping,
+                                   row_store=model.row_store)
+    model.virtual_rows = 1
+    rebuilds = []
+    index = model.row_store.index
+    monkeypatch.setattr(model.row_store, 'index', lambda: rebuilds.append(1) or index())
+    for value in range(3):
+        model.setData(model.index(model.row_mapping.size, 0), value)
+        assert index_model.label(model.row_mapping.size - 1, 0) == 'None'
+    assert index_model.label(7, 1) == 'y'
+    assert rebuilds == []
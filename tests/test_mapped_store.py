@@ -0,0 +1,85 @@
+"""Test for the row store over memory-mapped columns."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from qspreadsheet import qt
+from qspreadsheet import table_model as tm
+from qspreadsheet import table_widget as tw
+from qspreadsheet.mapped_store import MappedStore
+
+
+@pytest.fixture
+def npy_files(tmp_path):
+    """Paths of `.npy` files of a float and an int column."""
+    paths = {'price': tmp_path / 'price.npy', 'size': tmp_path / 'size.npy'}
+    np.save(paths['price'], np.arange(1000) / 2)
+    np.save(paths['size'], np.arange(1000))
+    return paths
+
+
+def test_memmaps_are_read_in_place(qtbot, npy_files):
+    """Shown rows are read from the mapped files, without loading the columns."""
+    store = MappedStore.from_memmaps(npy_files)
+    model = tm.TableModel(store)
+    assert model.rowCount(qt.QModelIndex()) == 1000
+    assert list(store.columns) == ['price', 'size']
+    assert model.data(model.index(999, 0)) == '499.5'
+    assert all(isinstance(store.slice(col, 0, 2), np.memmap) for col in range(2))
+    model.sort(1, qt.Qt.DescendingOrder)
+    assert model.data(model.index(0, 1)) == '999'
+
+
+def test_writes_and_inserts_keep_columns_mapped(qtbot, npy_files):
+    """Edits and inserted rows are held apart, the mapped columns are not copied."""
+    store = MappedStore.from_memmaps(npy_files)
+    model = tm.TableModel(store)
+    model.setData(model.index(0, 1), 7)
+    model.set_values(500, 0, [[0.25, 3], [0.75, 5]])
+    assert store._columns[1].edited_rows.tolist() == [0, 500, 501]
+    assert isinstance(store.slice(1, 2, 4), np.memmap)
+    assert store.slice(1, 0, 3).tolist() == [7, 1, 2]
+    assert store.take(0, np.array([501, 500, 2])).tolist() == [0.75, 0.25, 1.0]
+    assert np.load(npy_files['size'])[0] == 0
+    model.insert_rows(0, pd.DataFrame({'price': [1.5], 'size': [2]}))
+    model.insert_rows(1001, pd.DataFrame({'price': [9.5], 'size': [9]}))
+    assert model.dataframe()['size'].tolist()[:3] == [2, 7, 1]
+    assert store.take(1, np.array([1001, 0, 1])).tolist() == [9, 2, 7]
+    assert len(store._columns[1]) < 1100
+    model.removeRows(0, 2)
+    model.sort(1, qt.Qt.DescendingOrder)
+    assert model.data(model.index(0, 1)) == '999'
+    assert model.undo() and model.undo()
+    assert model.dataframe()['size'].tolist()[:3] == [2, 7, 1]
+    assert len(store) == 1001 and store.value(1000, 0) == 499.5
+
+
+def test_widget_shows_store(qtbot, npy_files):
+    """A widget shows a store with positional row labels."""
+    widget = tw.TableWidget(MappedStore.from_memmaps(npy_files))
+    qtbot.addWidget(widget)
+    assert widget.row_header.index_model.label(5, 0) == '5'
+    assert widget.col_header.index_model.label(1, 0) == 'size'
+    with pytest.raises(ValueError):
+        MappedStore({'a': np.arange(2), 'b': np.arange(3)})
+
+
+def test_arrow_file(qtbot, tmp_path):
+    """Arrow columns keep the dtype of the whole column in every slice."""
+    pa = pytest.importorskip('pyarrow')
+    table = pa.table({'count': pa.chunked_array([[1, 2], [None, 4]]),
+                      'name': pa.chunked_array([['a', None], ['c', 'd']]),
+                      'kind': pa.chunked_array([['x', 'y'], ['x', 'x']]).dictionary_encode()})
+    path = tmp_path / 'data.arrow'
+    with pa.ipc.new_file(str(path), table.schema) as writer:
+        writer.write_table(table)
+    store = MappedStore.from_arrow(path)
+    assert store.dtype(0) == np.dtype(float)
+    assert store.slice(0, 0, 2).tolist() == [1.0, 2.0]
+    assert store.take(1, np.array([3, 1])).tolist() == ['d', None]
+    assert store.value(2, 2) == 'x'
+    model = tm.TableModel(store)
+    assert model.data(model.index(3, 0)) == '4.0'
+    model.setData(model.index(2, 0), 3)
+    assert model.dataframe()['count'].tolist() == [1.0, 2.0, 3.0, 4.0]
@@ -0,0 +1,155 @@
+"""Test for the RowStore object."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from qspreadsheet import row_store as rs
+
+
+@pytest.fixture
+def data():
+    """DataFrame with mixed dtypes."""
+    return pd.DataFrame({
+        'int': np.arange(10),
+        'float': np.arange(10) / 2,
+        'text': list('abcdefghij'),
+        'date': pd.date_range('2021-01-01', periods=10),
+        'nullable': pd.array(range(10), dtype='Int64'),
+        'cat': pd.Categorical(list('xyxyxyxyxy')),
+    })
+
+
+def reference_insert(frame, row, new_rows):
+    """Insert rows with concat, positional index like the store."""
+    result = pd.concat([frame.iloc[:row], new_rows, frame.iloc[row:]])
+    return result.reset_index(drop=True)
+
+
+def test_to_frame_round_trip(data):
+    """A new store materializes the same frame, with views of the columns."""
+    store = rs.RowStore(data)
+    pd.testing.assert_frame_equal(store.to_frame(), data)
+    assert np.shares_memory(store.column(0), data['int'].to_numpy())
+
+
+def test_writes_copy_shared_columns(data):
+    """Writing copies a column of the DataFrame first, the DataFrame is never modified."""
+    original = data.copy()
+    store = rs.RowStore(data)
+    store.write(0, np.array([1]), 7)
+    store.write(4, np.array([2, 3]), pd.array([5, 6], dtype='Int64'))
+    assert store.value(1, 0) == 7 and store.value(3, 4) == 6
+    assert not np.shares_memory(store.column(0), data['int'].to_numpy())
+    assert np.shares_memory(store.column(1), data['float'].to_numpy())
+    store.write(0, np.array([2]), 8)
+    assert store.take(0, np.array([1, 2])).tolist() == [7, 8]
+    pd.testing.assert_frame_equal(data, original)
+
+
+def test_random_inserts_and_removes(data):
+    """Random edits match the concat reference, through gap moves and compaction."""
+    rng = np.random.default_rng(0)
+    store = rs.RowStore(data)
+    expected = data
+    for step in range(200):
+        if rng.random() < 0.6 or len(expected) < 3:
+            row = int(rng.integers(0, len(expected) + 1))
+            new_rows = data.sample(int(rng.integers(1, 4)), random_state=step)
+            store.insert_rows(row, len(new_rows), new_rows)
+            expected = reference_insert(expected, row, new_rows)
+        else:
+            rows = np.sort(rng.choice(len(expected), int(rng.integers(1, 3)), replace=False))
+            store.remove_rows(rows)
+            expected = expected.drop(index=expected.index[rows]).reset_index(drop=True)
+        assert len(store) == len(expected)
+    pd.testing.assert_frame_equal(store.to_frame(), expected)
+
+
+def test_blank_rows(data):
+    """Blank rows hold the missing value of each dtype."""
+    store = rs.RowStore(data)
+    store.insert_rows(1, 2)
+    frame = store.to_frame()
+    assert frame.dtypes.equals(data.dtypes)
+    assert frame.iloc[1].tolist()[:3] == [0, pytest.approx(np.nan, nan_ok=True), None]
+    assert frame.iloc[2, 3:].isna().all()
+
+
+def test_appends_are_amortized(data):
+    """Appending grows capacity by doubling, without a row map."""
+    store = rs.RowStore(data)
+    for _ in range(100):
+        store.insert_rows(len(store), 1, data.iloc[:1])
+    assert store._map is None
+    assert store._capacity < 2 * len(store)
+    assert store.column(0)[-1] == 0
+
+
+def test_moved_since(data):
+    """Each version records the first row it moved, appends move none of the old rows."""
+    store = rs.RowStore(data)
+    version = store.version
+    assert store.moved_since(version) == 10
+    store.insert_rows(10, 2)
+    assert store.moved_since(version) == 10
+    store.remove_rows([4, 7])
+    assert store.moved_since(version) == 4
+    store.reset(data)
+    assert store.moved_since(version) == 0
+    ring = rs.RingStore(data, 12)
+    version = ring.version
+    ring.insert_rows(10, 2)
+    assert ring.moved_since(version) == 10
+    ring.insert_rows(12, 1)
+    assert ring.moved_since(version) == 0
+
+
+def test_custom_index(data):
+    """A non-default index is kept as labels, new labels come from the values."""
+    data.index = [f'r{i}' for i in range(10)]
+    store = rs.RowStore(data)
+    store.insert_rows(0, 1, data.iloc[[3]])
+    store.remove_rows([5])
+    assert store.index_label(0) == 'r3'
+    assert store.index().tolist()[:6] == ['r3', 'r0', 'r1', 'r2', 'r3', 'r5']
+
+
+def test_insert_rejects_bad_values(data):
+    """Values the columns cannot hold raise before anything is inserted."""
+    store = rs.RowStore(data)
+    bad = data.iloc[:1].astype(object)
+    bad.iloc[0, 0] = 'x'
+    with pytest.raises(ValueError):
+        store.insert_rows(0, 1, bad)
+    assert len(store) == 10
+
+
+def test_ring_keeps_last_rows(data):
+    """Appends overwrite the oldest rows in place, labels keep counting."""
+    store = rs.RingStore(data, max_rows=4)
+    assert store.to_frame().equals(data.iloc[6:])
+    columns = [id(column) for column in store._columns]
+    for start in range(10, 30, 3):
+        new_rows = data.iloc[:3].set_axis(pd.RangeIndex(start, start + 3), axis=0)
+        store.insert_rows(len(store), 3, new_rows)
+    assert [id(column) for column in store._columns] == columns
+    expected = pd.concat([data.iloc[:3]] * 7).iloc[-4:]
+    frame = store.to_frame()
+    assert frame.reset_index(drop=True).equals(expected.reset_index(drop=True))
+    assert frame.index.tolist() == [27, 28, 29, 30]
+    assert store.index_label(0) == 27
+    with pytest.raises(IndexError):
+        store.insert_rows(0, 1)
+
+
+def test_ring_removes_and_blank_rows(data):
+    """Front removes move the head, other removes compact in place."""
+    store = rs.RingStore(data.set_index('text'), max_rows=5)
+    store.remove_rows([0])
+    store.remove_rows([1, 3])
+    assert store.index().tolist() == ['g', 'i']
+    store.insert_rows(2, 4)
+    assert len(store) == 5
+    assert store.index()[-1] is None
+    assert np.isnan(store.value(4, 1))
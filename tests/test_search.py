@@ -0,0 +1,72 @@
+"""Test for the SearchIndex object."""
+
+import numpy as np
+import pandas as pd
+
+from qspreadsheet import search
+from qspreadsheet import table_model as tm
+
+
+def make_index(columns):
+    """SearchIndex over a list of column arrays."""
+    return search.SearchIndex(lambda col: columns[col], lambda: len(columns))
+
+
+def test_find_orders_hits_by_row_then_column(qtbot):
+    """Hits are returned in row, then column order."""
+    columns = [np.array(['x1', 'y', 'x2'], dtype=object), np.array([10, 1, 11])]
+    index = make_index(columns)
+    assert index.find('1').tolist() == [[0, 0], [0, 1], [1, 1], [2, 1]]
+    assert index.find('^x', regex=True).tolist() == [[0, 0], [2, 0]]
+    assert index.find('X', case=True).tolist() == []
+
+
+def test_find_matches_display_strings(qtbot):
+    """Search runs over the same text as the display."""
+    dates = pd.array(pd.to_datetime(['2021-01-01', None]))
+    index = make_index([dates])
+    assert index.find('00:00').tolist() == [[0, 0]]
+    assert index.find('NaT').tolist() == [[1, 0]]
+
+
+def test_prepare_builds_in_background(qtbot):
+    """Columns are built on the thread pool and kept until invalidated."""
+    columns = [np.arange(5), np.arange(5) * 2]
+    index = make_index(columns)
+    with qtbot.waitSignals([index.column_ready, index.column_ready]):
+        index.prepare()
+    assert index.is_ready(0) and index.is_ready(1)
+    columns[1] = np.arange(5) * 3
+    index.invalidate_column(1)
+    assert not index.is_ready(1)
+    assert index.find('9').tolist() == [[3, 1]]
+
+
+def test_inserted_and_removed_rows_keep_strings(qtbot):
+    """Built strings follow inserted and removed rows, formatting only the new rows."""
+    columns = [np.array(['a', 'b', 'c'], dtype=object)]
+    index = search.SearchIndex(lambda col: columns[col], lambda: len(columns),
+                               take_values=lambda col, rows: columns[col][rows])
+    index.column_strings(0)
+    columns[0] = np.array(['a', 'b', 'c', 'd', 'e'], dtype=object)
+    index.insert_rows(3, 2)
+    columns[0] = np.array(['x', 'a', 'b', 'c', 'd', 'e'], dtype=object)
+    index.insert_rows(0, 1)
+    assert index.column_strings(0).tolist() == list('xabcde')
+    index.remove_rows(np.array([0, 1]))
+    index.remove_rows(np.array([2]))
+    assert index.column_strings(0).tolist() == list('bce')
+    assert index.find('e').tolist() == [[2, 0]]
+
+
+def test_model_prepares_search(qtbot, monkeypatch):
+    """The model builds the search strings when data is set, so find formats nothing."""
+    model = tm.TableModel(pd.DataFrame({'a': [1, 12], 'b': list('xy')}), prepare_search=True)
+    index = model.search_index
+    qtbot.waitUntil(lambda: index.is_ready(0) and index.is_ready(1))
+    monkeypatch.setattr(search, 'format_block', None)
+    assert model.find('1').tolist() == [[0, 0], [1, 0]]
+    monkeypatch.undo()
+    model.reset_data(pd.DataFrame({'a': [3]}))
+    qtbot.waitUntil(lambda: index.is_ready(0))
+    assert not index.is_ready(1)
@@ -0,0 +1,57 @@
+"""Test for the sorting functions."""
+
+import numpy as np
+import pandas as pd
+
+from qspreadsheet import sorting
+
+
+def test_argsort_nan_last_both_directions():
+    """Missing values go last, whatever the direction."""
+    values = np.array([2.0, np.nan, 1.0, 3.0])
+    assert sorting.argsort([values]).tolist() == [2, 0, 3, 1]
+    assert sorting.argsort([values], ascending=False).tolist() == [3, 0, 2, 1]
+
+
+def test_argsort_multi_key_stable():
+    """Ties are broken by the next key, then by the original order."""
+    first = np.array(['b', 'a', 'b', 'a', 'b'], dtype=object)
+    second = np.array([1, 2, 1, 1, 0])
+    order = sorting.argsort([first, second], ascending=[True, False])
+    assert order.tolist() == [1, 3, 0, 2, 4]
+
+
+def test_argsort_pandas_arrays():
+    """Datetime, categorical and nullable arrays sort by their values."""
+    dates = pd.array(pd.to_datetime(['2021-03-01', None, '2021-01-01']))
+    assert sorting.argsort([dates]).tolist() == [2, 0, 1]
+    cats = pd.Categorical(['lo', 'hi', None, 'mid'], categories=['lo', 'mid', 'hi'])
+    assert sorting.argsort([cats], ascending=False).tolist() == [1, 3, 0, 2]
+    ints = pd.array([3, None, 1], dtype='Int64')
+    assert sorting.argsort([ints]).tolist() == [2, 0, 1]
+
+
+def test_argsort_mixed_objects():
+    """Objects which do not compare are ordered by their text."""
+    values = np.array([2, 'a', None, 1], dtype=object)
+    assert sorting.argsort([values]).tolist() == [3, 0, 1, 2]
+
+
+def test_argsort_unsigned_beyond_int64():
+    """Unsigned values from 2**63 up sort above the smaller ones."""
+    values = np.array([2 ** 63 + 5, 1, 2 ** 63], dtype=np.uint64)
+    assert sorting.argsort([values]).tolist() == [1, 2, 0]
+    assert sorting.argsort([values], ascending=False).tolist() == [0, 2, 1]
+    small = np.array([3, 0, 2], dtype=np.uint8)
+    assert sorting.argsort([small], ascending=False).tolist() == [0, 2, 1]
+
+
+def test_stable_argsort_matches_numpy_stable():
+    """Quicksort with tie fixing and radix sort are both stable."""
+    rng = np.random.default_rng(0)
+    floats = rng.integers(0, 5, 1000).astype(float)
+    floats[::7] = np.nan
+    wide_ints = rng.integers(0, 3, 1000) * 2 ** 40
+    for key in (floats, wide_ints, rng.integers(-3, 3, 1000)):
+        expected = np.argsort(key, kind='stable')
+        assert (sorting.stable_argsort(key) == expected).all()
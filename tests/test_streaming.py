@@ -0,0 +1,99 @@
+"""Test for streamed row appends."""
+
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from qspreadsheet import qt
+from qspreadsheet import table_model as tm
+
+
+@pytest.fixture
+def data():
+    """DataFrame with a number and a text column."""
+    return pd.DataFrame({'number': np.arange(3), 'text': list('abc')})
+
+
+def chunk(start, size):
+    """Chunk of rows continuing the data."""
+    return pd.DataFrame({'number': np.arange(start, start + size),
+                         'text': ['x'] * size}, index=np.arange(start, start + size))
+
+
+def test_chunks_commit_in_one_insert(qtbot, data):
+    """Chunks buffered within a frame are inserted at once, without undo deltas."""
+    model = tm.TableModel(data)
+    inserts = []
+    model.rowsInserted.connect(lambda parent, first, last: inserts.append((first, last)))
+    for start in (3, 5, 7):
+        model.append_rows(chunk(start, 2))
+    assert model.append_buffer.pending_rows == 6
+    with qtbot.waitSignal(model.append_buffer.committed) as blocker:
+        pass
+    assert blocker.args == [6]
+    assert inserts == [(3, 8)]
+    assert model.dataframe()['number'].tolist() == list(range(9))
+    assert len(model.undo_stack) == 0
+
+
+def test_append_from_producer_thread(qtbot, data):
+    """A producer thread appends while the GUI thread commits per frame."""
+    model = tm.TableModel(data)
+    inserts = []
+    model.rowsInserted.connect(lambda *args: inserts.append(args))
+
+    def produce():
+        for start in range(3, 1003, 10):
+            model.append_rows(chunk(start, 10))
+
+    producer = threading.Thread(target=produce)
+    producer.start()
+    producer.join()
+    qtbot.waitUntil(lambda: model.rowCount(qt.QModelIndex()) == 1003)
+    assert len(inserts) < 100
+    assert model.dataframe()['number'].tolist() == list(range(1003))
+
+
+def test_appends_keep_search_strings_and_highlights(qtbot, data):
+    """Appended rows extend the search strings, and highlights outlive the appends."""
+    model = tm.TableModel(data)
+    model.flash_highlights.duration = 60_000
+    new = data.copy()
+    new.loc[1, 'number'] = 10
+    model.update_data(new, flash=True)
+    assert model.find('b').tolist() == [[1, 1]]
+    with qtbot.waitSignal(model.append_buffer.committed):
+        model.append_rows(chunk(3, 2))
+    assert model.search_index.is_ready(1)
+    assert model.find('x').tolist() == [[3, 1], [4, 1]]
+    color = model.flash_highlights.color
+    assert model.data(model.index(1, 0), qt.Qt.BackgroundRole) == color
+
+
+def test_bounded_appends_shift_search_strings_and_highlights(qtbot, data):
+    """Rows dropped from a bounded model shift the search strings and highlights."""
+    model = tm.TableModel(data, max_rows=4)
+    model.flash_highlights.duration = 60_000
+    new = data.copy()
+    new.loc[2, 'number'] = 10
+    model.update_data(new, flash=True)
+    model.find('c')
+    with qtbot.waitSignal(model.append_buffer.committed):
+        model.append_rows(chunk(3, 2))
+    assert model.find('c').tolist() == [[1, 1]]
+    assert model.find('x').tolist() == [[2, 1], [3, 1]]
+    color = model.flash_highlights.color
+    assert model.data(model.index(1, 0), qt.Qt.BackgroundRole) == color
+    assert model.data(model.index(0, 0), qt.Qt.BackgroundRole) is None
+
+
+def test_bad_chunks(qtbot, data):
+    """Wrong columns raise at once, uncoercible values drop the frame."""
+    model = tm.TableModel(data)
+    with pytest.raises(ValueError):
+        model.append_rows(pd.DataFrame({'number': [1]}))
+    model.append_rows(pd.DataFrame({'number': ['not a number'], 'text': ['x']}))
+    assert model.append_buffer.flush() == 0
+    assert model.rowCount(qt.QModelIndex()) == 3
@@ -0,0 +1,292 @@
+"""Test for the TableModel object."""
+
+import pandas as pd
+import pytest
+
+from qspreadsheet import qt
+from qspreadsheet import display_cache as dc
+from qspreadsheet import filters
+from qspreadsheet import index_model as im
+from qspreadsheet import table_model as tm
+
+
+@pytest.fixture
+def data():
+    """Small DataFrame with mixed dtypes."""
+    return pd.DataFrame({
+        'int': [1, 2, 3],
+        'float': [0.5, float('nan'), 2.25],
+        'text': ['a', 'b', None],
+        'date': pd.to_datetime(['2021-01-01', None, '2021-03-01']),
+        'nullable': pd.array([1, None, 3], dtype='Int64'),
+        'cat': pd.Categorical(['x', 'y', 'x']),
+    })
+
+
+def test_display_matches_iloc(qtbot, data):
+    """DisplayRole matches `str` of the `iloc` scalar for every dtype, None shows empty."""
+    model = tm.TableModel(data)
+    for row in range(data.index.size):
+        for col in range(data.columns.size):
+            value = data.iloc[row, col]
+            expected = '' if value is None else str(value)
+            assert model.data(model.index(row, col)) == expected
+
+
+def test_reset_data(qtbot, data):
+    """Column accessors are rebuilt when the data is replaced."""
+    model = tm.TableModel(data)
+    with qtbot.waitSignal(model.modelReset):
+        model.reset_data(data.iloc[:, :2])
+    assert model.columnCount(qt.QModelIndex()) == 2
+    assert model.data(model.index(2, 1)) == '2.25'
+
+
+def test_incremental_fetch(qtbot):
+    """Rows are exposed in chunks, shared with the row index model."""
+    data = pd.DataFrame({'a': range(25)})
+    model = tm.TableModel(data, fetch_chunk_size=10)
+    index_model = im.RowIndexModel(data.index, row_mapping=model.row_mapping)
+    root = qt.QModelIndex()
+    assert model.rowCount(root) == 10
+    assert model.canFetchMore(root)
+    with qtbot.waitSignal(index_model.rowsInserted):
+        model.fetchMore(root)
+    assert model.rowCount(root) == index_model.rowCount(root) == 20
+    index_model.fetchMore(root)
+    assert model.rowCount(root) == 25
+    assert not model.canFetchMore(root)
+    assert model.data(model.index(24, 0)) == '24'
+
+
+def test_background_formatting(qtbot, data):
+    """Uncached blocks show a placeholder until formatted in the background."""
+    model = tm.TableModel(data, background_formatting=True)
+    index = model.index(1, 2)
+    with qtbot.waitSignal(model.dataChanged) as blocker:
+        assert model.data(index) == dc.PLACEHOLDER
+    top_left, bottom_right = blocker.args[:2]
+    assert (top_left.row(), top_left.column()) == (0, 2)
+    assert (bottom_right.row(), bottom_right.column()) == (2, 2)
+    assert model.data(index) == 'b'
+
+
+def test_sort_maps_rows(qtbot, data):
+    """Sorting maps view rows without touching the data."""
+    model = tm.TableModel(data)
+    index_model = im.RowIndexModel(data.index, row_mapping=model.row_mapping)
+    with qtbot.waitSignal(model.modelReset):
+        model.sort(1, qt.Qt.DescendingOrder)
+    assert [model.data(model.index(row, 1)) for row in range(3)] == ['2.25', '0.5', 'nan']
+    assert [index_model.data(index_model.index(row, 0)) for row in range(3)] == ['2', '0', '1']
+    assert data['float'].iloc[0] == 0.5
+    model.sort(-1)
+    assert model.data(model.index(0, 1)) == '0.5'
+
+
+def test_filter_maps_rows(qtbot, data):
+    """Filtered rows are hidden from both models, combined with the sort order."""
+    model = tm.TableModel(data)
+    index_model = im.RowIndexModel(data.index, row_mapping=model.row_mapping)
+    root = qt.QModelIndex()
+    model.sort(0, qt.Qt.DescendingOrder)
+    with qtbot.waitSignal(model.modelReset):
+        model.set_filter(1, filters.NotNull())
+    assert model.rowCount(root) == index_model.rowCount(root) == 2
+    assert [model.data(model.index(row, 0)) for row in range(2)] == ['3', '1']
+    assert index_model.data(index_model.index(0, 0)) == '2'
+    model.clear_filters()
+    assert model.rowCount(root) == 3
+
+
+def test_find_in_view_order(qtbot, data):
+    """Search hits are mapped to view rows, skipping filtered rows."""
+    model = tm.TableModel(data)
+    assert model.find('2').tolist() == [[0, 3], [1, 0], [2, 1], [2, 3]]
+    model.sort(0, qt.Qt.DescendingOrder)
+    model.set_filter(3, filters.NotNull())
+    assert model.find('2').tolist() == [[0, 1], [0, 3], [1, 3]]
+
+
+@pytest.mark.parametrize('col, value, expected', [
+    (0, '7', '7'),
+    (1, '', 'nan'),
+    (3, '2022-05-06', '2022-05-06 00:00:00'),
+    (4, '', '<NA>'),
+    (5, 'y', 'y'),
+])
+def test_set_data_keeps_dtype(qtbot, data, col, value, expected):
+    """Edits are coerced and written, keeping the column dtype, the DataFrame unchanged."""
+    original = data.copy()
+    model = tm.TableModel(data)
+    model.data(model.index(0, col))  # Cache the block
+    with qtbot.waitSignal(model.dataChanged):
+        assert model.setData(model.index(0, col), value)
+    assert model.data(model.index(0, col)) == expected
+    assert str(model.dataframe().iloc[0, col]) == expected
+    assert model.dataframe().dtypes.equals(original.dtypes)
+    pd.testing.assert_frame_equal(data, original)
+
+
+@pytest.mark.parametrize('col, value', [(0, '1.5'), (0, ''), (5, 'z'), (4, 'abc')])
+def test_set_data_rejects(qtbot, data, col, value):
+    """Values the column cannot hold are rejected, the data is unchanged."""
+    model = tm.TableModel(data)
+    before = str(data.iloc[0, col])
+    assert not model.setData(model.index(0, col), value)
+    assert model.data(model.index(0, col)) == before
+
+
+def test_set_values_emits_one_data_changed(qtbot, data):
+    """A paste writes each column vectorized and emits one rectangle."""
+    model = tm.TableModel(data)
+    model.sort(0, qt.Qt.DescendingOrder)
+    with qtbot.waitSignal(model.dataChanged) as blocker:
+        model.set_values(0, 0, [['10', '1.5'], [20, 2.5]])
+    top_left, bottom_right = blocker.args[:2]
+    assert (top_left.row(), top_left.column()) == (0, 0)
+    assert (bottom_right.row(), bottom_right.column()) == (1, 1)
+    assert model.dataframe()['int'].tolist() == [1, 20, 10]
+    assert model.dataframe()['float'].tolist()[1:] == [2.5, 1.5]
+    with pytest.raises(ValueError):
+        model.set_values(0, 0, [['x']])
+    with pytest.raises(IndexError):
+        model.set_values(2, 0, [[1], [2]])
+
+
+def test_fill(qtbot, data):
+    """Fill writes one value into a rectangle."""
+    model = tm.TableModel(data)
+    model.fill(0, 0, 2, 1, '4')
+    assert model.dataframe()['int'].tolist() == [4, 4, 4]
+    assert model.dataframe()['float'].tolist() == [4.0, 4.0, 4.0]
+    assert model.data(model.index(1, 1)) == '4.0'
+
+
+def test_not_editable_rejects_writes(qtbot, data):
+    """Edits, pastes and fills all leave a non-editable model unchanged."""
+    model = tm.TableModel(data)
+    model.editable = False
+    assert not model.setData(model.index(0, 0), 9)
+    with pytest.raises(TypeError):
+        model.set_values(0, 0, [[9]])
+    with pytest.raises(TypeError):
+        model.fill(0, 0, 2, 0, 9)
+    assert data['int'].tolist() == [1, 2, 3]
+    assert len(model.undo_stack) == 0
+
+
+def test_insert_and_remove_rows(qtbot, data):
+    """Rows are inserted and removed through the store, models stay in step."""
+    model = tm.TableModel(data)
+    index_model = im.RowIndexModel(data.index, row_mapping=model.row_mapping,
+                                   row_store=model.row_store)
+    with qtbot.waitSignal(model.rowsInserted):
+        assert model.insertRows(1, 2)
+    assert model.rowCount(qt.QModelIndex()) == 5
+    assert index_model.rowCount(qt.QModelIndex()) == 5
+    assert model.data(model.index(3, 0)) == '2'
+    assert index_model.data(index_model.index(4, 0)) == '4'
+    model.insert_rows(5, data.iloc[:1])
+    with qtbot.waitSignal(model.rowsRemoved):
+        assert model.removeRows(0, 3)
+    assert model.dataframe()['int'].tolist() == [2, 3, 1]
+    assert not model.removeRows(2, 2)
+
+
+def test_blank_rows_display_empty(qtbot, data):
+    """Blank and missing object cells show no text, not 'None'."""
+    model = tm.TableModel(data)
+    model.insertRows(0, 1)
+    assert model.data(model.index(0, 2)) == ''
+    assert model.data(model.index(3, 2)) == ''
+    assert model.find('None').tolist() == []
+
+
+def test_insert_rows_keeps_sort_and_filter(qtbot, data):
+    """Inserted rows show where inserted, removed rows leave the mapped order."""
+    model = tm.TableModel(data)
+    model.set_filter(0, filters.Range(upper=2))
+    model.sort(0, qt.Qt.DescendingOrder)
+    model.insert_rows(1, pd.DataFrame([[9, 0.0, 'n', None, None, 'y']]))
+    assert [model.data(model.index(row, 0)) for row in range(3)] == ['2', '9', '1']
+    model.removeRows(0, 1)
+    assert [model.data(model.index(row, 0)) for row in range(2)] == ['9', '1']
+    assert model.dataframe()['int'].tolist() == [9, 1, 3]
+    assert model.find('9').tolist() == [[0, 0]]
+
+
+def test_virtual_rows(qtbot, data):
+    """Virtual rows follow the data rows, editing one appends a data row."""
+    model = tm.TableModel(data, fetch_chunk_size=2)
+    index_model = im.RowIndexModel(data.index, row_mapping=model.row_mapping,
+                                   row_store=model.row_store)
+    with qtbot.waitSignal(model.virtual_rows_enabled) as blocker:
+        model.virtual_rows = 1
+    assert blocker.args == [True]
+    assert model.rowCount(qt.QModelIndex()) == 2  # Hidden until all rows are fetched
+    model.fetchMore(qt.QModelIndex())
+    assert model.rowCount(qt.QModelIndex()) == 4
+    assert index_model.rowCount(qt.QModelIndex()) == 4
+    assert model.data(model.index(3, 0)) == ''
+    assert index_model.data(index_model.index(3, 0)) == im.VIRTUAL_ROW_LABEL
+    with qtbot.waitSignal(model.rowsInserted):
+        assert model.setData(model.index(3, 0), '42')
+    assert model.rowCount(qt.QModelIndex()) == 5
+    assert model.data(model.index(3, 0)) == '42'
+    assert index_model.data(index_model.index(3, 0)) == '3'
+    assert model.dataframe()['int'].tolist() == [1, 2, 3, 42]
+    assert not model.setData(model.index(4, 0), 'x')
+    assert model.row_mapping.size == 4
+    model.virtual_rows = 0
+    assert model.rowCount(qt.QModelIndex()) == 4
+
+
+def test_virtual_row_appends_are_amortized(qtbot, data):
+    """Appending through a virtual row grows the store without a row map."""
+    model = tm.TableModel(data)
+    model.virtual_rows = 1
+    for value in range(100):
+        model.setData(model.index(model.row_mapping.size, 0), str(value))
+    assert model.row_store._map is None
+    assert model.dataframe()['int'].tolist()[-2:] == [98, 99]
+
+
+def test_bounded_model_signals(qtbot, data):
+    """Appending to a full model removes from the front, then inserts at the back."""
+    model = tm.TableModel(data, max_rows=2)
+    assert model.rowCount(qt.QModelIndex()) == 2
+    signals = []
+    model.rowsRemoved.connect(lambda parent, first, last: signals.append(('-', first, last)))
+    model.rowsInserted.connect(lambda parent, first, last: signals.append(('+', first, last)))
+    model.setData(model.index(1, 0), 100)
+    model.insert_rows(2, data.iloc[:1])
+    assert signals == [('-', 0, 0), ('+', 1, 1)]
+    assert model.dataframe()['int'].tolist() == [100, 1]
+    assert len(model.undo_stack) == 0  # The edit was dropped, the insert is not recorded
+    assert not model.insertRows(0, 1)
+
+
+def test_bounded_model_does_not_record_removes(qtbot, data):
+    """Removed rows cannot be undone into a ring, and the views see balanced signals."""
+    model = tm.TableModel(data, max_rows=3)
+    signals = []
+    model.rowsAboutToBeInserted.connect(lambda parent, first, last: signals.append('abi'))
+    model.rowsInserted.connect(lambda parent, first, last: signals.append('i'))
+    model.rowsAboutToBeRemoved.connect(lambda parent, first, last: signals.append('abr'))
+    model.rowsRemoved.connect(lambda parent, first, last: signals.append('r'))
+    assert model.removeRows(2, 1)
+    assert not model.undo()
+    model.insert_rows(2, data.iloc[:1])
+    assert signals == ['abr', 'r', 'abi', 'i']
+    assert model.dataframe()['int'].tolist() == [1, 2, 1]
+    assert len(model.undo_stack) == 0
+
+
+def test_bounded_model_labels_after_large_append(qtbot, data):
+    """Rows of an append larger than the model keep the labels they were appended at."""
+    model = tm.TableModel(data.iloc[:2], max_rows=3)
+    model.insert_rows(2, pd.concat([data, data.iloc[:2]]))
+    assert model.row_store.index().tolist() == [4, 5, 6]
+    assert model.dataframe()['int'].tolist() == [3, 1, 2]
+    assert model.rowCount(qt.QModelIndex()) == 3
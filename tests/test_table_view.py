@@ -1,5 +1,9 @@
 """Test for the TableView object."""
 
+import numpy as np
+import pandas as pd
+
+from qspreadsheet import table_model as tm
 from qspreadsheet import table_view as tv
 from tests import util
 
@@ -8,3 +12,40 @@ def test_create(qtbot):
     """TableView can be created."""
     table_view = util.test_create(tv.TableView, qtbot=qtbot)
     qtbot.addWidget(table_view)
+
+
+def test_size_hint_is_capped_and_cached(qtbot):
+    """The size hint measures the first rows only, until rows change."""
+    table_view = tv.TableView()
+    qtbot.addWidget(table_view)
+    model = tm.TableModel(pd.DataFrame({'a': range(100_000)}), table_view)
+    table_view.setModel(model)
+    hint = table_view.sizeHint()
+    rows_height = tv.SIZE_HINT_MAX_ROWS * table_view.rowHeight(0)
+    header_height = table_view.horizontalHeader().sizeHint().height()
+    assert hint.height() == rows_height + header_height + 2 * table_view.frameWidth()
+    assert table_view._size_hint is hint
+    model.removeRows(0, 99_990)
+    assert table_view._size_hint is None
+    assert table_view.sizeHint().height() < hint.height()
+
+
+def test_width_candidates_find_longest():
+    """The sample yields the edge rows and its longest strings."""
+    values = np.array(['a'] * 100_000, dtype=object)
+    values[50_000:50_100] = 'long text'
+    strings = tv.width_candidates(values.take, values.size, sample_rows=20_000,
+                                  rng=np.random.default_rng(0))
+    assert 'long text' in strings
+    assert len(strings) == tv.FIT_HEAD_ROWS + tv.FIT_TAIL_ROWS + tv.FIT_LONGEST_ROWS
+
+
+def test_fit_columns(qtbot):
+    """Columns are fitted to their widest text, capped at `max_width`."""
+    table_view = tv.TableView()
+    qtbot.addWidget(table_view)
+    data = pd.DataFrame({'short': ['a'] * 10, 'long': ['m' * 5] * 10, 'huge': ['m' * 500] * 10})
+    table_view.setModel(tm.TableModel(data, table_view))
+    short, long, huge = table_view.fit_columns(max_width=300)
+    assert short < long < huge == 300
+    assert table_view.columnWidth(1) == long
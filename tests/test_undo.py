@@ -0,0 +1,116 @@
+"""Test for the undo stack."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from qspreadsheet import qt
+from qspreadsheet import filters
+from qspreadsheet import table_model as tm
+from qspreadsheet import undo
+
+
+@pytest.fixture
+def data():
+    """DataFrame with mixed dtypes."""
+    return pd.DataFrame({
+        'int': np.arange(6),
+        'float': np.arange(6) / 2,
+        'text': list('abcdef'),
+        'nullable': pd.array(range(6), dtype='Int64'),
+    })
+
+
+def cells(size):
+    """Cells delta recording `size` float values."""
+    rows = np.arange(size)
+    return undo.CellsDelta(rows, 0, [np.zeros(size)], [np.ones(size)])
+
+
+def test_stack_evicts_oldest(qtbot):
+    """Deltas over the memory budget are dropped oldest first."""
+    stack = undo.UndoStack(memory_budget=cells(100).nbytes * 2)
+    first = cells(100)
+    stack.push(first)
+    stack.push(cells(100))
+    stack.push(cells(100))
+    assert len(stack) == 2
+    assert first not in list(stack._undo)
+    stack.push(cells(1000))  # Too large alone, kept as the newest
+    assert len(stack) == 1
+    assert stack.pop_undo() is not None
+    assert stack.can_redo()
+    stack.push(cells(1))
+    assert not stack.can_redo()
+
+
+def test_undo_redo_edits(qtbot, data):
+    """Cell edits undo and redo, whatever the current sort order."""
+    model = tm.TableModel(data.copy())
+    model.setData(model.index(0, 2), 'z')
+    model.sort(0, qt.Qt.DescendingOrder)
+    assert model.undo()
+    assert model.dataframe().equals(data)
+    assert model.redo()
+    assert model.dataframe()['text'].tolist()[0] == 'z'
+    assert not model.redo()
+
+
+def test_bulk_paste_is_one_delta(qtbot):
+    """A paste of 100k cells records and undoes as one delta."""
+    frame = pd.DataFrame(np.zeros((10_000, 10)))
+    model = tm.TableModel(frame.copy())
+    model.set_values(0, 0, np.ones((10_000, 10)))
+    assert len(model.undo_stack) == 1
+    assert model.undo()
+    assert model.dataframe().equals(frame)
+
+
+def test_undo_redo_rows(qtbot, data):
+    """Inserts and removes undo and redo, also for rows not consecutive in data."""
+    model = tm.TableModel(data.copy())
+    model.insert_rows(2, data.iloc[:2])
+    model.set_filter(0, filters.IsIn([0, 2, 4]))
+    model.removeRows(1, 3)  # Data rows 2, 4, 6
+    assert model.dataframe()['int'].tolist() == [0, 1, 1, 3, 5]
+    model.clear_filters()
+    assert model.undo()
+    assert model.dataframe()['int'].tolist() == [0, 1, 0, 1, 2, 3, 4, 5]
+    assert model.rowCount(qt.QModelIndex()) == 8
+    assert model.undo()
+    assert model.dataframe().equals(data)
+    assert model.redo() and model.redo()
+    assert model.dataframe()['int'].tolist() == [0, 1, 1, 3, 5]
+
+
+def test_virtual_row_append_is_one_delta(qtbot, data):
+    """Typing into a virtual row is undone as one insert."""
+    model = tm.TableModel(data.copy())
+    model.virtual_rows = 1
+    model.setData(model.index(6, 2), 'g')
+    assert len(model.undo_stack) == 1
+    assert model.undo()
+    assert model.dataframe().equals(data)
+    assert model.rowCount(qt.QModelIndex()) == 7
+
+
+def test_undo_remove_keeps_sorted_positions(qtbot):
+    """Rows removed from a sorted view come back at their sorted view rows."""
+    frame = pd.DataFrame({'key': [3, 1, 4, 2, 5], 'text': list('abcde')})
+    model = tm.TableModel(frame.copy())
+    model.sort_by([0])
+    inserted = []
+    model.rowsInserted.connect(lambda parent, first, last: inserted.append((first, last)))
+    model.removeRows(1, 2)  # Keys 2 and 3, data rows 0 and 3
+    assert [model.data(model.index(row, 0)) for row in range(3)] == ['1', '4', '5']
+    assert model.undo()
+    assert [model.data(model.index(row, 0)) for row in range(5)] == ['1', '2', '3', '4', '5']
+    assert inserted == [(1, 2)]
+    assert model.dataframe().equals(frame)
+    model.set_filter(0, filters.IsIn([1, 2, 5]))
+    model.removeRows(0, 3)
+    model.clear_filters()
+    assert model.undo()
+    assert [model.data(model.index(row, 1)) for row in range(5)] == list('bdace')
+    assert model.redo()
+    assert model.dataframe()['key'].tolist() == [3, 4]
@@ -0,0 +1,103 @@
+"""Test for diff-driven data updates."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from qspreadsheet import qt
+from qspreadsheet import table_model as tm
+from qspreadsheet import updates
+
+
+@pytest.fixture
+def data():
+    """DataFrame of 20 rows with a float, a datetime and a category column."""
+    return pd.DataFrame({
+        'price': np.arange(20, dtype=float),
+        'time': pd.date_range('2021-01-01', periods=20),
+        'side': pd.Categorical(['buy', 'sell'] * 10),
+    })
+
+
+def test_changed_rows():
+    """Missing values staying missing are not changes."""
+    old = np.array([1.0, np.nan, np.nan, 4.0])
+    new = np.array([1.0, np.nan, 3.0, np.nan])
+    assert updates.changed_rows(old, new).tolist() == [2, 3]
+    old = pd.array([1, None, 3], dtype='Int64')
+    new = pd.array([1, None, None], dtype='Int64')
+    assert updates.changed_rows(old, new).tolist() == [2]
+
+
+def test_changed_regions():
+    """Close rows merge into one rectangle, spanning their changed columns."""
+    rows = np.array([10, 0, 2, 1, 30])
+    cols = np.array([0, 1, 3, 2, 1])
+    assert updates.changed_regions(rows, cols, merge_gap=3) == [
+        (0, 1, 2, 3), (10, 0, 10, 0), (30, 1, 30, 1)]
+    assert updates.changed_regions(np.array([0, 2]), np.array([0, 0]), merge_gap=0) == [
+        (0, 0, 0, 0), (2, 0, 2, 0)]
+
+
+def test_update_signals_visible_changes(qtbot, data):
+    """Only changed cells within the visible rows are signalled, without a reset."""
+    model = tm.TableModel(data)
+    model.data(model.index(3, 0))
+    changed = []
+    model.dataChanged.connect(
+        lambda first, last, roles: changed.append((first.row(), first.column(),
+                                                   last.row(), last.column())))
+    model.modelReset.connect(lambda: changed.append('reset'))
+    new = data.copy()
+    new.loc[3, 'price'] = -1.0
+    new.loc[5, 'side'] = 'buy'
+    new.loc[15, 'time'] = pd.Timestamp('2000-01-01')
+    assert model.update_data(new, visible_rows=(0, 9)) == 3
+    assert changed == [(3, 0, 5, 2)]
+    assert model.data(model.index(3, 0)) == '-1.0'
+    assert model.data(model.index(15, 1)) == '2000-01-01 00:00:00'
+    pd.testing.assert_frame_equal(model.dataframe(), new)
+    assert model.update_data(new) == 0
+
+
+def test_update_follows_sort_order(qtbot, data):
+    """Changes are signalled at the view rows of the changed data rows."""
+    model = tm.TableModel(data)
+    model.sort(0, qt.Qt.DescendingOrder)
+    changed = []
+    model.dataChanged.connect(lambda first, last, roles: changed.append(first.row()))
+    new = data.copy()
+    new.loc[19, 'price'] = 100.0
+    model.update_data(new)
+    assert changed == [0]
+    assert model.data(model.index(0, 0)) == '100.0'
+
+
+def test_bad_updates(qtbot, data):
+    """Wrong shapes and uncoercible values raise and write nothing."""
+    model = tm.TableModel(data)
+    with pytest.raises(ValueError):
+        model.update_data(data.iloc[:10])
+    new = data.copy()
+    new['price'] = new['price'].astype(object)
+    new.loc[0, 'price'] = 'not a number'
+    new.loc[1, 'side'] = 'buy'
+    with pytest.raises(ValueError):
+        model.update_data(new)
+    pd.testing.assert_frame_equal(model.dataframe(), data)
+
+
+def test_flash_changed_cells(qtbot, data):
+    """Changed cells are highlighted, then signalled again when the highlight expires."""
+    model = tm.TableModel(data)
+    model.flash_highlights.duration = 20
+    new = data.copy()
+    new.loc[2, 'price'] = 50.0
+    model.update_data(new, flash=True)
+    color = model.flash_highlights.color
+    assert model.data(model.index(2, 0), qt.Qt.BackgroundRole) == color
+    assert model.data(model.index(3, 0), qt.Qt.BackgroundRole) is None
+    with qtbot.waitSignal(model.dataChanged) as blocker:
+        pass
+    assert (blocker.args[0].row(), blocker.args[0].column()) == (2, 0)
+    assert model.data(model.index(2, 0), qt.Qt.BackgroundRole) is None